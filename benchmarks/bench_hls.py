@@ -0,0 +1,125 @@
+"""Compare the parsing of long media playlists by `mdl.hls` against the line scanning that M3u8VC used before.
+
+Usage:
+    python benchmarks/bench_hls.py [-n REPEAT] [--segments N] [PLAYLIST.m3u8 ...]
+
+Without any playlist given, a synthetic one of `--segments` segments is generated, with rotating keys and some
+discontinuities. The time and the peak of the memory allocated while parsing are reported.
+"""
+import argparse
+import os
+import sys
+import timeit
+import tracemalloc
+from urllib.parse import urljoin
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mdl import hls  # noqa: E402
+
+BASE_URL = 'https://cdn.example-tv.com/20251206/2100k/hls/index.m3u8'
+SECKEY_NONE = {'algo': "NONE", 'key': None, 'iv': None, 'valid': None}
+
+
+def get_seckey(ext_x_key, playlist_url):
+    """Stand-in for fetching the key, parsing the tag only."""
+    attribs = hls.parse_attribs(ext_x_key.partition(':')[2])
+    return {'algo': attribs.get('METHOD', 'NONE'), 'key': b'0' * 16, 'iv': None, 'valid': None}
+
+
+def parse_lines(text, playlist_url):
+    """The media playlist handling of M3u8VC as it was: `iter_lines`, then a second pass over `r.text`."""
+    for line in text.splitlines():
+        if line.startswith("#EXTINF:"):
+            break
+
+    segs = text.splitlines()
+    nsegs = len(segs)
+    purged = []
+    i = 0
+    seqnums, seqnum = [], 0
+    seckeys, seckey = [], None
+    while i < nsegs and (not segs[i] or segs[i].startswith("#")):
+        if segs[i].startswith("#EXT-X-MEDIA-SEQUENCE"):
+            seqnum = int(segs[i].split(":")[1])
+        if segs[i].startswith("#EXT-X-KEY"):
+            seckey = get_seckey(segs[i], playlist_url)
+            seckeys = []
+        i += 1
+
+    for j in range(i, nsegs):
+        if not segs[j]:
+            continue
+        if segs[j].startswith("#"):
+            if segs[j].startswith("#EXT-X-KEY"):
+                if seckey is None:
+                    seckey = SECKEY_NONE.copy()
+                    seckeys = [seckey] * len(purged)
+                seckey = get_seckey(segs[j], playlist_url)
+            continue
+        if seckey:
+            seckeys.append(seckey.copy())
+        seqnums.append(seqnum)
+        seqnum += 1
+        purged.append(urljoin(playlist_url, segs[j]))
+
+    for i, seckey in enumerate(seckeys):
+        if seckey['algo'] != "NONE" and seckey['iv'] is None:
+            seckey['iv'] = (seqnums[i]).to_bytes(16, 'big')
+
+    return purged, seckeys
+
+
+def parse_hls(text, playlist_url):
+    return hls.parse(text.splitlines(), playlist_url)
+
+
+def synthetic_playlist(n_segments, key_every=1000, discontinuity_every=5000):
+    lines = ['#EXTM3U', '#EXT-X-VERSION:3', '#EXT-X-TARGETDURATION:4', '#EXT-X-MEDIA-SEQUENCE:0',
+             '#EXT-X-PLAYLIST-TYPE:VOD']
+    for idx in range(n_segments):
+        if idx % key_every == 0:
+            lines.append('#EXT-X-KEY:METHOD=AES-128,URI="https://keys.example-tv.com/key?id={}"'.format(idx // key_every))
+        if idx and idx % discontinuity_every == 0:
+            lines.append('#EXT-X-DISCONTINUITY')
+        lines.append('#EXTINF:4.000000,')
+        lines.append('seg-{}-v1-a1.ts?t=1765000000&sign=5d41402abc4b2a76b9719d911017c592'.format(idx))
+    lines.append('#EXT-X-ENDLIST')
+
+    return '\n'.join(lines) + '\n'
+
+
+def peak_memory(func, *args):
+    tracemalloc.start()
+    result = func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('playlists', nargs='*', help='media playlists saved to files')
+    parser.add_argument('-n', '--repeat', type=int, default=5, help='number of runs of every parser per playlist')
+    parser.add_argument('--segments', type=int, default=100000, help='number of segments of the synthetic playlist')
+    args = parser.parse_args()
+
+    playlists = []
+    for fn in args.playlists:
+        with open(fn, encoding='utf-8') as fd:
+            playlists.append((fn, fd.read()))
+    if not playlists:
+        playlists.append(('synthetic ({} segments)'.format(args.segments), synthetic_playlist(args.segments)))
+
+    for name, text in playlists:
+        print('{}: {:.2f} MB'.format(name, len(text) / (1 << 20)))
+        for label, func in (('line scanning', parse_lines), ('mdl.hls', parse_hls)):
+            secs = min(timeit.repeat(lambda: func(text, BASE_URL), number=1, repeat=args.repeat))
+            peak = peak_memory(func, text, BASE_URL)
+            print('  {:<16} {:8.1f} ms {:8.1f} MB peak'.format(label, secs * 1000, peak / (1 << 20)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Compare the parsing of the `window.__PINIA__` state of v.qq.com pages by `mdl.jsobj` against the regex normalization
+plus `json.loads` that QQVideoVC used before.
+
+Usage:
+    python benchmarks/bench_jsobj.py [-n REPEAT] [PAGE.html ...]
+
+Without any captured page, a synthetic one is generated, see `--episodes`.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mdl import jsobj  # noqa: E402
+
+
+# the locator and the regex normalization as they were in QQVideoVC
+ALL_LOADED_INFO_RE = re.compile(r"window\.__PINIA__\s*=\s*(.+?);?</script>"
+                                r"|_piniaState\s*:\s*(.+?)\s*,\s*isHarmonyClient",
+                                re.MULTILINE | re.DOTALL | re.IGNORECASE)
+EP_LIST_RE = re.compile(r"(?:\[{\"list\":)?Array\.prototype\.slice\.call\({\"\d+\":(?:{\"list\":\[)?\[(.+?})\]\]?,.*?\"length\":\d+}\)(?=,\"tabs\")",
+                        re.MULTILINE | re.DOTALL | re.IGNORECASE)
+NULLIFY_RE = re.compile(r'new\s+Map\(.*?\]\)|void\s+0|(?<=:)\s*undefined\b|(?<=:)\s*false\b|(?<=:)\s*null\b|(?<=(:|\[))\s*(?<!\\)"([^"]|\\")*?:([^"]|\\")*?(?<!\\)"',
+                        re.MULTILINE | re.DOTALL | re.IGNORECASE)
+DOUBLE_QUOTE_VAL_RE = re.compile(r":\s*([^,\[\]{}\"\\\s/]+)", re.DOTALL | re.IGNORECASE)
+DOUBLE_QUOTE_KEY_RE = re.compile(r"(\w+)\s*:", re.DOTALL | re.IGNORECASE)
+
+# the locator of QQVideoVC
+PINIA_RE = re.compile(r"window\.__PINIA__\s*=\s*([^<]*(?:<(?!/script>)[^<]*)*)</script>"
+                      r"|_piniaState\s*:\s*(.+?)\s*,\s*isHarmonyClient",
+                      re.MULTILINE | re.DOTALL | re.IGNORECASE)
+
+
+def parse_regex(page):
+    match = ALL_LOADED_INFO_RE.search(page)
+    matched = match.group(1) or match.group(2)
+    matched = EP_LIST_RE.sub(r'[{"list":[[\1]]', matched)
+    matched = NULLIFY_RE.sub(r'""', matched)
+    matched = DOUBLE_QUOTE_VAL_RE.sub(r': "\1"', matched)
+    matched = DOUBLE_QUOTE_KEY_RE.sub(r'"\1": ', matched)
+
+    return json.loads(matched)
+
+
+def parse_jsobj(page):
+    match = PINIA_RE.search(page)
+
+    return jsobj.loads(match.group(1) or match.group(2))
+
+
+def synthetic_page(n_episodes, seed=0):
+    """A page shaped like the v.qq.com cover pages, with `n_episodes` entries in the episode list."""
+    rnd = random.Random(seed)
+
+    def episode(idx):
+        vid = ''.join(rnd.choice('abcdefghijklmnopqrstuvwxyz0123456789') for _ in range(11))
+        return ('{"vid":"%s","title":"%d","play_title":"Episode %d: %s","union_title":"Ep %d","duration":"%d",'
+                '"isTrailer":false,"markLabel":void 0,"imgTag":null,"publishDate":"2024-01-%02d 20:00:00",'
+                '"pic":"https:\\u002F\\u002Fpuui.qpic.cn\\u002Fvpic_cover\\u002F%s\\u002F%s_hz.jpg\\u002F496",'
+                '"uiData":{"data":[{"title":"VIP","color":undefined}]},"extra":new Map([["k%d",1]])}'
+                % (vid, idx, idx, 'x' * rnd.randint(10, 60), idx, rnd.randint(600, 3000), idx % 28 + 1, vid, vid, idx))
+
+    episodes = ','.join(episode(idx) for idx in range(1, n_episodes + 1))
+    tabs = ','.join('{"begin":%d,"end":%d,"selected":%s,"page_context":"cid=mzc00200abc&episode_begin=%d&episode_end=%d'
+                    '&page_num=%d&page_size=30"}' % (b, b + 29, 'true' if b == 1 else 'false', b, b + 29, b // 30)
+                    for b in range(1, n_episodes + 1, 30))
+    state = ('{globalStore:{currentCid:"mzc00200abc",currentVid:"a0000000001",isLogin:false,userInfo:undefined},'
+             'introduction:{introData:{list:[{item_params:{year:"2024",title:"Synthetic",cover_id:"mzc00200abc",'
+             'area_name:"CN",score:8.5,tag:void 0}}]}},'
+             'episodeMain:{listData:[{"list":Array.prototype.slice.call({"0":[%s],"length":1}),"tabs":[%s]}]},'
+             'cache:new Map([["x",{a:1}]])}' % (episodes, tabs))
+
+    return '<html><head></head><body><script>window.__PINIA__=%s;</script></body></html>' % state
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('pages', nargs='*', help='captured v.qq.com cover pages')
+    parser.add_argument('-n', '--repeat', type=int, default=5, help='number of runs of every parser per page')
+    parser.add_argument('--episodes', type=int, default=3000, help='number of episodes of the synthetic page')
+    args = parser.parse_args()
+
+    pages = []
+    for fn in args.pages:
+        with open(fn, encoding='utf-8') as fd:
+            pages.append((fn, fd.read()))
+    if not pages:
+        pages.append(('synthetic ({} episodes)'.format(args.episodes), synthetic_page(args.episodes)))
+
+    for name, page in pages:
+        print('{}: {:.2f} MB'.format(name, len(page) / (1 << 20)))
+        for label, func in (('regex + json.loads', parse_regex), ('jsobj', parse_jsobj)):
+            try:
+                func(page)
+            except Exception as e:
+                print('  {:<20} failed: {!r}'.format(label, e))
+                continue
+            secs = min(timeit.repeat(lambda: func(page), number=1, repeat=args.repeat))
+            print('  {:<20} {:8.1f} ms'.format(label, secs * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -78,9 +78,16 @@ def arg_parser():
                         choices=['true', 'false'], help='specify whether to merge all the video clips or not')
     parser.add_argument('--ts-convert', dest='ts_convert', default=None, const='true', nargs='?', type=lambda x: x.lower(),
                         choices=['true', 'false'], help='specify whether to convert (aggregated) TS file to MP4 format or not')
+    parser.add_argument('--pipelined-batches', dest='pipelined_batches', default=None, const='true', nargs='?',
+                        type=lambda x: x.lower(), choices=['true', 'false'],
+                        help='specify whether to download the next batch of episodes while decrypting and joining the current one')
+    parser.add_argument('--no-cache', dest='http_cache', default=None, action='store_const', const='false',
+                        help='fetch the web pages and API responses afresh instead of from the on-disk cache')
     parser.add_argument('--proxy-dl-video', dest='enable_proxy_dl_video', default=None, const='true', nargs='?',
                         type=lambda x: x.lower(), choices=['true', 'false'], help='specify whether the proxy should be used to download video contents')
 
+    parser.add_argument('--aria2-engine', dest='aria2_engine', default=None, type=lambda x: x.lower(), choices=['cli', 'rpc'],
+                        help='specify whether to run a one-off aria2c for every batch or to drive a long-lived aria2c over JSON-RPC')
     parser.add_argument('-A', '--aria2c', dest='aria2c', default=None, help='path to the aria2 executable')
     parser.add_argument('-F', '--ffmpeg', dest='ffmpeg', default=None, help='path to the ffmpeg executable')
     parser.add_argument('-M', '--mkvmerge', dest='mkvmerge', default=None, help='path to the mkvmerge executable')
@@ -159,15 +166,39 @@ def parse_dlops_default(args, confs):
         'merge_all': 'True',
         'ts_convert': 'True',
         'episode_batch_size': '2',
+        'extract_workers': '4',
+        'extract_rate': '0',
+        'pipelined_batches': 'False',
+        'pipeline_queue_size': '1',
         'proxy': '',
         'enable_proxy_dl_video': 'False',
         'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/148.0.0.0 Safari/537.36',
         'enable_vip_apis': 'False',
+        'http_cache': 'True',
+        'http_cache_dir': os.path.join(MOD_DIR, 'cache'),
+        'http_cache_size': '50M',
+        'host_stats': 'True',
+        'stats_dir': os.path.join(MOD_DIR, 'stats'),
+        'host_cooldown': '1800',
+        'host_max_error_rate': '0.5',
+        'host_min_speed_ratio': '0.1',
+        'server_stat_timeout': '86400',
         # Aria2:
+        'aria2_engine': 'cli',
+        'episode_retries': '1',
+        'range_merge_size': '32M',
+        'decrypt_workers': '0',
+        'decrypt_on_join': 'False',
+        'join_buffer_size': '1M',
+        'ffmpeg_concat_demuxer': 'False',
+        'progressive_join': 'False',
+        'join_workers': '0',
         'max_concurrent_downloads': '5',
         'min_split_size': '200K',
         'split': '10',
         'max_connection_per_server': '16',
+        'aria2_autotune': 'False',
+        'aria2_max_connections': '64',
         'retry_wait': '5',
         'lowest_speed_limit': '100K',
         'max_file_not_found': '10',
@@ -0,0 +1,243 @@
+import os
+import subprocess
+import socket
+import secrets
+import time
+import logging
+from itertools import count
+
+import requests
+
+from .utils import LogPipe
+
+
+class Aria2RPCError(Exception):
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code  # the JSON-RPC error code, if any
+
+
+class Aria2RPC(object):
+    """Minimal client of the aria2 JSON-RPC interface over HTTP.
+
+    References:
+        https://aria2.github.io/manual/en/html/aria2c.html#rpc-interface
+    """
+    def __init__(self, url, secret=None, timeout=10):
+        """
+        Args:
+            url (str): RPC endpoint, e.g. 'http://127.0.0.1:6800/jsonrpc'
+            secret (str): The `--rpc-secret` the aria2 server was started with, if any
+            timeout (float): Timeout in seconds of every RPC request
+        """
+        self.url = url
+        self.secret = secret
+        self.timeout = timeout
+
+        self._session = requests.Session()
+        self._session.trust_env = False  # never go through the system proxy for the local RPC server
+        self._ids = count(1)
+
+    def _token_params(self, params):
+        return ['token:' + self.secret] + list(params) if self.secret else list(params)
+
+    def _post(self, payload):
+        try:
+            r = self._session.post(self.url, json=payload, timeout=self.timeout)
+            return r.json()
+        except (requests.RequestException, ValueError) as e:
+            raise Aria2RPCError("RPC request to '{}' failed: {!r}".format(self.url, e))
+
+    def _request(self, method, params):
+        resp = self._post({'jsonrpc': '2.0', 'id': str(next(self._ids)), 'method': method, 'params': params})
+        if 'error' in resp:
+            raise Aria2RPCError("'{}' failed: {}".format(method, resp['error'].get('message')),
+                                code=resp['error'].get('code'))
+
+        return resp.get('result')
+
+    def call(self, method, *params):
+        return self._request(method, self._token_params(params))
+
+    def multicall(self, calls):
+        """Issue several method calls in a single round-trip via `system.multicall`.
+
+        Args:
+            calls (list): List of `(method, params)` tuples
+
+        Returns:
+            list: The result of each call in order, or an instance of :class:`Aria2RPCError` for the failed ones.
+        """
+        if not calls:
+            return []
+
+        # `system.multicall` itself takes no token, the secret goes with every nested call instead
+        methods = [{'methodName': method, 'params': self._token_params(params)} for method, params in calls]
+        results = self._request('system.multicall', [methods])
+
+        # a failed call comes as the JSON-RPC error object `{'code': ..., 'message': ...}` instead of `[result]`
+        return [res[0] if isinstance(res, list) else
+                Aria2RPCError("'{}' failed: {}".format(method, res.get('message')), code=res.get('code'))
+                for (method, _), res in zip(calls, results)]
+
+    def add_uris(self, jobs):
+        """Add downloads in one go.
+
+        Args:
+            jobs (list): List of `(uris, options)` tuples, where `uris` are the mirrors of the same file
+
+        Returns:
+            list: GID of each added download, or an instance of :class:`Aria2RPCError` for the rejected ones.
+        """
+        return self.multicall([('aria2.addUri', [uris, options]) for uris, options in jobs])
+
+    def change_global_option(self, options):
+        """Change the global options, e.g. `{'max-concurrent-downloads': '8'}`, of the running server."""
+        return self.call('aria2.changeGlobalOption', options)
+
+    def tell_status(self, gids, keys=('gid', 'status', 'errorCode', 'errorMessage')):
+        return self.multicall([('aria2.tellStatus', [gid, list(keys)]) for gid in gids])
+
+    def remove_download_results(self, gids):
+        return self.multicall([('aria2.removeDownloadResult', [gid]) for gid in gids])
+
+
+class Aria2Daemon(object):
+    """A long-lived `aria2c` process with the RPC interface enabled, to which the downloads are added on the fly."""
+
+    DONE_STATUSES = ('complete', 'error', 'removed')
+
+    def __init__(self, cmd, logger=None, poll_interval=0.5, startup_timeout=10):
+        """
+        Args:
+            cmd (list): The `aria2c` command line without any input file, whose options become the defaults of
+                all the downloads added later
+            logger (logging.Logger): Logger for the aria2c console output
+            poll_interval (float): Interval in seconds between polling the status of the unfinished downloads
+            startup_timeout (float): Time in seconds to wait for the RPC server to come up
+        """
+        self.cmd = cmd
+        self.poll_interval = poll_interval
+        self.startup_timeout = startup_timeout
+        self._logger = logger or logging.getLogger('.'.join(['MDL', 'Aria2Daemon']))
+
+        self.rpc = None
+        self._proc = None
+        self._log_pipe = None
+
+    @staticmethod
+    def _free_port():
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.bind(('127.0.0.1', 0))
+            return s.getsockname()[1]
+
+    def is_running(self):
+        return self._proc is not None and self._proc.poll() is None
+
+    def start(self):
+        """Spawn `aria2c` and wait for its RPC server to respond.
+
+        Raises:
+            OSError: Raised when `aria2c` could not be run or exited prematurely.
+        """
+        port = self._free_port()
+        secret = secrets.token_hex(16)
+        cmd = self.cmd + ['--enable-rpc', '--rpc-listen-all=false', '--rpc-listen-port={}'.format(port),
+                          '--rpc-secret={}'.format(secret), '--rpc-max-request-size=64M',
+                          '--max-download-result=100000', '--stop-with-process={}'.format(os.getpid())]
+
+        self._log_pipe = LogPipe(self._logger, logging.INFO, text=True)
+        try:
+            self._proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=self._log_pipe, stderr=subprocess.STDOUT)
+        except OSError:
+            self._log_pipe.close()
+            raise
+
+        self.rpc = Aria2RPC('http://127.0.0.1:{}/jsonrpc'.format(port), secret=secret)
+
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if self._proc.poll() is not None:
+                self._close_log_pipe()
+                raise OSError(-1, "aria2c exited with code {}".format(self._proc.returncode))
+            try:
+                self.rpc.call('aria2.getVersion')
+                return
+            except Aria2RPCError:
+                time.sleep(0.2)
+
+        self.shutdown()
+        raise OSError(-1, "aria2c RPC server did not respond within {}s".format(self.startup_timeout))
+
+    def wait(self, gids, on_done=None):
+        """Poll `aria2.tellStatus` until all the downloads identified by `gids` have stopped.
+
+        Args:
+            gids (list): GIDs of the downloads to wait for
+            on_done (callable): Called as `on_done(gid, status)` as soon as each download stops, where `status` is
+                the dict returned by `aria2.tellStatus`
+
+        Returns:
+            dict: The final status of each download, keyed by GID.
+        """
+        pending = list(gids)
+        statuses = {}
+        while pending:
+            if not self.is_running():
+                for gid in pending:
+                    statuses[gid] = {'gid': gid, 'status': 'error', 'errorMessage': 'aria2c exited'}
+                    if on_done:
+                        on_done(gid, statuses[gid])
+                break
+
+            try:
+                results = self.rpc.tell_status(pending)
+            except Aria2RPCError as e:
+                self._logger.warning("%s", e)
+                time.sleep(self.poll_interval)
+                continue
+
+            done, still = [], []
+            for gid, status in zip(pending, results):
+                if isinstance(status, Aria2RPCError):  # unknown GID, e.g. the result has been purged
+                    status = {'gid': gid, 'status': 'error', 'errorMessage': str(status)}
+                if status.get('status') in self.DONE_STATUSES:
+                    statuses[gid] = status
+                    done.append(gid)
+                else:
+                    still.append(gid)
+
+            if done:
+                try:
+                    self.rpc.remove_download_results(done)
+                except Aria2RPCError:
+                    pass
+                if on_done:
+                    for gid in done:
+                        on_done(gid, statuses[gid])
+
+            pending = still
+            if pending:
+                time.sleep(self.poll_interval)
+
+        return statuses
+
+    def _close_log_pipe(self):
+        if self._log_pipe is not None:
+            self._log_pipe.close()
+            self._log_pipe = None
+
+    def shutdown(self):
+        if self._proc is None:
+            return
+
+        if self._proc.poll() is None:
+            try:
+                self.rpc.call('aria2.forceShutdown')
+                self._proc.wait(timeout=5)
+            except (Aria2RPCError, subprocess.TimeoutExpired):
+                self._proc.terminate()
+                self._proc.wait()
+
+        self._close_log_pipe()
+        self._proc = None
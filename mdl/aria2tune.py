@@ -0,0 +1,175 @@
+"""Per-site and per-host tuning of the aria2 split, min-split-size and concurrency, persisted across runs.
+
+The total number of connections of a batch is tuned by hill climbing over :attr:`Aria2Tuner.LADDER` on the throughput
+measured for every batch, and is then shared out between the files and the pieces of every file by the segment size.
+"""
+import os
+import json
+import time
+import random
+import atexit
+import logging
+import threading
+from math import ceil
+
+from .utils import parse_size
+
+__all__ = ['Aria2Tuner']
+
+
+class Aria2Tuner(object):
+    """The best known number of connections of every site and host, as moving averages of the throughput of the batches
+    downloaded with each number tried, and the moving average of the segment size.
+
+    The number of connections of a batch is that of the best throughput so far, unless a neighbour of it on the ladder
+    hasn't been tried yet, or once in a while at random, so that the tuning follows the changes of the network.
+    """
+    LADDER = (1, 2, 4, 8, 16, 32, 64, 128, 256)  # numbers of connections tried
+    ALPHA = 0.3  # weight of the latest batch in the moving averages
+    EXPLORE = 0.1  # probability of trying a neighbour of the best number of connections
+    MIN_ELAPSED = 2.0  # shortest batch in seconds whose throughput counts
+
+    MAX_SPLIT = 16  # possible value for `--max-connection-per-server`: 1 - 16
+    MIN_SPLIT_SIZE, MAX_SPLIT_SIZE = 1 << 20, 1 << 30  # possible value for `--min-split-size`: 1M - 1024M
+
+    _instances = {}  # {path: Aria2Tuner}, shared by the downloads of all the sites
+    _instances_lock = threading.Lock()
+
+    def __init__(self, path, max_connections=64, logger=None):
+        """
+        Args:
+            path (str): The JSON file the tuning is loaded from and saved to
+            max_connections (int): Upper bound on the total number of connections of a batch
+            logger (logging.Logger): Logger for the choices and the persisting errors
+        """
+        self.path = path
+        self.max_connections = max(1, max_connections)
+        self._logger = logger or logging.getLogger('.'.join(['MDL', 'Aria2Tuner']))
+
+        self._lock = threading.Lock()
+        # {site: {host: {'seg_size': bytes, 'speeds': {connections: bytes per second}, 'updated': t}}}
+        self._sites = self._load()
+        self._dirty = False
+
+        atexit.register(self.save)
+
+    @classmethod
+    def from_confs(cls, confs, logger=None):
+        """Return the tuning shared by all the sites, as configured by the `aria2_*` options, or None if disabled."""
+        if not confs['aria2_autotune']:
+            return None
+
+        path = os.path.join(confs['stats_dir'], 'aria2_tuning.json')
+        with cls._instances_lock:
+            tuner = cls._instances.get(path)
+            if tuner is None:
+                tuner = cls._instances[path] = cls(path, max_connections=int(confs['aria2_max_connections']),
+                                                   logger=logger)
+
+        return tuner
+
+    def _load(self):
+        try:
+            with open(self.path, mode='r', encoding='utf-8') as fd:
+                sites = json.load(fd)
+            return sites if isinstance(sites, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            self._logger.warning("Failed to load the aria2 tuning from '%s': '%r'", self.path, e)
+            return {}
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps(self._sites, indent=1, sort_keys=True)
+            self._dirty = False
+
+        tmp_path = self.path + '.tmp'
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, mode='w', encoding='utf-8') as fd:
+                fd.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self._logger.warning("Failed to save the aria2 tuning to '%s': '%r'", self.path, e)
+
+    def _entry(self, site, host):
+        return self._sites.setdefault(site, {}).setdefault(host, {'seg_size': 0, 'speeds': {}, 'updated': 0})
+
+    def _connections(self, speeds, initial, usable):
+        """Climb the ladder, as far as the connections can be made use of by the batch."""
+        ladder = [conns for conns in self.LADDER if conns <= min(self.max_connections, usable)] or [self.LADDER[0]]
+        if not speeds:
+            return max([conns for conns in ladder if conns <= initial] or ladder[:1])
+
+        best = max(speeds, key=speeds.get)
+        if best not in ladder:
+            return ladder[-1]  # the best is beyond reach of the batch
+
+        pos = ladder.index(best)
+        neighbours = ladder[pos + 1:pos + 2] + ladder[max(pos - 1, 0):pos]
+        untried = [conns for conns in neighbours if conns not in speeds]
+        if untried:
+            return untried[0]
+        if neighbours and random.random() < self.EXPLORE:
+            return random.choice(neighbours)
+
+        return ladder[pos]
+
+    def choose(self, site, host, seg_size, n_files, initial, min_split_size, max_split=MAX_SPLIT):
+        """Choose the aria2 options of a batch of `n_files` files of about `seg_size` bytes each.
+
+        Args:
+            site (str): Name of the site, i.e. `vc_name`
+            host (str): The host most of the files are downloaded from
+            seg_size (int): Typical size of the files in bytes, 0 if unknown, in which case the learned one is used
+            n_files (int): Number of the files of the batch
+            initial (int): Number of connections to start with for a site and host never tuned, e.g. as configured
+            min_split_size (str): The smallest piece a file is split into, e.g. '2M', which is 1M at least
+            max_split (int): Upper bound on the connections of a single file, i.e. `max_connection_per_server`
+
+        Returns:
+            dict: Values of the options 'max_concurrent_downloads', 'split', 'min_split_size' and
+                'max_connection_per_server' as strings, and the number of 'connections' they make up, for which the
+                throughput of the batch is recorded, or None if the segment size is unknown.
+        """
+        with self._lock:
+            entry = self._sites.get(site, {}).get(host, {})
+            speeds = {int(conns): speed for conns, speed in entry.get('speeds', {}).items()}
+            seg_size = seg_size or entry.get('seg_size', 0)
+        if not seg_size or not n_files:
+            return None
+
+        # the files smaller than two pieces are downloaded in one go, the connections go to more files at a time instead
+        mss = max(self.MIN_SPLIT_SIZE, parse_size(min_split_size.upper()))
+        max_split = int(max(1, min(max_split, self.MAX_SPLIT, seg_size // max(mss, 1))))
+        conns = self._connections(speeds, initial, n_files * max_split)
+        split = min(conns, max_split)
+        mss = min(self.MAX_SPLIT_SIZE, max(mss, ceil(seg_size / split / 1024) * 1024))  # even pieces
+        mcd = ceil(conns / split)
+
+        self._logger.debug("aria2 tuning of '%s' on '%s' for %d file(s) of %d bytes: %d connection(s) as -j %d -s %d "
+                           "-k %d", site, host, n_files, seg_size, conns, mcd, split, mss)
+
+        return {'max_concurrent_downloads': str(mcd), 'split': str(split), 'min_split_size': '{}K'.format(mss // 1024),
+                'max_connection_per_server': str(split), 'connections': conns}
+
+    def record(self, site, host, connections, size, elapsed, seg_size=0):
+        """Record the throughput of a batch of `size` bytes downloaded in `elapsed` seconds with `connections`
+        connections in all, unless too short to tell, and the typical size of its files if known."""
+        if not (site and host):
+            return
+
+        with self._lock:
+            entry = self._entry(site, host)
+            if elapsed >= self.MIN_ELAPSED:
+                key, speed = str(connections), size / elapsed
+                last = entry['speeds'].get(key)
+                entry['speeds'][key] = speed if last is None else last + self.ALPHA * (speed - last)
+            if seg_size:
+                entry['seg_size'] = int(seg_size if not entry['seg_size'] else
+                                        entry['seg_size'] + self.ALPHA * (seg_size - entry['seg_size']))
+            entry['updated'] = time.time()
+            self._dirty = True
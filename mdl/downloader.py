@@ -1,4 +1,6 @@
 import os
+import sys
+import stat
 import subprocess
 import shutil
 import errno
@@ -7,17 +9,33 @@ from math import trunc, log10, ceil
 import random
 from pathlib import Path
 import glob
+import time
+import queue
+import threading
+from collections import Counter, deque
+from contextlib import ExitStack
+from statistics import median
+from concurrent.futures import ThreadPoolExecutor
 
 from certifi import where
+from requests import RequestException
+from bdownload.download import requests_retry_session
 from Crypto.Cipher import AES
 from Crypto.Util.Padding import unpad
 
 from .commons import pick_highest_definition, VideoTypes, DEFAULT_YEAR
 from .sites import get_all_sites_vcs
-from .utils import logging_with_pipe, normalize_filename, json_path_get
+from .pipeline import Pipeline
+from .aria2rpc import Aria2Daemon, Aria2RPCError
+from .aria2tune import Aria2Tuner
+from .hoststats import HostStats, host_of
+from .joiner import ProgressiveJoiner, TSFileSink, FFmpegSink
+from .utils import logging_with_pipe, normalize_filename, json_path_get, parse_size, is_rotational_disk
 
 
 class MDownloader(object):
+    _DECRYPTED_MARKER = '.decrypted'  # lists the segments of an episode directory decrypted in place
+
     def __init__(self, args=None, confs=None):
         self._vcs = get_all_sites_vcs()
         self.args = args
@@ -26,7 +44,19 @@ class MDownloader(object):
         logger_name = '.'.join(['MDL', 'MDownloader'])  # 'MDL.MDownloader'
         self._logger = logging.getLogger(logger_name)
 
+        self._aria2_daemons = {}  # {vc_name: Aria2Daemon}, used when `aria2_engine` is 'rpc'
+        self._aria2_started = {}  # {vc_name: start time of the daemon}
+        # episode dirs already merged while being downloaded, see `progressive_join` and `_finish_episode`
+        self._joined_episodes = set()
+        self._decrypted_lock = threading.Lock()  # guards the appending to the `_DECRYPTED_MARKER` files
+
     def download(self):
+        try:
+            self._download()
+        finally:
+            self._shutdown_aria2_daemons()
+
+    def _download(self):
         for url in self.args['url']:
             vci = self.get_video_extractor(url)
             if not vci:
@@ -40,19 +70,43 @@ class MDownloader(object):
 
             # download the list of videos in batches, instead of all at once
             batch_size = int(vci.confs['episode_batch_size'])
-            batch_cover_info = cover_info.copy()
             video_list = cover_info['normal_ids']
+            batches = (dict(cover_info, normal_ids=video_list[batch_start:batch_start + batch_size])
+                       for batch_start in range(0, len(video_list), batch_size))
 
-            for batch_start in range(0, len(video_list), batch_size):
-                batch_cover_info['normal_ids'] = video_list[batch_start:batch_start + batch_size]
+            if vci.confs['pipelined_batches']:
+                self._download_pipelined(vci, batches)
+                continue
 
+            for batch_cover_info in batches:
                 vci.update_cover_dwnld_info(batch_cover_info)
                 cover_dir, episodes = self.dwnld_videos_with_aria2(batch_cover_info, vci.confs)
 
-                self.decrypt_videos(cover_dir, episodes)
+                self.decrypt_videos(cover_dir, episodes, vci.confs)
 
                 self.join_videos(cover_dir, episodes, vci.confs)
 
+    def _download_pipelined(self, vci, batches):
+        """Overlap the batches: extract and download batch N+1 while batch N is being decrypted and joined."""
+        def extract(batch_cover_info):
+            vci.update_cover_dwnld_info(batch_cover_info)
+            return batch_cover_info
+
+        def download(batch_cover_info):
+            cover_dir, episodes = self.dwnld_videos_with_aria2(batch_cover_info, vci.confs)
+            return (cover_dir, episodes) if episodes else None
+
+        def decrypt(batch):
+            self.decrypt_videos(*batch, vci.confs)
+            return batch
+
+        def join(batch):
+            self.join_videos(*batch, vci.confs)
+
+        stages = [('extract', extract), ('download', download), ('decrypt', decrypt), ('join', join)]
+        pipeline = Pipeline(stages, maxsize=int(vci.confs['pipeline_queue_size']), logger=self._logger)
+        pipeline.run(batches)
+
     def get_video_extractor(self, url):
         for name, vc in self._vcs.items():
             vcc = vc['class']
@@ -70,7 +124,7 @@ class MDownloader(object):
     @staticmethod
     def _rand_min_split_size(mss, fallback=False):
         mss = mss.upper()
-        bytes = 1024 * int(mss[:-1]) if mss[-1] == 'K' else 1024 * 1024 * int(mss[:-1]) if mss[-1] == 'M' else int(mss)
+        bytes = parse_size(mss)
         if bytes >= 1 << 30:
             return mss
 
@@ -83,15 +137,21 @@ class MDownloader(object):
 
         return str(min(1 << 30, bytes))
 
-    def _cmd_aria2c(self, cover_info):
+    def _cmd_aria2c(self, cover_info, tuning=None):
+        """Return the aria2c command, with the augmented options, and the fallback one with standard options only.
+
+        :param tuning: the values of `max_concurrent_downloads`, `split`, `min_split_size` and
+            `max_connection_per_server` chosen for the batch by :class:`Aria2Tuner` in place of the configured ones, if any
+        """
         aria2c = self.confs['progs']['aria2c']
         user_agent = self.confs[cover_info['vc_name']]['user_agent']
         proxy = self.confs[cover_info['vc_name']]['proxy'] \
             if self.confs[cover_info['vc_name']]['enable_proxy_dl_video'] else ''
-        mcd = self.confs[cover_info['vc_name']]['max_concurrent_downloads']
-        mss = self._rand_min_split_size(self.confs[cover_info['vc_name']]['min_split_size'])
-        split = self.confs[cover_info['vc_name']]['split']
-        mcps = self.confs[cover_info['vc_name']]['max_connection_per_server']
+        tuned = tuning or self.confs[cover_info['vc_name']]
+        mcd = tuned['max_concurrent_downloads']
+        mss = self._rand_min_split_size(tuned['min_split_size'])
+        split = tuned['split']
+        mcps = tuned['max_connection_per_server']
         mfnf = self.confs[cover_info['vc_name']]['max_file_not_found']
         max_tries = self.confs[cover_info['vc_name']]['max_tries']
         retry_wait = self.confs[cover_info['vc_name']]['retry_wait']
@@ -117,12 +177,235 @@ class MDownloader(object):
         # fallback cmd with standard options/values only
         fallback_aria2c = cmd_aria2c.copy()
         fallback_aria2c = fallback_aria2c[:-6]  # remove the augmented retry-on options
-        fallback_aria2c[5] = self._rand_min_split_size(self.confs[cover_info['vc_name']]['min_split_size'],
+        fallback_aria2c[5] = self._rand_min_split_size(tuned['min_split_size'],
                                                        fallback=True)  # possible value for `--min-split-size`: 1M - 1024M
         fallback_aria2c[9] = "16" if int(mcps) > 16 else mcps  # possible value for `--max-connection-per-server`: 1 - 16
 
+        # the mirror speeds learned by `--uri-selector=adaptive` are carried over to the next batches and runs
+        server_stat_opts = self._server_stat_opts(self.confs[cover_info['vc_name']], cover_info['vc_name'])
+        cmd_aria2c += server_stat_opts
+        fallback_aria2c += server_stat_opts
+
         return cmd_aria2c, fallback_aria2c
 
+    @staticmethod
+    def _server_stat_file(vc_confs, vc_name):
+        """The aria2 server performance profile of the site, kept across the batches and the runs, or None if neither
+        `server_stat_timeout` nor `host_stats` is on."""
+        if not (int(vc_confs['server_stat_timeout']) or vc_confs['host_stats']):
+            return None
+
+        return os.path.join(vc_confs['stats_dir'], 'aria2-server-stat.' + vc_name)
+
+    def _server_stat_opts(self, vc_confs, vc_name):
+        """The options by which aria2 starts on the server performance profile saved by the previous aria2 runs of the
+        site, if not older than `server_stat_timeout`, and saves it back on exit."""
+        path = self._server_stat_file(vc_confs, vc_name)
+        if not path:
+            return []
+
+        try:
+            os.makedirs(vc_confs['stats_dir'], exist_ok=True)
+        except OSError as e:
+            self._logger.warning("Failed to create the stats directory '%s': '%r'", vc_confs['stats_dir'], e)
+            return []
+
+        timeout = int(vc_confs['server_stat_timeout'])
+        opts = ['--server-stat-of=' + path]
+        if timeout and os.path.isfile(path):
+            opts += ['--server-stat-if=' + path, '--server-stat-timeout=' + str(timeout)]
+
+        return opts
+
+    def _ingest_server_stat(self, vc_confs, vc_name, since):
+        """Update the host statistics from the server performance profile saved by aria2 since the time `since`."""
+        host_stats = HostStats.from_confs(vc_confs, logger=self._logger)
+        path = self._server_stat_file(vc_confs, vc_name)
+        if host_stats and path:
+            host_stats.ingest_aria2_server_stat(path, since=since)
+            host_stats.save()
+
+    def _get_aria2_daemon(self, cover_info):
+        vc_name = cover_info['vc_name']
+        daemon = self._aria2_daemons.get(vc_name)
+        if daemon and daemon.is_running():
+            return daemon
+
+        for cmd_aria2c in self._cmd_aria2c(cover_info):
+            # the referer and the input file are given along with every download added via RPC
+            referer_pos = cmd_aria2c.index('--referer')
+            cmd_daemon = [opt for opt in cmd_aria2c[:referer_pos] + cmd_aria2c[referer_pos + 2:] if opt != '-i-']
+
+            daemon = Aria2Daemon(cmd_daemon, logger=self._logger)
+            try:
+                daemon.start()
+                self._aria2_daemons[vc_name] = daemon
+                self._aria2_started[vc_name] = int(time.time())  # the server stat is saved as it shuts down
+                return daemon
+            except OSError as e:
+                self._logger.error("Error while starting the 'aria2c' RPC server. OS error number {}: '{}'\n"
+                                   "Trying to fall back on standard options...\n".format(e.errno, e.strerror))
+
+    def _shutdown_aria2_daemons(self):
+        for vc_name, daemon in self._aria2_daemons.items():
+            daemon.shutdown()
+            self._ingest_server_stat(self.confs[vc_name], vc_name, self._aria2_started.pop(vc_name, 0))
+        self._aria2_daemons.clear()
+
+    def _dwnld_with_aria2_rpc(self, daemon, cover_info, episodes, jobs, on_episode_done=None, on_segment_done=None,
+                              tuning=None):
+        """Add all the segments to the aria2 RPC server, and track the completion of each one by its GID.
+
+        :param jobs: [(episode_index, [mirror_url1, mirror_url2], fname), ]
+        :param on_episode_done: called with the item of `episodes` as soon as all of its segments have been downloaded
+        :param on_segment_done: called with the index into `episodes` as soon as any of its segments has been downloaded
+        :param tuning: the aria2 options chosen for the batch by :class:`Aria2Tuner`, if any
+        :returns: set of the indices into `episodes` of the completely downloaded episodes
+        """
+        options = {'referer': cover_info['referrer']}
+        if tuning:
+            # the server may run with the standard options only, whose ranges the tuned values are kept within
+            options.update({'split': tuning['split'], 'max-connection-per-server': tuning['max_connection_per_server'],
+                            'min-split-size': self._rand_min_split_size(tuning['min_split_size'], fallback=True)})
+            try:
+                daemon.rpc.change_global_option({'max-concurrent-downloads': tuning['max_concurrent_downloads']})
+            except Aria2RPCError as e:
+                self._logger.warning("Failed to change the concurrency of aria2: '%s'", e)
+
+        add_jobs = [(uris, dict(options, dir=episodes[ep_idx][0], out=fname)) for ep_idx, uris, fname in jobs]
+        try:
+            gids = daemon.rpc.add_uris(add_jobs)
+        except Aria2RPCError as e:
+            self._logger.error("Failed to add the downloads to aria2: '%s'", e)
+            return set()
+
+        remaining = [0] * len(episodes)
+        failed = set()
+        gid2ep = {}
+        for (ep_idx, uris, fname), gid in zip(jobs, gids):
+            if isinstance(gid, Aria2RPCError):
+                self._logger.error("Failed to add '%s' to aria2: '%s'", fname, gid)
+                failed.add(ep_idx)
+                continue
+            gid2ep[gid] = ep_idx
+            remaining[ep_idx] += 1
+
+        completed = set()
+
+        def on_done(gid, status):
+            ep_idx = gid2ep[gid]
+            if status['status'] == 'complete' and on_segment_done:
+                on_segment_done(ep_idx)
+            if status['status'] != 'complete':
+                if ep_idx not in failed:
+                    self._logger.warning("Download of '%s' failed: '%s'", episodes[ep_idx][0], status.get('errorMessage'))
+                failed.add(ep_idx)
+            remaining[ep_idx] -= 1
+            if not remaining[ep_idx] and ep_idx not in failed:
+                completed.add(ep_idx)
+                if on_episode_done:
+                    on_episode_done(episodes[ep_idx])
+
+        daemon.wait(list(gid2ep), on_done=on_done)
+
+        return completed
+
+    def _probe_segment_size(self, cover_info, vc_confs, jobs, samples=3):
+        """The median size of a few of the segments of `jobs` spread over the batch, by HEAD requests, 0 if unknown."""
+        picked = [uris[0] for _, uris, _ in jobs[::max(1, ceil(len(jobs) / samples))]]
+
+        def head(url):
+            try:
+                r = session.head(url, allow_redirects=True)
+                return int(r.headers.get('Content-Length') or 0) if r.ok else 0
+            except (RequestException, ValueError):
+                return 0
+
+        session = self._new_session(cover_info, vc_confs)
+        with session, ThreadPoolExecutor(max_workers=len(picked), thread_name_prefix='mdl-probe') as executor:
+            sizes = [size for size in executor.map(head, picked) if size]
+
+        return int(median(sizes)) if sizes else 0
+
+    def _dwnld_segments_autotuned(self, cover_info, vc_confs, episodes, jobs, on_segment_done=None,
+                                  on_episode_done=None):
+        """Download the segments by aria2 with the options chosen by :class:`Aria2Tuner` for the site, the host most of
+        them are downloaded from and their size, if `aria2_autotune`, recording the throughput of the batch for the
+        next ones."""
+        tuner = Aria2Tuner.from_confs(vc_confs, logger=self._logger)
+        if not (tuner and jobs):
+            self._dwnld_segments_with_aria2(cover_info, vc_confs, episodes, jobs, on_segment_done=on_segment_done,
+                                            on_episode_done=on_episode_done)
+            return
+
+        vc_name = cover_info['vc_name']
+        host = Counter(host_of(uris[0]) for _, uris, _ in jobs).most_common(1)[0][0]
+        seg_size = self._probe_segment_size(cover_info, vc_confs, jobs)
+        tuning = tuner.choose(vc_name, host, seg_size, len(jobs),
+                              int(vc_confs['max_concurrent_downloads']) * int(vc_confs['split']),
+                              vc_confs['min_split_size'], max_split=int(vc_confs['max_connection_per_server']))
+        if tuning:
+            self._logger.info("Downloading %d segment(s) from '%s' with %s connection(s): -j %s -s %s -k %s", len(jobs),
+                              host, tuning['connections'], tuning['max_concurrent_downloads'], tuning['split'],
+                              tuning['min_split_size'])
+
+        start = time.monotonic()
+        self._dwnld_segments_with_aria2(cover_info, vc_confs, episodes, jobs, on_segment_done=on_segment_done,
+                                        on_episode_done=on_episode_done, tuning=tuning)
+        elapsed = time.monotonic() - start
+
+        if tuning:
+            size = sum(os.path.getsize(os.path.join(episodes[ep_idx][0], fname)) for ep_idx, _, fname in jobs
+                       if self._is_downloaded(episodes[ep_idx][0], fname))
+            tuner.record(vc_name, host, tuning['connections'], size, elapsed, seg_size=seg_size)
+            tuner.save()
+
+    def _dwnld_segments_with_aria2(self, cover_info, vc_confs, episodes, jobs, on_segment_done=None,
+                                   on_episode_done=None, tuning=None):
+        """Download the segments of `jobs` by aria2, over RPC if `aria2_engine` is 'rpc', in which case every episode
+        whose segments of `jobs` have all been downloaded is handed to `on_episode_done` at once."""
+        if vc_confs['aria2_engine'] == 'rpc':
+            daemon = self._get_aria2_daemon(cover_info)
+            if daemon:
+                self._dwnld_with_aria2_rpc(daemon, cover_info, episodes, jobs, on_episode_done=on_episode_done,
+                                           on_segment_done=on_segment_done, tuning=tuning)
+                return
+
+            self._logger.warning("The 'aria2c' RPC server is unavailable, downloading with 'aria2c' one-off instead")
+
+        # URLs file info for aria2c
+        urllist = '\n'.join('{}\n  dir={}\n  out={}'.format('\t'.join(uris), episodes[ep_idx][0], fname)
+                            for ep_idx, uris, fname in jobs)
+
+        cmd_aria2c, fallback_aria2c = self._cmd_aria2c(cover_info, tuning)
+        started = int(time.time())
+        for _ in range(2):
+            try:
+                with logging_with_pipe(self._logger, level=logging.INFO, text=True) as log_pipe:
+                    with subprocess.Popen(cmd_aria2c, bufsize=1, universal_newlines=True, encoding='utf-8',
+                                          stdin=subprocess.PIPE, stdout=log_pipe, stderr=subprocess.STDOUT) as proc:
+                        proc.stdin.write(urllist)
+                        proc.stdin.close()
+
+                # the outcome of every single segment is checked against the files on disk by the caller
+                if proc.returncode:
+                    self._logger.warning("'aria2c' exited with code %i", proc.returncode)
+                break
+            except OSError as e:
+                if cmd_aria2c is not fallback_aria2c:
+                    self._logger.error("Error while running 'aria2c' with augmented options. OS error number {}: '{}'\n"
+                                       "Trying to fall back on standard options...\n".format(e.errno, e.strerror))
+
+                    cmd_aria2c = fallback_aria2c
+
+        self._ingest_server_stat(vc_confs, cover_info['vc_name'], started)
+
+    @staticmethod
+    def _is_downloaded(episode_dir, fname):
+        """A segment is done once it's on disk without the accompanying aria2 control file."""
+        fn_abs = os.path.join(episode_dir, fname)
+        return os.path.isfile(fn_abs) and not os.path.exists(fn_abs + '.aria2')
+
     @staticmethod
     def _rm_failed_pieces(episode_dir, pattern='*.aria2'):
         f_progresses = [str(p) for p in Path(episode_dir).glob(pattern)]
@@ -132,6 +415,206 @@ class MDownloader(object):
                 os.remove(f_failed)
             os.remove(f_progress)
 
+    def _dwnld_segments_with_retries(self, cover_info, vc_confs, episodes, jobs, on_segment_done=None, range_jobs=(),
+                                     on_episode_done=None):
+        """Download the segments of `jobs` by aria2, and the byte-range ones of `range_jobs` by ranged requests,
+        retrying the failed ones up to `episode_retries` times.
+
+        :param range_jobs: [(episode_index, url, fname, length, offset), ] in the order of the segments
+        :param on_episode_done: see :meth:`_dwnld_segments_with_aria2`, not to be given for the episodes of any
+            `range_jobs`
+        :returns: the jobs and the range jobs of the segments failed after all
+        """
+        pending, range_pending = jobs, range_jobs
+        for attempt in range(1 + int(vc_confs['episode_retries'])):
+            if not (pending or range_pending):
+                break
+            if attempt:
+                self._logger.warning("Retrying %d segment(s) of %d failed episode(s)...", len(pending) + len(range_pending),
+                                     len({job[0] for job in pending} | {job[0] for job in range_pending}))
+
+            if pending:
+                self._dwnld_segments_autotuned(cover_info, vc_confs, episodes, pending, on_segment_done=on_segment_done,
+                                               on_episode_done=on_episode_done)
+                pending = [job for job in pending if not self._is_downloaded(episodes[job[0]][0], job[2])]
+            if range_pending:
+                self._dwnld_ranges(cover_info, vc_confs, episodes, range_pending, on_segment_done=on_segment_done)
+                range_pending = [job for job in range_pending if not self._is_downloaded(episodes[job[0]][0], job[2])]
+
+        return list(pending) + list(range_pending)
+
+    @staticmethod
+    def _new_session(cover_info, vc_confs):
+        return requests_retry_session(verify=vc_confs['ca_cert'] or True, user_agent=vc_confs['user_agent'],
+                                      referrer=cover_info['referrer'],
+                                      proxy=vc_confs['proxy'] if vc_confs['enable_proxy_dl_video'] else None)
+
+    @staticmethod
+    def _coalesce_ranges(range_jobs, max_size):
+        """Merge the byte ranges of the consecutive segments that are adjacent or overlapping in the same resource into
+        single requests of `max_size` bytes at most, unless a single range is larger.
+
+        :param range_jobs: [(episode_index, url, fname, length, offset), ] in the order of the segments
+        :returns: [(episode_index, url, offset, [(fname1, offset1, length1), (fname2, offset2, length2)]), ], the parts
+            of every request in the ascending order of their offsets
+        """
+        merged = []  # [[episode_index, url, offset, end, parts], ]
+        for ep_idx, url, fname, length, offset in range_jobs:
+            if merged:
+                last = merged[-1]
+                end = max(last[3], offset + length)
+                if last[0] == ep_idx and last[1] == url and last[4][-1][1] <= offset <= last[3] and \
+                        end - last[2] <= max_size:
+                    last[3] = end
+                    last[4].append((fname, offset, length))
+                    continue
+            merged.append([ep_idx, url, offset, offset + length, [(fname, offset, length)]])
+
+        return [(ep_idx, url, offset, parts) for ep_idx, url, offset, _, parts in merged]
+
+    def _fetch_range(self, session, episode_dir, url, offset, parts, chunk_size=1 << 20):
+        """Fetch the merged byte range from `offset` on of `url`, splitting it into the segment files of `parts` as it
+        streams in, every overlapping part getting its copy of the bytes it shares with the others. Every segment file
+        is written under a temporary name and renamed when complete, so that it counts as downloaded only then.
+
+        :returns: the number of the segments of `parts` fetched
+        """
+        end = max(part_offset + length for _, part_offset, length in parts) - 1
+        pending = deque(parts)
+        active = []  # [(file, fn_abs, first, end), ] of the parts being written
+        done = 0
+        try:
+            with ExitStack() as files, \
+                    session.get(url, headers={'Range': 'bytes={}-{}'.format(offset, end)}, stream=True) as r:
+                if r.status_code not in (200, 206):
+                    raise RequestException("Unexpected status code %i" % r.status_code)
+                pos = offset if r.status_code == 206 else 0  # the range is ignored by the server on 200
+
+                for chunk in r.iter_content(chunk_size):
+                    chunk, chunk_end = memoryview(chunk), pos + len(chunk)
+                    while pending and pending[0][1] < chunk_end:
+                        fname, first, length = pending.popleft()
+                        fn_abs = os.path.join(episode_dir, fname)
+                        f = files.enter_context(open(fn_abs + '.part', 'wb'))
+                        active.append((f, fn_abs, first, first + length))
+
+                    for part in list(active):
+                        f, fn_abs, first, part_end = part
+                        f.write(chunk[max(first, pos) - pos:min(part_end, chunk_end) - pos])
+                        if part_end <= chunk_end:
+                            f.close()
+                            os.replace(fn_abs + '.part', fn_abs)
+                            active.remove(part)
+                            done += 1
+
+                    pos = chunk_end
+                    if not (pending or active):
+                        break
+                else:
+                    self._logger.error("Byte range %d-%d of '%s' is truncated", offset, end, url)
+        except (RequestException, OSError) as e:
+            self._logger.error("Failed to fetch the byte range %d-%d of '%s': '%r'", offset, end, url, e)
+
+        return done
+
+    def _dwnld_ranges(self, cover_info, vc_confs, episodes, range_jobs, on_segment_done=None):
+        """Download the byte-range segments by ranged requests, coalescing the adjacent ranges of the same resource,
+        `max_concurrent_downloads` requests at a time. Aria2 takes care of the Range headers of a download by itself, so
+        it can't be given a byte range to fetch."""
+        merged = self._coalesce_ranges(range_jobs, parse_size(vc_confs['range_merge_size']))
+        self._logger.info("Downloading %d byte-range segment(s) by %d request(s)...", len(range_jobs), len(merged))
+
+        session = self._new_session(cover_info, vc_confs)
+        chunk_size = parse_size(vc_confs['join_buffer_size'])
+
+        host_stats = HostStats.from_confs(vc_confs, logger=self._logger)
+
+        def fetch(ep_idx, url, offset, parts):
+            episode_dir = episodes[ep_idx][0]
+            os.makedirs(episode_dir, exist_ok=True)
+            start = time.monotonic()
+            done = self._fetch_range(session, episode_dir, url, offset, parts, chunk_size)
+            if host_stats:
+                size = sum(length for _, _, length in parts[:done])
+                host_stats.record(host_of(url), speed=size / max(time.monotonic() - start, 1e-3),
+                                  ok=done == len(parts))
+            if done and on_segment_done:
+                on_segment_done(ep_idx)
+
+        workers = max(1, min(int(vc_confs['max_concurrent_downloads']), len(merged)))
+        with session, ThreadPoolExecutor(max_workers=workers, thread_name_prefix='mdl-range') as executor:
+            for future in [executor.submit(fetch, *job) for job in merged]:
+                future.result()
+        if host_stats:
+            host_stats.save()
+
+    def _start_live_feeds(self, live_feeds):
+        """Pull the new segments of every live episode on its own thread, so that the playlists are kept being reloaded
+        while the segments are being downloaded.
+
+        :param live_feeds: {episode_index: (generator of ([url1, url2], seckeys, byteranges), ext)}
+        :returns: queue.Queue of (episode_index, [url1, url2], seckeys, byteranges), with None put by every feed as it
+            ends
+        """
+        batches = queue.Queue()
+
+        def pull(ep_idx, feed):
+            try:
+                for urls, seckeys, byteranges in feed:
+                    batches.put((ep_idx, urls, seckeys, byteranges))
+            except Exception as e:
+                self._logger.error("Following the live playlist of episode %d failed: '%r'", ep_idx, e)
+            finally:
+                batches.put(None)
+
+        for ep_idx, (feed, _) in live_feeds.items():
+            threading.Thread(target=pull, args=(ep_idx, feed), name='mdl-live-{}'.format(ep_idx), daemon=True).start()
+
+        return batches
+
+    def _dwnld_live_segments(self, cover_info, vc_confs, episodes, live_feeds, batches, on_segment_done=None):
+        """Download the new segments of the live episodes as soon as they turn up, till all the feeds have ended. The
+        file names of the new segments are appended to the episodes in place.
+
+        :param batches: see :meth:`_start_live_feeds`
+        :returns: the jobs of the segments failed after all
+        """
+        failed = []
+        n_feeds = len(live_feeds)
+        while n_feeds:
+            # whatever has turned up in the meantime goes to aria2 at once
+            new = [batches.get()]
+            while True:
+                try:
+                    new.append(batches.get_nowait())
+                except queue.Empty:
+                    break
+
+            jobs, range_jobs = [], []
+            for batch in new:
+                if batch is None:
+                    n_feeds -= 1
+                    continue
+
+                ep_idx, urls, seckeys, byteranges = batch
+                episode_dir, fnames, _ = episodes[ep_idx]
+                episodes[ep_idx] = (episode_dir, fnames, seckeys)  # SeckeyRanges may come with the first key only
+                ext = live_feeds[ep_idx][1]
+                for idx, url in enumerate(urls):
+                    fname = "seg_{:04}.{}".format(len(fnames), ext)
+                    fnames.append(fname)
+                    if byteranges and byteranges[idx]:
+                        range_jobs.append((ep_idx, url, fname) + byteranges[idx])
+                    else:
+                        jobs.append((ep_idx, url.split('\t'), fname))
+
+            if jobs or range_jobs:
+                self._logger.info("Downloading %d new live segment(s)...", len(jobs) + len(range_jobs))
+                failed += self._dwnld_segments_with_retries(cover_info, vc_confs, episodes, jobs, on_segment_done,
+                                                            range_jobs)
+
+        return failed
+
     def _determine_ep_naming_fmt(self, cover_info):
         width = 2  # default episode numbering format width
         total_ep = cover_info.get('episode_all')
@@ -170,10 +653,47 @@ class MDownloader(object):
 
         return episode_default_dir, episode_dir
 
+    def _start_progressive_joins(self, cover_dir, episodes, vc_confs, exclude=()):
+        """Start merging every TS episode in the background while it's being downloaded, when `progressive_join` is on.
+        The encrypted segments are decrypted on the fly, and any episode failed to be joined this way is left to
+        `join_videos` as usual, so are the episodes of the indices in `exclude`, e.g. the live ones still growing.
+
+        :returns: {episode_index: ProgressiveJoiner}
+        """
+        joiners = {}
+        if not (vc_confs['merge_all'] and vc_confs['progressive_join']):
+            return joiners
+
+        chunk_size = max(AES.block_size, parse_size(vc_confs['join_buffer_size']))  # an empty buffer would copy nothing
+        os.makedirs(cover_dir, exist_ok=True)
+        for ep_idx, (episode_dir, fnames, seckeys) in enumerate(episodes):
+            if ep_idx in exclude:
+                continue
+            if not fnames[0].endswith('.ts'):
+                continue  # mkvmerge takes the whole list of the segments at once
+
+            if vc_confs['ts_convert']:
+                episode_name = episode_dir + '.mp4'
+                cmd_ffmpeg = self._cmd_ffmpeg_pipe(episode_name)
+
+                def open_sink(cmd_ffmpeg=cmd_ffmpeg, episode_name=episode_name):
+                    return FFmpegSink(cmd_ffmpeg, episode_name, self._logger)
+            else:
+                def open_sink(episode_name=episode_dir + '.ts'):
+                    return TSFileSink(episode_name)
+
+            joiner = ProgressiveJoiner(episode_dir, fnames, seckeys, open_sink, self._write_segment, self._is_downloaded,
+                                       chunk_size=chunk_size, logger=self._logger)
+            joiner.start()
+            joiners[ep_idx] = joiner
+
+        return joiners
+
     def dwnld_videos_with_aria2(self, cover_info, vc_confs):
         """
         :returns:
-        (abs_cover_dir, [(abs_episode1_dir, [fname1.1.mp4, fname1.2.mp4]),(abs_episode2_dir, [fname2.1.mp4, fname2.2.mp4])])
+        (abs_cover_dir, [(abs_episode1_dir, [fname1.1.mp4, fname1.2.mp4]),(abs_episode2_dir, [fname2.1.mp4, fname2.2.mp4])]),
+        where only the completely downloaded episodes are included
         """
         def pick_format(formats):
             for fmt in formats:
@@ -188,8 +708,10 @@ class MDownloader(object):
             orig_defn = vc_confs['definition']
             ts_convert = vc_confs['ts_convert']
 
-            urls = []  # URLs file info for aria2c
+            jobs = []  # [(episode_index, [mirror_url1, mirror_url2], fname), ]
+            range_jobs = []  # [(episode_index, url, fname, length, offset), ] of the byte-range segments
             episodes = []  # [(abs_episode1_dir, [fname1.1.mp4, fname1.2.mp4]), ]
+            live_feeds = {}  # {episode_index: (generator of the new segments of the live playlist, ext)}
 
             cover_name, cover_dir = self._cover_naming(cover_info, save_dir)
             ep_fmt_numbering, ep_fmt_width = self._determine_ep_naming_fmt(cover_info)
@@ -217,40 +739,75 @@ class MDownloader(object):
                         continue
                     self._rm_failed_pieces(episode_dir)
 
+                    live = format.get('live')
+                    if live:
+                        # the segments of a live playlist left over by the previous run belong to another time window
+                        shutil.rmtree(episode_dir, ignore_errors=True)
+                        live_feeds[len(episodes)] = (live, ext)
+
                     fnames = []
+                    byteranges = format.get('byteranges')  # (length, offset) or None of every segment, if any
                     for idx, url in enumerate(format['urls']):
                         # fname ~ seg_0000.mp4 seg_0001.mp4 seg_0002.mp4 ...
                         fname = "seg_{:04}.{}".format(idx, ext)
                         fnames.append(fname)
-                        urls.append('{}\n  dir={}\n  out={}'.format(url, episode_dir, fname))
+                        if self._is_downloaded(episode_dir, fname):
+                            continue  # left over by the previous run, no need to download it again
+                        if byteranges and byteranges[idx]:
+                            range_jobs.append((len(episodes), url, fname) + byteranges[idx])
+                        else:
+                            jobs.append((len(episodes), url.split('\t'), fname))
 
-                    seckeys = format.get('seckeys', [])
+                    seckeys = format.get('seckeys')  # SeckeyRanges, if any
+                    if os.path.isdir(episode_dir):
+                        self._load_decrypted(episode_dir, fnames, seckeys)
 
                     episodes.append((episode_dir, fnames, seckeys))
 
-            urllist = '\n'.join(urls)
-
-            if urllist:
-                cmd_aria2c, fallback_aria2c = self._cmd_aria2c(cover_info)
-                for _ in range(2):
-                    proc = None
-                    try:
-                        with logging_with_pipe(self._logger, level=logging.INFO, text=True) as log_pipe:
-                            with subprocess.Popen(cmd_aria2c, bufsize=1, universal_newlines=True, encoding='utf-8',
-                                                  stdin=subprocess.PIPE, stdout=log_pipe, stderr=subprocess.STDOUT) as proc:
-                                proc.stdin.write(urllist)
-                                proc.stdin.close()
-
-                        break
-                    except OSError as e:
-                        if cmd_aria2c is not fallback_aria2c:
-                            self._logger.error("Error while running 'aria2c' with augmented options. OS error number {}: '{}'\n"
-                                               "Trying to fall back on standard options...\n".format(e.errno, e.strerror))
-
-                            cmd_aria2c = fallback_aria2c
-
-                if proc and not proc.returncode:
-                    return cover_dir, episodes
+            if episodes:
+                joiners = self._start_progressive_joins(cover_dir, episodes, vc_confs, exclude=live_feeds)
+
+                def on_segment_done(ep_idx):
+                    if ep_idx in joiners:
+                        joiners[ep_idx].notify()
+
+                # over RPC, the episodes without a progressive joiner are decrypted and joined each as soon as its own
+                # segments are done, while the rest of the batch is still being downloaded
+                on_episode_done, finisher, finishing = None, None, []
+                if vc_confs['aria2_engine'] == 'rpc':
+                    excluded = set(joiners) | set(live_feeds) | {job[0] for job in range_jobs}
+                    early_dirs = {episode[0] for ep_idx, episode in enumerate(episodes) if ep_idx not in excluded}
+                    finisher = ThreadPoolExecutor(max_workers=self._join_workers(cover_dir, len(episodes), vc_confs),
+                                                  thread_name_prefix='mdl-finish')
+
+                    def on_episode_done(episode):
+                        if episode[0] in early_dirs:
+                            finishing.append(finisher.submit(self._finish_episode, cover_dir, episode, vc_confs))
+
+                live_batches = self._start_live_feeds(live_feeds)
+                try:
+                    pending = self._dwnld_segments_with_retries(cover_info, vc_confs, episodes, jobs, on_segment_done,
+                                                                range_jobs, on_episode_done=on_episode_done)
+                    if live_feeds:
+                        pending += self._dwnld_live_segments(cover_info, vc_confs, episodes, live_feeds, live_batches,
+                                                             on_segment_done)
+                finally:
+                    if finisher:
+                        finisher.shutdown(wait=True)
+                for future in finishing:
+                    future.result()
+
+                failed = {job[0] for job in pending}
+                for ep_idx in sorted(failed):
+                    self._logger.error("Download failed: '{}'.".format(episodes[ep_idx][0]))
+
+                for ep_idx, joiner in joiners.items():
+                    if joiner.finish(ep_idx not in failed):
+                        self._joined_episodes.add(episodes[ep_idx][0])
+
+                completed = [episode for ep_idx, episode in enumerate(episodes) if ep_idx not in failed]
+                if completed:
+                    return cover_dir, completed
                 else:
                     self._logger.error(f"Download failed: '{cover_info['url']}'.")
                     return "", []
@@ -258,46 +815,234 @@ class MDownloader(object):
         self._logger.warning("No files to download for '{}'.".format(cover_info['url']))
         return "", []
 
-    def _decrypt_ts(self, cover_dir, episode_dir, fnames, seckeys):
-        for fn, seckey in zip(fnames, seckeys):
-            if seckey['algo'] == "NONE":
-                continue
+    @staticmethod
+    def _iter_decrypted(f, key, iv, chunk_size=1 << 20):
+        """Decrypt the AES-128-CBC encrypted file object `f` chunk by chunk through a fixed-size, reused buffer.
 
-            try:
-                fn_abs = os.path.join(episode_dir, fn)
-                with open(fn_abs, 'rb') as f:
-                    c_txt = f.read()
+        The PKCS7 padding is stripped off the final block only, so the memory usage stays constant regardless of the
+        file size. Every yielded memoryview is only valid until the next iteration.
+
+        Raises:
+            ValueError: Raised when the ciphertext is empty, not block-aligned or wrongly padded.
+        """
+        chunk_size = max(AES.block_size, chunk_size - chunk_size % AES.block_size)
+        cipher = AES.new(key, AES.MODE_CBC, iv=iv)
+
+        c_buf, p_buf = memoryview(bytearray(chunk_size)), memoryview(bytearray(chunk_size))
+        last_block = bytearray(AES.block_size)  # held back till we know whether it's the final one
+        has_last = False
+
+        while True:
+            n = 0
+            while n < chunk_size:
+                nread = f.readinto(c_buf[n:])
+                if not nread:
+                    break
+                n += nread
+            if not n:
+                break
+
+            cipher.decrypt(c_buf[:n], output=p_buf[:n])  # raises ValueError if not block-aligned
+            if has_last:
+                yield memoryview(last_block)
+            yield p_buf[:n - AES.block_size]
+            last_block[:] = p_buf[n - AES.block_size:n]
+            has_last = True
+
+            if n < chunk_size:
+                break
+
+        if not has_last:
+            raise ValueError("Empty ciphertext")
+        yield memoryview(unpad(bytes(last_block), AES.block_size))
+
+    def _load_decrypted(self, episode_dir, fnames, seckeys):
+        """Mark the segments left decrypted in place by a previous run in `seckeys.decrypted`, so that they are neither
+        decrypted again nor skipped as undecryptable. A segment listed in the marker but still being renamed from its
+        decrypted copy when the run ended gets renamed now, the partial copies of the others are dropped."""
+        marker = os.path.join(episode_dir, self._DECRYPTED_MARKER)
+        try:
+            with open(marker, mode='r', encoding='utf-8') as fd:
+                listed = set(fd.read().splitlines())
+        except OSError:
+            listed = set()
+
+        for fn_tmp in glob.glob(os.path.join(glob.escape(episode_dir), '*.decrypting')):
+            fn_abs = fn_tmp[:-len('.decrypting')]
+            if os.path.basename(fn_abs) in listed:
+                os.replace(fn_tmp, fn_abs)
+            else:
+                os.remove(fn_tmp)
+
+        if not (seckeys and listed):
+            return
+
+        # a listed segment gone missing gets downloaded again, encrypted
+        decrypted = [(idx, fn) for idx, fn in enumerate(fnames) if fn in listed and self._is_downloaded(episode_dir, fn)]
+        seckeys.decrypted.update(idx for idx, _ in decrypted)
+        with open(marker, mode='w', encoding='utf-8') as fd:
+            fd.write(''.join(fn + '\n' for _, fn in decrypted))
+
+    def _decrypt_segment(self, episode_dir, fn, key, iv):
+        """Decrypt the segment in place, listing it in the `_DECRYPTED_MARKER` file of `episode_dir` before the
+        decrypted copy replaces it, see :meth:`_load_decrypted`.
+
+        :returns: True if decrypted successfully
+        """
+        fn_abs = os.path.join(episode_dir, fn)
+        fn_tmp = fn_abs + '.decrypting'
+        try:
+            with open(fn_abs, 'rb') as f, open(fn_tmp, 'wb') as w:
+                for p_txt in self._iter_decrypted(f, key, iv):
+                    w.write(p_txt)
+            with self._decrypted_lock, open(os.path.join(episode_dir, self._DECRYPTED_MARKER), mode='a',
+                                            encoding='utf-8') as fd:
+                fd.write(fn + '\n')
+            os.replace(fn_tmp, fn_abs)
+
+            return True
+        except (IOError, ValueError, KeyError, TypeError) as e:
+            self._logger.error(f"Decrypting '{fn_abs}' failed: '{e!r}'")
+            if os.path.isfile(fn_tmp):
+                os.remove(fn_tmp)
 
-                cipher = AES.new(seckey['key'], AES.MODE_CBC, iv=seckey['iv'])
-                p_txt = unpad(cipher.decrypt(c_txt), AES.block_size)
+            return False
 
-                with open(fn_abs, 'w+b') as f:
-                    f.write(p_txt)
+    def _decrypt_ts(self, cover_dir, episode_dir, fnames, seckeys):
+        for idx, key, iv in seckeys.iter_encrypted():
+            if not self._decrypt_segment(episode_dir, fnames[idx], key, iv):
+                seckeys.failed.add(idx)
+            else:
+                seckeys.decrypted.add(idx)
+
+    @staticmethod
+    def _is_encrypted(seckey):
+        return seckey is not None and seckey['algo'] != "NONE"
 
-                seckey['valid'] = True
-            except (IOError, ValueError, KeyError) as e:
-                self._logger.error(f"Decrypting '{fn_abs}' failed: '{e!r}'")
+    def _write_segment(self, out, fn_abs, seckey=None, chunk_size=1 << 20):
+        """Write the segment `fn_abs` to the file object `out`, decrypting it on the fly if `seckey` is given.
+        Anything other than a regular file, e.g. a pipe, is fed with chunks of at most `chunk_size` bytes.
 
-                seckey['valid'] = False
+        Raises:
+            ValueError: Raised when the decryption fails.
+        """
+        with open(fn_abs, 'rb') as f:
+            if self._is_encrypted(seckey):
+                for p_txt in self._iter_decrypted(f, seckey['key'], seckey['iv'], chunk_size):
+                    out.write(p_txt)
+            elif stat.S_ISREG(os.fstat(out.fileno()).st_mode):
+                self._append_file(out, f, chunk_size)
+            else:
+                self._copy_chunked(out, f, chunk_size)
+
+    @staticmethod
+    def _copy_chunked(out, f, chunk_size):
+        buf = memoryview(bytearray(chunk_size))
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            out.write(buf[:n])
 
-    def _join_ts(self, cover_dir, episode_dir, fnames):
+    @staticmethod
+    def _append_file(out, f, chunk_size=1 << 20):
+        """Append the whole file `f` to the regular file `out`, letting the kernel move the data with `copy_file_range`
+        or `sendfile` on Linux, and falling back on copying through a reused buffer elsewhere.
+        """
+        out.flush()  # the kernel copies to the current offset of the underlying file descriptor
+        in_fd, out_fd = f.fileno(), out.fileno()
+        size = os.fstat(in_fd).st_size
+        offset = 0
+
+        if sys.platform.startswith('linux'):
+            # `sendfile` needs no regular file as the destination since Linux 2.6.33
+            zero_copies = [getattr(os, 'copy_file_range', None), lambda i, o, count, off: os.sendfile(o, i, off, count)]
+            for zero_copy in zero_copies:
+                if zero_copy is None:
+                    continue
+                try:
+                    while offset < size:
+                        copied = zero_copy(in_fd, out_fd, size - offset, offset)
+                        if not copied:
+                            break
+                        offset += copied
+                    if offset >= size:
+                        return
+                except OSError as e:
+                    # e.g. not supported by the file system, or across file systems on older kernels
+                    if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF):
+                        raise
+
+        f.seek(offset)
+        MDownloader._copy_chunked(out, f, chunk_size)
+
+    def _join_ts(self, cover_dir, episode_dir, fnames, seckeys=None, chunk_size=1 << 20):
+        """
+        :param seckeys: if given, the segments are decrypted while being merged, without writing the plaintext back
+        :param chunk_size: size of the buffer the segments are decrypted or copied through
+        """
         episode_name = episode_dir + '.ts'
+        seckeys = seckeys or [None] * len(fnames)
 
-        if len(fnames) == 1:
+        if len(fnames) == 1 and not self._is_encrypted(seckeys[0]):
             # just rename and move it into parent directory, no need to merge
             fn_whole = os.path.join(episode_dir, fnames[0])
             shutil.move(fn_whole, episode_name)
             return
 
         with open(episode_name, 'wb') as tsf:
-            for fn in fnames:
+            for fn, seckey in zip(fnames, seckeys):
                 fn_abs = os.path.join(episode_dir, fn)
-                with open(fn_abs, 'rb') as f:
-                    tsf.write(f.read())
+                try:
+                    self._write_segment(tsf, fn_abs, seckey, chunk_size)
+                except ValueError as e:
+                    raise ValueError(f"Decrypting '{fn_abs}' failed: '{e!r}'")
                 if self.confs['misc']['delete_after_merge'] and not self.confs['misc']['delay_delete']:
                     os.remove(fn_abs)  # timely free up the disk space
 
-    def _join_with_ffmpeg(self, cover_dir, episode_dir, fnames, ts_convert=True):
+    def _pipe_into_ffmpeg(self, cmd_ffmpeg, episode_dir, fnames, seckeys, chunk_size):
+        """Stream the segments into the stdin of ffmpeg in bounded chunks.
+
+        :returns: the exit code of ffmpeg
+        :raises ValueError: when a segment fails to be decrypted on the fly
+        """
+        decrypt_error = None
+        with logging_with_pipe(self._logger, level=logging.INFO) as log_pipe:
+            with subprocess.Popen(cmd_ffmpeg, stdin=subprocess.PIPE, stdout=log_pipe,
+                                  stderr=subprocess.STDOUT) as proc:
+                for fn, seckey in zip(fnames, seckeys or [None] * len(fnames)):
+                    fn_abs = os.path.join(episode_dir, fn)
+                    try:
+                        self._write_segment(proc.stdin, fn_abs, seckey, chunk_size)
+                    except ValueError as e:
+                        decrypt_error = f"Decrypting '{fn_abs}' failed: '{e!r}'"
+                        break
+                    except IOError as e:
+                        if e.errno == errno.EPIPE or e.errno == errno.EINVAL:
+                            break
+                        else:
+                            raise
+                    if self.confs['misc']['delete_after_merge'] and not self.confs['misc']['delay_delete']:
+                        os.remove(fn_abs)
+
+                proc.stdin.close()
+
+        if decrypt_error:
+            raise ValueError(decrypt_error)
+
+        return proc.returncode
+
+    def _cmd_ffmpeg_pipe(self, episode_name):
+        ffmpeg = self.confs['progs']['ffmpeg']
+        return [ffmpeg, '-y', '-i', 'pipe:0', '-safe', '0', '-c', 'copy', '-hide_banner', episode_name]
+
+    def _join_with_ffmpeg(self, cover_dir, episode_dir, fnames, ts_convert=True, seckeys=None, pipe_buffer_size=1 << 20,
+                          concat_demuxer=False):
+        """
+        :param pipe_buffer_size: max size of every chunk written to the stdin of ffmpeg, or to the merged TS file
+        :param concat_demuxer: let ffmpeg read the segments by itself from a file list via the concat demuxer,
+            unless they have to be decrypted on the fly
+        """
         # determine the extension (i.e. video format): ['.ts',]
         suffix = '.' + fnames[0].split('.')[-1]
         episode_name = os.path.basename(episode_dir) + suffix
@@ -306,43 +1051,53 @@ class MDownloader(object):
         try:
             if suffix == '.ts':
                 if not ts_convert:
-                    self._join_ts(cover_dir, episode_dir, fnames)
+                    self._join_ts(cover_dir, episode_dir, fnames, seckeys=seckeys, chunk_size=pipe_buffer_size)
                     return True
 
                 episode_name = episode_name.rpartition('.')[0] + '.mp4'
 
             ffmpeg = self.confs['progs']['ffmpeg']
-            cmd_ffmpeg = [ffmpeg, '-y', '-i', 'pipe:0', '-safe', '0', '-c', 'copy', '-hide_banner', episode_name]
-            with logging_with_pipe(self._logger, level=logging.INFO) as log_pipe:
-                with subprocess.Popen(cmd_ffmpeg, stdin=subprocess.PIPE, stdout=log_pipe,
-                                      stderr=subprocess.STDOUT) as proc:
+            if concat_demuxer and not (seckeys and seckeys.encrypted):
+                flist = os.path.join(episode_dir, 'concat.txt')
+                with open(flist, 'w', encoding='utf-8') as fd:
                     for fn in fnames:
-                        fn_abs = os.path.join(episode_dir, fn)
-                        with open(fn_abs, 'rb') as f:
-                            try:
-                                proc.stdin.write(f.read())
-                            except IOError as e:
-                                if e.errno == errno.EPIPE or e.errno == errno.EINVAL:
-                                    break
-                                else:
-                                    raise
-                        if self.confs['misc']['delete_after_merge'] and not self.confs['misc']['delay_delete']:
-                            os.remove(fn_abs)
-
-                    proc.stdin.close()
+                        fd.write("file '{}'\n".format(os.path.join(episode_dir, fn).replace("'", "'\\''")))
+
+                cmd_ffmpeg = [ffmpeg, '-y', '-f', 'concat', '-safe', '0', '-i', flist, '-c', 'copy', '-hide_banner',
+                              episode_name]
+                try:
+                    with logging_with_pipe(self._logger, level=logging.INFO) as log_pipe:
+                        with subprocess.Popen(cmd_ffmpeg, stdin=subprocess.DEVNULL, stdout=log_pipe,
+                                              stderr=subprocess.STDOUT) as proc:
+                            pass
+                finally:
+                    os.remove(flist)
+                returncode = proc.returncode
+                if returncode == 0 and self.confs['misc']['delete_after_merge'] and \
+                        not self.confs['misc']['delay_delete']:
+                    for fn in fnames:
+                        os.remove(os.path.join(episode_dir, fn))
+            else:
+                cmd_ffmpeg = self._cmd_ffmpeg_pipe(episode_name)
+                returncode = self._pipe_into_ffmpeg(cmd_ffmpeg, episode_dir, fnames, seckeys, pipe_buffer_size)
 
-            if proc and proc.returncode == 0:
+            if returncode == 0:
                 return True
 
             # fall back on merging when converting failed
             if suffix == '.ts' and self.confs['misc']['delay_delete']:
                 self._logger.warning("Conversion to '%s' failed, switching to TS merging...", episode_name)
-                self._join_ts(cover_dir, episode_dir, fnames)
+                self._join_ts(cover_dir, episode_dir, fnames, seckeys=seckeys, chunk_size=pipe_buffer_size)
                 if os.path.isfile(episode_name):
                     os.remove(episode_name)
                 return True
         except OSError as e:
             self._logger.error("OS error number {}: '{}'".format(e.errno, e.strerror))
+        except ValueError as e:
+            self._logger.error("%s", e)
+            for partial in (episode_name, episode_dir + '.ts'):
+                if os.path.isfile(partial):
+                    os.remove(partial)
 
     def _join_with_mkvmerge(self, cover_dir, episode_dir, fnames):
         # determine the extension (i.e. video format)
@@ -382,29 +1137,102 @@ class MDownloader(object):
         except OSError as e:
             self._logger.error("OS error number {}: '{}'".format(e.errno, e.strerror))
 
-    def decrypt_videos(self, cover_dir, episodes):
-        for episode_dir, fnames, seckeys in episodes:
-            if not seckeys:
-                continue
+    def decrypt_videos(self, cover_dir, episodes, vc_confs=None):
+        if vc_confs and vc_confs['merge_all'] and vc_confs['decrypt_on_join']:
+            return  # left to `join_videos`
 
-            self._decrypt_ts(cover_dir, episode_dir, fnames, seckeys)
+        episodes = [episode for episode in episodes if episode[0] not in self._joined_episodes]
 
-    def join_videos(self, cover_dir, episodes, vc_confs):
-        if not vc_confs['merge_all']:
+        workers = int(vc_confs['decrypt_workers']) if vc_confs else 1
+        workers = workers if workers > 0 else (os.cpu_count() or 1)
+
+        if workers == 1:
+            for episode_dir, fnames, seckeys in episodes:
+                if not seckeys:
+                    continue
+
+                self._decrypt_ts(cover_dir, episode_dir, fnames, seckeys)
             return
 
-        for episode_dir, fnames, seckeys in episodes:
-            if seckeys and not all([seckey['valid'] is not False for seckey in seckeys]):
-                self._logger.error("Decryption failed, skipping the joining: '{}'".format(episode_dir))
-                continue
+        # every single encrypted segment is a unit of work, the failed ones are recorded in `seckeys.failed`
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [(seckeys, idx, executor.submit(self._decrypt_segment, episode_dir, fnames[idx], key, iv))
+                       for episode_dir, fnames, seckeys in episodes if seckeys
+                       for idx, key, iv in seckeys.iter_encrypted()]
+            for seckeys, idx, future in futures:
+                if not future.result():
+                    seckeys.failed.add(idx)
+                else:
+                    seckeys.decrypted.add(idx)
 
-            if fnames[0].endswith('.ts'):
-                res = self._join_with_ffmpeg(cover_dir, episode_dir, fnames, ts_convert=vc_confs['ts_convert'])
+    @staticmethod
+    def _join_workers(cover_dir, n_episodes, vc_confs):
+        """Number of episodes joined concurrently. `join_workers` 0 means deciding by the CPU cores and the disk type,
+        as a spinning disk is thrashed by several concurrent sequential reads/writes, unlike a SSD/NVMe."""
+        workers = int(vc_confs['join_workers'])
+        if workers <= 0:
+            cpus = os.cpu_count() or 1
+            rotational = is_rotational_disk(cover_dir)
+            if rotational:
+                workers = 2
+            elif rotational is None:
+                workers = max(1, cpus // 2)
             else:
-                res = self._join_with_mkvmerge(cover_dir, episode_dir, fnames)
+                workers = cpus
 
-            if res:
-                if self.confs['misc']['delete_after_merge']:
-                    shutil.rmtree(episode_dir, ignore_errors=True)
-            else:
-                self._logger.error('Join videos failed! <{}>'.format(episode_dir))
+        return max(1, min(workers, n_episodes))
+
+    def _finish_episode(self, cover_dir, episode, vc_confs):
+        """Decrypt and join a single episode ahead of the rest of its batch, after which it's skipped by
+        :meth:`decrypt_videos` and :meth:`join_videos`."""
+        episode_dir, fnames, seckeys = episode
+        if seckeys and not (vc_confs['merge_all'] and vc_confs['decrypt_on_join']):
+            self._decrypt_ts(cover_dir, episode_dir, fnames, seckeys)
+        if vc_confs['merge_all'] and self._join_episode(cover_dir, episode_dir, fnames, seckeys, vc_confs):
+            self._joined_episodes.add(episode_dir)
+
+    def _join_episode(self, cover_dir, episode_dir, fnames, seckeys, vc_confs):
+        """:returns: True if the episode has been joined"""
+        if episode_dir in self._joined_episodes:
+            # already merged while being downloaded
+            self._joined_episodes.discard(episode_dir)
+            if self.confs['misc']['delete_after_merge']:
+                shutil.rmtree(episode_dir, ignore_errors=True)
+            return
+
+        if seckeys and seckeys.failed:
+            self._logger.error("Decryption failed, skipping the joining: '{}'".format(episode_dir))
+            return
+
+        if fnames[0].endswith('.ts'):
+            res = self._join_with_ffmpeg(cover_dir, episode_dir, fnames, ts_convert=vc_confs['ts_convert'],
+                                         seckeys=seckeys if vc_confs['decrypt_on_join'] else None,
+                                         pipe_buffer_size=parse_size(vc_confs['join_buffer_size']),
+                                         concat_demuxer=vc_confs['ffmpeg_concat_demuxer'])
+        else:
+            res = self._join_with_mkvmerge(cover_dir, episode_dir, fnames)
+
+        if res:
+            if self.confs['misc']['delete_after_merge']:
+                shutil.rmtree(episode_dir, ignore_errors=True)
+            return True
+
+        self._logger.error('Join videos failed! <{}>'.format(episode_dir))
+        return False
+
+    def join_videos(self, cover_dir, episodes, vc_confs):
+        if not vc_confs['merge_all'] or not episodes:
+            return
+
+        workers = self._join_workers(cover_dir, len(episodes), vc_confs)
+        if workers == 1:
+            for episode_dir, fnames, seckeys in episodes:
+                self._join_episode(cover_dir, episode_dir, fnames, seckeys, vc_confs)
+            return
+
+        # every episode is merged by its own ffmpeg/mkvmerge process, so they can go side by side
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='mdl-join') as executor:
+            futures = [executor.submit(self._join_episode, cover_dir, episode_dir, fnames, seckeys, vc_confs)
+                       for episode_dir, fnames, seckeys in episodes]
+            for future in futures:
+                future.result()
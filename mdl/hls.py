@@ -0,0 +1,631 @@
+"""Single-pass parser of HLS playlists (RFC 8216), shared by the extractors of the m3u8 based sites.
+
+A playlist is parsed line by line as it's read, e.g. straight from `Response.iter_lines()`, into a :class:`Playlist`,
+which is either a master playlist listing the variant streams, or a media playlist listing the segments. The segments
+are stored column-wise in compact arrays rather than as one object per segment, since the playlists of long videos may
+run to a hundred thousand segments.
+"""
+import re
+import time
+import atexit
+import logging
+import threading
+from array import array
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+from requests import RequestException
+
+from .utils import parse_size
+
+__all__ = ['Key', 'Variant', 'Segment', 'Segments', 'Playlist', 'KeyManager', 'parse_attribs', 'parse', 'load',
+           'follow', 'VariantSelector']
+
+
+# `uri` is absolute, `iv` is bytes or None if it's to be derived from the media sequence number of every segment
+Key = namedtuple('Key', ['method', 'uri', 'iv', 'keyformat'])
+Variant = namedtuple('Variant', ['uri', 'bandwidth', 'attrs'])
+# `key` is None for an unencrypted segment preceding any EXT-X-KEY, `byterange` is None or a tuple (length, offset)
+Segment = namedtuple('Segment', ['uri', 'duration', 'seqnum', 'key', 'discontinuity', 'byterange'])
+
+_ATTRIB_RE = re.compile(r'([A-Z0-9-]+)\s*=\s*("[^"]*"|[^,]*)')
+
+
+def parse_attribs(attrib_list):
+    """Parse the attribute list of a tag, e.g. 'METHOD=AES-128,URI="key.bin"', into a dict, unquoting the values."""
+    attribs = {}
+    for name, value in _ATTRIB_RE.findall(attrib_list):
+        value = value.strip()
+        attribs[name] = value[1:-1] if value[:1] == '"' else value
+
+    return attribs
+
+
+def _make_resolver(base_url):
+    """Return a function resolving the URI lines against `base_url`, with a fast path for the usual relative paths."""
+    if not base_url:
+        return lambda uri: uri
+
+    base_dir = base_url.split('?', 1)[0].split('#', 1)[0].rpartition('/')[0] + '/'
+
+    def resolve(uri):
+        if uri.startswith(('http://', 'https://')):
+            return uri
+        if uri[0] not in './?' and ':' not in uri:  # a plain relative path, e.g. 'seg-1.ts?t=1'
+            return base_dir + uri
+        return urljoin(base_url, uri)
+
+    return resolve
+
+
+class Segments(object):
+    """The segments of a media playlist, stored column-wise.
+
+    Indexing or iterating yields :class:`Segment` tuples built on the fly.
+    """
+    __slots__ = ('uris', 'durations', 'seqnums', 'key_ids', 'discontinuities', 'byteranges', 'keys')
+
+    def __init__(self, keys):
+        self.uris = []
+        self.durations = array('d')
+        self.seqnums = array('q')
+        self.key_ids = array('l')  # index into `keys`, -1 for none
+        self.discontinuities = array('l')  # indices of the segments preceded by an EXT-X-DISCONTINUITY, ascending
+        self.byteranges = None  # array('q') of the interleaved lengths and offsets, allocated on the first byte range
+        self.keys = keys
+
+    def __len__(self):
+        return len(self.uris)
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += len(self.uris)
+        key_id = self.key_ids[idx]
+        byterange = None
+        if self.byteranges is not None and self.byteranges[2 * idx] >= 0:
+            byterange = (self.byteranges[2 * idx], self.byteranges[2 * idx + 1])
+
+        return Segment(self.uris[idx], self.durations[idx], self.seqnums[idx],
+                       self.keys[key_id] if key_id >= 0 else None, self._is_discontinuity(idx), byterange)
+
+    def __iter__(self):
+        return (self[idx] for idx in range(len(self.uris)))
+
+    def _is_discontinuity(self, idx):
+        lo, hi = 0, len(self.discontinuities)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.discontinuities[mid] < idx:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        return lo < len(self.discontinuities) and self.discontinuities[lo] == idx
+
+    def append(self, uri, duration, seqnum, key_id, discontinuity, byterange):
+        idx = len(self.uris)
+        self.uris.append(uri)
+        self.durations.append(duration)
+        self.seqnums.append(seqnum)
+        self.key_ids.append(key_id)
+        if discontinuity:
+            self.discontinuities.append(idx)
+        if byterange is not None:
+            if self.byteranges is None:
+                self.byteranges = array('q', [-1, -1]) * idx
+            self.byteranges.extend(byterange)
+        elif self.byteranges is not None:
+            self.byteranges.extend((-1, -1))
+
+
+class Playlist(object):
+    """A master or media playlist.
+
+    Attributes:
+        url (str): Where the playlist has been loaded from, against which its URIs are resolved
+        variants (list): :class:`Variant` of a master playlist, in the order listed
+        media (list): Attribute dicts of the EXT-X-MEDIA renditions of a master playlist
+        session_keys (list): :class:`Key` of the EXT-X-SESSION-KEY tags of a master playlist
+        keys (list): Distinct :class:`Key` of the EXT-X-KEY tags of a media playlist, `METHOD=NONE` included
+        segments (Segments): The segments of a media playlist
+        media_sequence (int): The media sequence number of the first segment
+        discontinuity_sequence (int): The discontinuity sequence number of the first segment
+        target_duration (float): Max segment duration in seconds
+        playlist_type (str): 'VOD', 'EVENT', or None
+        endlist (bool): Whether no more segments will be added
+        init_section (dict): Attributes of the EXT-X-MAP tag, if any
+    """
+    def __init__(self, url=None):
+        self.url = url
+        self.variants = []
+        self.media = []
+        self.session_keys = []
+        self.keys = []
+        self.segments = Segments(self.keys)
+        self.media_sequence = 0
+        self.discontinuity_sequence = 0
+        self.target_duration = None
+        self.playlist_type = None
+        self.endlist = False
+        self.init_section = None
+
+    @property
+    def is_master(self):
+        return bool(self.variants)
+
+    @property
+    def is_live(self):
+        """Whether segments may still be added to the media playlist, i.e. a live or EVENT one."""
+        return not (self.is_master or self.endlist or self.playlist_type == 'VOD')
+
+    def best_variant(self):
+        """Return the first variant of the highest bandwidth, or None."""
+        best = None
+        for variant in self.variants:
+            if best is None or variant.bandwidth > best.bandwidth:
+                best = variant
+
+        return best
+
+
+def parse(lines, url=None, on_key=None):
+    """Parse a playlist in a single pass.
+
+    Args:
+        lines (iterable): Lines of the playlist without the line terminators, e.g. `text.splitlines()` or
+            `r.iter_lines(decode_unicode=True)`
+        url (str): URL of the playlist, against which the relative URIs are resolved, None to leave them as is
+        on_key (callable): Called with every distinct :class:`Key` as soon as it's met, e.g. to start fetching it
+
+    Returns:
+        Playlist: The parsed playlist.
+    """
+    pl = Playlist(url)
+    resolve = _make_resolver(url)
+    segments = pl.segments
+
+    key_ids = {}  # {attribute list: index into pl.keys}
+    key_id = -1
+    seqnum = None
+    duration = 0.0
+    discontinuity = False
+    byterange = None
+    last_range_end = {}  # {uri: end offset of its last byte range}, for the byte ranges with the offset omitted
+    range_uris = {}
+    stream_inf = None
+
+    for line in lines:
+        if not line:
+            continue
+        if line[0] != '#':
+            line = line.strip()
+            if not line:
+                continue
+            uri = resolve(line)
+            if stream_inf is not None:
+                bandwidth = stream_inf.get('BANDWIDTH') or stream_inf.get('AVERAGE-BANDWIDTH') or '0'
+                pl.variants.append(Variant(uri, int(bandwidth) if bandwidth.isdigit() else 0, stream_inf))
+                stream_inf = None
+                continue
+
+            if seqnum is None:
+                seqnum = pl.media_sequence
+            if byterange is not None:
+                length, offset = byterange
+                if offset is None:
+                    offset = last_range_end.get(uri, 0)
+                uri = range_uris.setdefault(uri, uri)  # share one string among the ranges of the same resource
+                last_range_end[uri] = offset + length
+                byterange = (length, offset)
+            segments.append(uri, duration, seqnum, key_id, discontinuity, byterange)
+            seqnum += 1
+            duration, discontinuity, byterange = 0.0, False, None
+            continue
+
+        tag, _, value = line.partition(':')
+        if tag == '#EXTINF':
+            try:
+                duration = float(value.partition(',')[0])
+            except ValueError:
+                duration = 0.0
+        elif tag == '#EXT-X-KEY':
+            value = value.strip()
+            key_id = key_ids.get(value)
+            if key_id is None:
+                key_id = key_ids[value] = len(pl.keys)
+                pl.keys.append(_parse_key(value, resolve))
+                if on_key:
+                    on_key(pl.keys[-1])
+        elif tag == '#EXT-X-BYTERANGE':
+            length, _, offset = value.strip().partition('@')
+            byterange = (int(length), int(offset) if offset else None)
+        elif tag == '#EXT-X-DISCONTINUITY':
+            discontinuity = True
+        elif tag == '#EXT-X-MEDIA-SEQUENCE':
+            pl.media_sequence = int(value)
+        elif tag == '#EXT-X-DISCONTINUITY-SEQUENCE':
+            pl.discontinuity_sequence = int(value)
+        elif tag == '#EXT-X-TARGETDURATION':
+            pl.target_duration = float(value)
+        elif tag == '#EXT-X-PLAYLIST-TYPE':
+            pl.playlist_type = value.strip().upper()
+        elif tag == '#EXT-X-ENDLIST':
+            pl.endlist = True
+        elif tag == '#EXT-X-STREAM-INF':
+            stream_inf = parse_attribs(value)
+        elif tag == '#EXT-X-MEDIA':
+            pl.media.append(parse_attribs(value))
+        elif tag == '#EXT-X-SESSION-KEY':
+            pl.session_keys.append(_parse_key(value, resolve))
+            if on_key:
+                on_key(pl.session_keys[-1])
+        elif tag == '#EXT-X-MAP':
+            pl.init_section = parse_attribs(value)
+            if pl.init_section.get('URI'):
+                pl.init_section['URI'] = resolve(pl.init_section['URI'])
+
+    return pl
+
+
+def _parse_key(attrib_list, resolve):
+    attribs = parse_attribs(attrib_list)
+    iv = attribs.get('IV')
+    if iv:
+        iv = bytes.fromhex(iv[2:] if iv[:2] in ('0x', '0X') else iv)
+    uri = attribs.get('URI')
+
+    return Key(attribs.get('METHOD', 'NONE').upper(), resolve(uri) if uri else None, iv or None,
+               attribs.get('KEYFORMAT', 'identity'))
+
+
+def load(requester, url, max_hops=2, on_key=None, selector=None):
+    """Fetch and parse the playlist at `url`, following the variant of the highest bandwidth of a master playlist, or
+    the one picked by `selector`.
+
+    Args:
+        requester (requests.Session): The session of the extractor
+        url (str): URL of the master or media playlist
+        max_hops (int): Max number of playlists to fetch
+        on_key (callable): See :func:`parse`
+        selector (VariantSelector): Picks the variant of a master playlist instead
+
+    Returns:
+        Playlist: The media playlist, carrying the session keys of the master playlist if there's no EXT-X-KEY in it,
+            or None if there's no media playlist within `max_hops`.
+
+    Raises:
+        RequestException: Raised when fetching any playlist fails.
+    """
+    session_keys = []
+    for _ in range(max_hops):
+        with requester.get(url, stream=True) as r:
+            if r.status_code != 200:
+                raise RequestException("Unexpected status code %i" % r.status_code)
+            r.encoding = "utf-8"
+            pl = parse(r.iter_lines(decode_unicode=True), url, on_key=on_key)
+
+        if pl.is_master:
+            session_keys = pl.session_keys
+            media = None
+            if selector:
+                variant, media = selector.select(pl)
+            else:
+                variant = pl.best_variant()
+            if media is None:
+                url = variant.uri
+                continue
+
+            pl = media  # loaded already while being picked
+            if on_key:
+                for key in pl.keys:
+                    on_key(key)
+        if pl.segments:
+            if not pl.session_keys:
+                pl.session_keys = session_keys
+            return pl
+        break
+
+    return None
+
+
+def follow(requester, playlist, duration=0, max_idle=None, on_key=None, logger=None):
+    """Reload the live or EVENT media `playlist` at the cadence of its target duration, as per RFC 8216 6.3.4, till
+    the EXT-X-ENDLIST tag turns up, `duration` seconds have elapsed, or nothing new has turned up for `max_idle` seconds.
+
+    The reloads are diffed by the media sequence numbers, so that only the segments not seen before are handed out.
+
+    Args:
+        requester (requests.Session): The session of the extractor
+        playlist (Playlist): The media playlist as loaded first, whose segments count as seen
+        duration (float): Max number of seconds to follow the playlist for, 0 for no limit
+        max_idle (float): Max number of seconds without any new segment, 10 target durations by default
+        on_key (callable): See :func:`parse`
+        logger (logging.Logger): Logger for the reloading errors
+
+    Yields:
+        tuple: `(reloaded_playlist, start)`, where the segments from the index `start` on are the new ones.
+    """
+    logger = logger or logging.getLogger('.'.join(['MDL', 'HLS']))
+    target_duration = playlist.target_duration or 6.0
+    max_idle = max_idle or 10 * target_duration
+
+    next_seqnum = playlist.media_sequence + len(playlist.segments)
+    started = last_change = last_load = time.monotonic()
+    changed = True
+    while playlist.is_live:
+        # wait the target duration from the last load if it has changed, otherwise half of it
+        wait = target_duration if changed else target_duration / 2
+        now = time.monotonic()
+        if duration and now + wait - started >= duration:
+            break
+        if now - last_change >= max_idle:
+            logger.warning("No new segments of '%s' for %.0fs, stopped following it", playlist.url, now - last_change)
+            break
+        time.sleep(max(0.0, last_load + wait - now))
+
+        last_load = time.monotonic()
+        try:
+            reloaded = load(requester, playlist.url, max_hops=1, on_key=on_key)
+        except RequestException as e:
+            logger.warning("Failed to reload the playlist of '%s': '%r'", playlist.url, e)
+            reloaded = None
+
+        changed = False
+        if reloaded is None:
+            continue
+        if not reloaded.session_keys:
+            reloaded.session_keys = playlist.session_keys
+        playlist = reloaded
+
+        start = next_seqnum - reloaded.media_sequence
+        if start < 0:
+            logger.warning("%d segment(s) of '%s' dropped out of the playlist before being reloaded",
+                           -start, playlist.url)
+            start = 0
+        if start < len(reloaded.segments):
+            changed = True
+            last_change = last_load
+            next_seqnum = reloaded.media_sequence + len(reloaded.segments)
+            target_duration = reloaded.target_duration or target_duration
+            yield reloaded, start
+        elif not reloaded.is_live:
+            break
+
+
+class VariantSelector(object):
+    """Pick the variant of a master playlist to download, rather than simply the one of the highest `BANDWIDTH`.
+
+    The variants are first capped by their `RESOLUTION` and `CODECS` attributes. With a time or size budget, a few
+    segments of each of the top candidates are then fetched concurrently, by which the actual size of the whole variant
+    and the time to download it over our link are estimated, and the best candidate fitting the budget is picked. The
+    lowest capped variant is picked if none of the sampled candidates fits.
+    """
+    def __init__(self, requester, max_resolution=None, codecs=None, time_budget=0, size_budget=0, candidates=3,
+                 samples=3, logger=None):
+        """
+        Args:
+            requester (requests.Session): The session of the extractor
+            max_resolution (tuple): Max `(width, height)`, either of which may be 0 for no limit, or None
+            codecs (list): Prefixes of the allowed codecs, e.g. `['avc1', 'mp4a']`, or None for any
+            time_budget (float): Max number of seconds to download the variant in, 0 for no limit
+            size_budget (int): Max size in bytes of the variant, 0 for no limit
+            candidates (int): Number of the top capped variants sampled at most
+            samples (int): Number of segments sampled per candidate
+            logger (logging.Logger): Logger for the sampling results
+        """
+        self._requester = requester
+        self.max_resolution = max_resolution
+        self.codecs = codecs
+        self.time_budget = time_budget
+        self.size_budget = size_budget
+        self.candidates = max(1, candidates)
+        self.samples = max(1, samples)
+        self._logger = logger or logging.getLogger('.'.join(['MDL', 'HLS']))
+
+    @classmethod
+    def from_confs(cls, requester, confs, logger=None):
+        """Build the selector from the `variant_*` options of the site."""
+        max_resolution = None
+        resolution = (confs.get('variant_max_resolution') or '').strip().lower()
+        if resolution:
+            width, _, height = resolution.rpartition('x')
+            max_resolution = (int(width or 0), int(height))
+
+        codecs = [codec.strip().lower() for codec in (confs.get('variant_codecs') or '').split(',') if codec.strip()]
+
+        return cls(requester, max_resolution=max_resolution, codecs=codecs or None,
+                   time_budget=float(confs.get('variant_time_budget') or 0),
+                   size_budget=parse_size(confs.get('variant_size_budget') or '0'),
+                   candidates=int(confs.get('variant_candidates') or 3),
+                   samples=int(confs.get('variant_samples') or 3), logger=logger)
+
+    def _is_capped(self, variant):
+        resolution = variant.attrs.get('RESOLUTION')
+        if self.max_resolution and resolution:
+            width, _, height = resolution.lower().partition('x')
+            if width.isdigit() and height.isdigit():
+                max_width, max_height = self.max_resolution
+                if (max_width and int(width) > max_width) or (max_height and int(height) > max_height):
+                    return False
+
+        codecs = variant.attrs.get('CODECS')
+        if self.codecs and codecs:
+            for codec in codecs.lower().split(','):
+                if not codec.strip().startswith(tuple(self.codecs)):
+                    return False
+
+        return True
+
+    def _sample(self, media):
+        """Fetch a few segments spread over the media playlist concurrently.
+
+        Returns:
+            tuple: `(bytes_per_media_sec, bytes_per_sec)`, the bitrate of the media and the throughput of our link, or
+                None if the sampling has failed.
+        """
+        segments = media.segments
+        n = min(self.samples, len(segments))
+        picks = sorted({len(segments) * (i + 1) // (n + 1) for i in range(n)})
+
+        def fetch(idx):
+            headers = {}
+            if segments.byteranges is not None and segments.byteranges[2 * idx] >= 0:
+                length, offset = segments.byteranges[2 * idx], segments.byteranges[2 * idx + 1]
+                headers['Range'] = 'bytes={}-{}'.format(offset, offset + length - 1)
+            with self._requester.get(segments.uris[idx], headers=headers, stream=True) as r:
+                if r.status_code not in (200, 206):
+                    raise RequestException("Unexpected status code %i" % r.status_code)
+                return sum(len(chunk) for chunk in r.iter_content(1 << 16))
+
+        start = time.monotonic()
+        try:
+            with ThreadPoolExecutor(max_workers=len(picks), thread_name_prefix='mdl-sample') as executor:
+                sizes = list(executor.map(fetch, picks))
+        except RequestException as e:
+            self._logger.warning("Failed to sample the segments of '%s': '%r'", media.url, e)
+            return None
+        secs = max(time.monotonic() - start, 1e-3)
+
+        media_secs = sum(segments.durations[idx] for idx in picks)
+        if not media_secs:
+            return None
+
+        return sum(sizes) / media_secs, sum(sizes) / secs
+
+    def select(self, master):
+        """Pick the variant of the master playlist.
+
+        Returns:
+            tuple: `(variant, media)`, where `media` is the media playlist of the variant if loaded while sampling, or
+                None.
+        """
+        capped = [variant for variant in master.variants if self._is_capped(variant)]
+        if not capped:
+            self._logger.warning("No variant of '%s' within the resolution/codecs caps, ignoring them", master.url)
+            capped = list(master.variants)
+        capped.sort(key=lambda variant: variant.bandwidth, reverse=True)
+
+        if not (self.time_budget or self.size_budget):
+            return capped[0], None
+
+        for variant in capped[:self.candidates]:
+            try:
+                media = load(self._requester, variant.uri, max_hops=1)
+            except RequestException as e:
+                self._logger.warning("Failed to fetch the variant playlist '%s': '%r'", variant.uri, e)
+                continue
+            if media is None:
+                continue
+
+            rates = self._sample(media)
+            if rates is None:
+                continue
+            bitrate, throughput = rates
+            size = bitrate * sum(media.segments.durations)
+            secs = size / throughput
+            self._logger.info("Variant of %d bps: about %.1f MB, to be downloaded in about %.0fs at %.1f KB/s",
+                              variant.bandwidth, size / (1 << 20), secs, throughput / 1024)
+
+            if (not self.size_budget or size <= self.size_budget) and (not self.time_budget or secs <= self.time_budget):
+                return variant, media
+
+        self._logger.warning("No sampled variant of '%s' fits the budget, picking the lowest one", master.url)
+        return capped[-1], None
+
+
+class KeyManager(object):
+    """Fetch the decryption keys of the playlists, each distinct URI once for the whole run.
+
+    The fetching is started as soon as a key is met by :meth:`prefetch`, e.g. as the `on_key` callback of :func:`parse`,
+    and runs on a few threads sharing the session of the extractor, while the playlist is still being parsed. The
+    latency of the fetches is tracked for reporting. A failed key is fetched anew on the next request of it, up to
+    `MAX_ATTEMPTS` times in all.
+    """
+    MAX_ATTEMPTS = 3
+
+    def __init__(self, requester, workers=4, logger=None):
+        """
+        Args:
+            requester (requests.Session): The session of the extractor
+            workers (int): Number of the keys fetched concurrently
+            logger (logging.Logger): Logger for the fetching errors and the latency metrics
+        """
+        self._requester = requester
+        self._logger = logger or logging.getLogger('.'.join(['MDL', 'KeyManager']))
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='mdl-key')
+
+        self._lock = threading.Lock()
+        self._keys = {}  # {absolute URI: future of the key bytes, or None if failed}
+        self._failures = {}  # {absolute URI: number of the failed fetches}
+        self._metrics = {'fetches': 0, 'hits': 0, 'errors': 0, 'total_secs': 0.0, 'max_secs': 0.0}
+        self._closed = False
+
+        atexit.register(self.close)
+
+    def _fetch(self, uri):
+        start = time.monotonic()
+        key = None
+        try:
+            r = self._requester.get(uri)
+            if r.status_code != 200:
+                raise RequestException("Unexpected status code %i" % r.status_code)
+            key = r.content
+        except RequestException as e:
+            self._logger.error("Failed to fetch the decryption key from '%s': '%r'", uri, e)
+
+        secs = time.monotonic() - start
+        with self._lock:
+            self._metrics['fetches'] += 1
+            self._metrics['total_secs'] += secs
+            self._metrics['max_secs'] = max(self._metrics['max_secs'], secs)
+            if key is None:
+                self._metrics['errors'] += 1
+                self._failures[uri] = self._failures.get(uri, 0) + 1
+                if self._failures[uri] < self.MAX_ATTEMPTS:
+                    self._keys.pop(uri, None)  # for the next `prefetch` or `get` to fetch it again
+
+        return key
+
+    def prefetch(self, key):
+        """Start fetching the key of `key` (:class:`Key`) unless already fetched or being fetched."""
+        if key.method == "NONE" or not key.uri:
+            return
+
+        with self._lock:
+            if key.uri in self._keys:
+                self._metrics['hits'] += 1
+                return
+            self._keys[key.uri] = self._executor.submit(self._fetch, key.uri)
+
+    def get(self, uri):
+        """Return the key bytes at `uri`, waiting for the fetching, or None if it has failed."""
+        with self._lock:
+            future = self._keys.get(uri)
+            if future is None:
+                future = self._keys[uri] = self._executor.submit(self._fetch, uri)
+
+        return future.result()
+
+    def stats(self):
+        """Return the number of fetches, cache hits and errors, and the average and max latency in seconds."""
+        with self._lock:
+            metrics = dict(self._metrics)
+        total_secs = metrics.pop('total_secs')
+        metrics['avg_secs'] = total_secs / metrics['fetches'] if metrics['fetches'] else 0.0
+
+        return metrics
+
+    def report(self):
+        st = self.stats()
+        if st['fetches']:
+            self._logger.info("decryption keys: %d fetch(es), %d cache hit(s), avg latency %.2fs, max %.2fs, %d error(s)",
+                              st['fetches'], st['hits'], st['avg_secs'], st['max_secs'], st['errors'])
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+
+        self.report()
+        self._executor.shutdown(wait=False)
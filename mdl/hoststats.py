@@ -0,0 +1,210 @@
+"""Per-host download statistics persisted across runs, by which the mirrors of the segments are ordered and weighted,
+and the slow or erroring hosts are blacklisted for a cool-down period.
+
+The measurements come from the byte-range requests made by mdl itself, and from the server performance profiles aria2
+saves with `--server-stat-of` for the downloads it has made.
+"""
+import os
+import json
+import time
+import random
+import atexit
+import logging
+import threading
+from urllib.parse import urlsplit
+
+__all__ = ['HostStats', 'host_of']
+
+
+def host_of(url):
+    """The lower-cased host name of `url`, without the port, e.g. 'ltsyd.qq.com'."""
+    try:
+        return (urlsplit(url).hostname or '').lower()
+    except ValueError:
+        return ''
+
+
+class HostStats(object):
+    """The throughput and the error rate of every host, as moving averages of the downloads from it.
+
+    A host is blacklisted for `cooldown` seconds once its error rate exceeds `max_error_rate`, or its throughput falls
+    below `min_speed_ratio` of that of the fastest host, over at least `MIN_SAMPLES` downloads. It gets a fresh start
+    after the cool-down, keeping its throughput for the ordering.
+    """
+    ALPHA = 0.3  # weight of the latest download in the moving averages
+    MIN_SAMPLES = 3
+
+    _instances = {}  # {path: HostStats}, shared by the extractors and the downloader
+    _instances_lock = threading.Lock()
+
+    def __init__(self, path, cooldown=1800, max_error_rate=0.5, min_speed_ratio=0.1, logger=None):
+        """
+        Args:
+            path (str): The JSON file the statistics are loaded from and saved to
+            cooldown (float): Number of seconds a host stays blacklisted
+            max_error_rate (float): Error rate in [0, 1] above which a host gets blacklisted
+            min_speed_ratio (float): Ratio to the throughput of the fastest host below which a host gets blacklisted,
+                0 for never
+            logger (logging.Logger): Logger for the blacklisting and the persisting errors
+        """
+        self.path = path
+        self.cooldown = cooldown
+        self.max_error_rate = max_error_rate
+        self.min_speed_ratio = min_speed_ratio
+        self._logger = logger or logging.getLogger('.'.join(['MDL', 'HostStats']))
+
+        self._lock = threading.Lock()
+        # {host: {'speed': bytes per second, 'errors': error rate, 'samples': N, 'until': blacklisted till, 'updated': t}}
+        self._hosts = self._load()
+        self._dirty = False
+
+        atexit.register(self.save)
+
+    @classmethod
+    def from_confs(cls, confs, logger=None):
+        """Return the statistics shared by all the sites, as configured by the `host_*` options, or None if disabled."""
+        if not confs['host_stats']:
+            return None
+
+        path = os.path.join(confs['stats_dir'], 'host_stats.json')
+        with cls._instances_lock:
+            stats = cls._instances.get(path)
+            if stats is None:
+                stats = cls._instances[path] = cls(path, cooldown=float(confs['host_cooldown']),
+                                                   max_error_rate=float(confs['host_max_error_rate']),
+                                                   min_speed_ratio=float(confs['host_min_speed_ratio']), logger=logger)
+
+        return stats
+
+    def _load(self):
+        try:
+            with open(self.path, mode='r', encoding='utf-8') as fd:
+                hosts = json.load(fd)
+            return hosts if isinstance(hosts, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            self._logger.warning("Failed to load the host statistics from '%s': '%r'", self.path, e)
+            return {}
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps(self._hosts, indent=1, sort_keys=True)
+            self._dirty = False
+
+        tmp_path = self.path + '.tmp'
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, mode='w', encoding='utf-8') as fd:
+                fd.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self._logger.warning("Failed to save the host statistics to '%s': '%r'", self.path, e)
+
+    def record(self, host, speed=None, ok=True):
+        """Record a download from `host` at `speed` bytes per second, or a failed one."""
+        if not host:
+            return
+
+        now = time.time()
+        with self._lock:
+            st = self._hosts.setdefault(host, {'speed': 0.0, 'errors': 0.0, 'samples': 0, 'until': 0, 'updated': 0})
+            if st['samples']:
+                st['errors'] += self.ALPHA * ((0.0 if ok else 1.0) - st['errors'])
+            else:
+                st['errors'] = 0.0 if ok else 1.0
+            if ok and speed:
+                st['speed'] = speed if not st['speed'] else st['speed'] + self.ALPHA * (speed - st['speed'])
+            st['samples'] += 1
+            st['updated'] = now
+            self._dirty = True
+
+            self._check(host, st, now)
+
+    def _check(self, host, st, now):
+        if st['samples'] < self.MIN_SAMPLES or st['until'] > now:
+            return
+
+        reason = None
+        if st['errors'] > self.max_error_rate:
+            reason = "error rate {:.0%}".format(st['errors'])
+        elif self.min_speed_ratio and st['speed']:
+            # only the hosts in use and measured well enough set the bar, not a lucky early sample or an excluded host
+            fastest = max([other['speed'] for other in self._hosts.values()
+                           if other['samples'] >= self.MIN_SAMPLES and other['until'] <= now] or [0])
+            if st['speed'] < fastest * self.min_speed_ratio:
+                reason = "{:.1f} KB/s against {:.1f} KB/s of the fastest host".format(st['speed'] / 1024, fastest / 1024)
+
+        if reason:
+            st['until'] = now + self.cooldown
+            st['errors'], st['samples'] = 0.0, 0
+            self._logger.warning("Blacklisted '%s' for %.0fs: %s", host, self.cooldown, reason)
+
+    def is_blacklisted(self, host):
+        with self._lock:
+            st = self._hosts.get(host)
+            return bool(st) and st['until'] > time.time()
+
+    def _scores(self, hosts):
+        """The expected goodput of every host, where the hosts never measured score the median, so they get tried."""
+        now = time.time()
+        with self._lock:
+            stats = [self._hosts.get(host) for host in hosts]
+        known = sorted(st['speed'] * (1 - st['errors']) for st in stats if st and st['speed'])
+        prior = known[len(known) // 2] if known else 1.0
+
+        scores, blacklisted = [], []
+        for st in stats:
+            scores.append(st['speed'] * (1 - st['errors']) if st and st['speed'] else prior)
+            blacklisted.append(bool(st) and st['until'] > now)
+
+        return scores, blacklisted
+
+    def rank(self, urls, weighted=False):
+        """Order the mirror URLs, or URL prefixes, of the same resource from the best host on, leaving out the ones of
+        the blacklisted hosts unless all of them are.
+
+        Args:
+            urls (list): The mirror URLs in the order of preference, which the hosts of the same score keep
+            weighted (bool): Draw the first one at random with the probability in proportion to its score, so that the
+                downloads are spread over the good hosts rather than all going to the best one
+
+        Returns:
+            list: The ranked URLs.
+        """
+        if len(urls) < 2:
+            return list(urls)
+
+        scores, blacklisted = self._scores([host_of(url) for url in urls])
+        order = [idx for idx in range(len(urls)) if not blacklisted[idx]] or list(range(len(urls)))
+        order.sort(key=lambda idx: scores[idx], reverse=True)
+
+        if weighted and len(order) > 1:
+            first = random.choices(order, weights=[scores[idx] or 1e-9 for idx in order])[0]
+            order.remove(first)
+            order.insert(0, first)
+
+        return [urls[idx] for idx in order]
+
+    def ingest_aria2_server_stat(self, path, since=0):
+        """Record the hosts aria2 has downloaded from since the time `since`, as per the server performance profile saved
+        by aria2 with `--server-stat-of`, i.e. lines like 'host=example.com, protocol=http, dl_speed=0, sc_avg_speed=0,
+        mc_avg_speed=0, last_updated=1700000000, counter=0, status=OK'."""
+        try:
+            with open(path, mode='r', encoding='utf-8') as fd:
+                lines = fd.read().splitlines()
+        except OSError:
+            return
+
+        for line in lines:
+            fields = dict(field.strip().partition('=')[::2] for field in line.split(','))
+            try:
+                if int(fields.get('last_updated', 0)) < since:
+                    continue
+                speed = int(fields.get('dl_speed') or 0) or int(fields.get('sc_avg_speed') or 0)
+            except ValueError:
+                continue
+
+            self.record(fields.get('host', '').lower(), speed=speed, ok=fields.get('status') == 'OK')
@@ -0,0 +1,242 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+import logging
+
+from requests.adapters import BaseAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+
+class HTTPCache(object):
+    """On-disk store of the HTTP responses, evicting the least recently used ones beyond `max_size` bytes.
+
+    Every entry is made up of two files named after the key: `<key>.json` holding the metadata and the headers, and
+    `<key>.body` holding the (decoded) content.
+    """
+    def __init__(self, cache_dir, max_size=50 << 20, logger=None):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self._logger = logger or logging.getLogger('.'.join(['MDL', 'HTTPCache']))
+
+        self._lock = threading.Lock()
+        self._index = {}  # {key: [size, last_used]}
+        self._size = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        for fn in os.listdir(cache_dir):
+            key, _, ext = fn.rpartition('.')
+            if ext != 'json':
+                continue
+            try:
+                meta_st = os.stat(os.path.join(cache_dir, fn))
+                body_st = os.stat(os.path.join(cache_dir, key + '.body'))
+            except OSError:
+                continue
+            self._index[key] = [meta_st.st_size + body_st.st_size, meta_st.st_mtime]
+            self._size += self._index[key][0]
+
+    @staticmethod
+    def make_key(method, url, body=None):
+        h = hashlib.sha1('{} {}'.format(method, url).encode('utf-8'))
+        if body:
+            h.update(body if isinstance(body, bytes) else body.encode('utf-8'))
+
+        return h.hexdigest()
+
+    def _paths(self, key):
+        return os.path.join(self.cache_dir, key + '.json'), os.path.join(self.cache_dir, key + '.body')
+
+    def get(self, key):
+        """Return the tuple `(meta, body)` of the entry, or None if not cached."""
+        with self._lock:
+            if key not in self._index:
+                return None
+
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path, encoding='utf-8') as fd:
+                meta = json.load(fd)
+            with open(body_path, 'rb') as fd:
+                body = fd.read()
+        except (OSError, ValueError):
+            self.delete(key)
+            return None
+
+        self.touch(key)
+        return meta, body
+
+    def touch(self, key, meta=None):
+        """Mark the entry as recently used, updating its metadata if given."""
+        meta_path, _ = self._paths(key)
+        try:
+            if meta is not None:
+                self._write(meta_path, json.dumps(meta).encode('utf-8'))
+            os.utime(meta_path)
+        except OSError:
+            return
+
+        with self._lock:
+            if key in self._index:
+                self._index[key][1] = time.time()
+
+    @staticmethod
+    def _write(path, data):
+        tmp = '{}.{}.tmp'.format(path, threading.get_ident())
+        with open(tmp, 'wb') as fd:
+            fd.write(data)
+        os.replace(tmp, path)
+
+    def put(self, key, meta, body):
+        meta_path, body_path = self._paths(key)
+        meta_data = json.dumps(meta).encode('utf-8')
+        size = len(meta_data) + len(body)
+        if size > self.max_size:
+            return
+
+        try:
+            self._write(body_path, body)
+            self._write(meta_path, meta_data)
+        except OSError as e:
+            self._logger.warning("Failed to cache the response from '%s': '%r'", meta.get('url'), e)
+            return
+
+        with self._lock:
+            old = self._index.get(key)
+            self._size += size - (old[0] if old else 0)
+            self._index[key] = [size, time.time()]
+            evicted = self._evict()
+
+        for ekey in evicted:
+            self._remove_files(ekey)
+
+    def _evict(self):
+        evicted = []
+        if self._size > self.max_size:
+            for key, (size, _) in sorted(self._index.items(), key=lambda item: item[1][1]):
+                if self._size <= self.max_size:
+                    break
+                del self._index[key]
+                self._size -= size
+                evicted.append(key)
+
+        return evicted
+
+    def _remove_files(self, key):
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def delete(self, key):
+        with self._lock:
+            entry = self._index.pop(key, None)
+            if entry:
+                self._size -= entry[0]
+        self._remove_files(key)
+
+
+class CachingAdapter(BaseAdapter):
+    """Transport adapter serving the responses of the whitelisted endpoints from :class:`HTTPCache`.
+
+    Only the requests matching any of the rules are cached, everything else, e.g. the short-lived signed media URLs and
+    key requests, goes straight to the wrapped adapter. A stale entry carrying an `ETag` or `Last-Modified` header is
+    revalidated with a conditional request instead of being fetched again.
+    """
+    # dropped from the cached headers, since the content is stored decoded
+    _HOP_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding', 'connection', 'keep-alive')
+
+    def __init__(self, adapter, cache, rules, logger=None):
+        """
+        Args:
+            adapter (requests.adapters.BaseAdapter): The adapter actually sending the requests
+            cache (HTTPCache): Where the responses are stored
+            rules (list): List of dicts `{'pat': regex of the URL, 'ttl': seconds, 'methods': ('GET',)}`, `methods`
+                being optional, and the first one matching a request decides its TTL
+            logger (logging.Logger): Logger for the cache hits
+        """
+        super().__init__()
+        self.adapter = adapter
+        self.cache = cache
+        self.rules = rules
+        self._logger = logger or logging.getLogger('.'.join(['MDL', 'CachingAdapter']))
+
+        for rule in self.rules:
+            if rule.get('cpat') is None:
+                rule['cpat'] = re.compile(rule['pat'], re.IGNORECASE)
+
+    def _ttl(self, request):
+        for rule in self.rules:
+            if request.method in rule.get('methods', ('GET',)) and rule['cpat'].match(request.url):
+                return rule['ttl']
+
+    def _build_response(self, request, meta, body):
+        resp = Response()
+        resp.status_code = meta['status']
+        resp.reason = meta.get('reason')
+        resp.headers = CaseInsensitiveDict(meta['headers'])
+        resp.encoding = get_encoding_from_headers(resp.headers)
+        resp._content = body
+        resp.url = request.url
+        resp.request = request
+        resp.connection = self
+
+        return resp
+
+    def send(self, request, stream=False, **kwargs):
+        ttl = self._ttl(request)
+        if ttl is None or stream:
+            return self.adapter.send(request, stream=stream, **kwargs)
+
+        key = HTTPCache.make_key(request.method, request.url, request.body)
+        cached = self.cache.get(key)
+        if cached:
+            meta, body = cached
+            if time.time() - meta['stored'] < meta['ttl']:
+                self._logger.debug("Cache hit: '%s'", request.url)
+                return self._build_response(request, meta, body)
+
+            headers = CaseInsensitiveDict(meta['headers'])
+            validators = {}
+            if headers.get('ETag'):
+                validators['If-None-Match'] = headers['ETag']
+            if headers.get('Last-Modified'):
+                validators['If-Modified-Since'] = headers['Last-Modified']
+            if validators:
+                request = request.copy()
+                request.headers.update(validators)
+
+        resp = self.adapter.send(request, stream=stream, **kwargs)
+
+        if cached and resp.status_code == 304:
+            self._logger.debug("Cache revalidated: '%s'", request.url)
+            meta['stored'] = time.time()
+            meta['ttl'] = ttl
+            self.cache.touch(key, meta)
+            resp.close()
+            return self._build_response(request, meta, body)
+
+        if resp.status_code == 200:
+            headers = {k: v for k, v in resp.headers.items() if k.lower() not in self._HOP_HEADERS}
+            meta = {'url': request.url, 'status': resp.status_code, 'reason': resp.reason, 'headers': headers,
+                    'stored': time.time(), 'ttl': ttl}
+            self.cache.put(key, meta, resp.content)
+
+        return resp
+
+    def close(self):
+        self.adapter.close()
+
+
+def install_http_cache(session, cache_dir, max_size, rules, logger=None):
+    """Wrap every transport adapter mounted on the `session` with a :class:`CachingAdapter` sharing one cache."""
+    cache = HTTPCache(cache_dir, max_size=max_size, logger=logger)
+    for prefix, adapter in list(session.adapters.items()):
+        session.mount(prefix, CachingAdapter(adapter, cache, rules, logger=logger))
+
+    return cache
@@ -0,0 +1,153 @@
+import os
+import subprocess
+import threading
+import logging
+
+from .utils import LogPipe
+
+
+class TSFileSink(object):
+    """The merged TS file the segments are appended to."""
+    def __init__(self, path):
+        self.path = path
+        self.out = open(path, 'wb')
+
+    def close(self):
+        self.out.close()
+        return True
+
+    def abort(self):
+        self.out.close()
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+
+
+class FFmpegSink(object):
+    """A running ffmpeg process remuxing whatever is written to its stdin into `path`."""
+    def __init__(self, cmd, path, logger):
+        self.path = path
+        self._log_pipe = LogPipe(logger, logging.INFO)
+        try:
+            self._proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=self._log_pipe, stderr=subprocess.STDOUT)
+        except OSError:
+            self._log_pipe.close()
+            raise
+        self.out = self._proc.stdin
+
+    def close(self):
+        try:
+            self.out.close()
+        except BrokenPipeError:
+            pass
+        self._proc.wait()
+        self._log_pipe.close()
+
+        return self._proc.returncode == 0
+
+    def abort(self):
+        self._proc.kill()
+        try:
+            self.out.close()
+        except BrokenPipeError:
+            pass
+        self._proc.wait()
+        self._log_pipe.close()
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+
+
+class ProgressiveJoiner(threading.Thread):
+    """Append the segments of an episode to the merged output strictly in order, each one as soon as it and all the
+    preceding ones have been downloaded, so that most of the joining overlaps the downloading.
+
+    A segment counts as downloaded once `is_downloaded(episode_dir, fname)` says so, which is checked whenever
+    :meth:`notify` is called, e.g. on the aria2 completion events, and every `poll_interval` seconds otherwise.
+    """
+    def __init__(self, episode_dir, fnames, seckeys, open_sink, write_segment, is_downloaded, chunk_size=1 << 20,
+                 poll_interval=0.5, logger=None):
+        """
+        Args:
+            episode_dir (str): The directory the segments are downloaded into
+            fnames (list): File names of the segments in order
+            seckeys (SeckeyRanges): The seckeys of the segments, by which they are decrypted on the fly, if any
+            open_sink (callable): Return a new sink, i.e. :class:`TSFileSink` or :class:`FFmpegSink`
+            write_segment (callable): Called as `write_segment(out, fn_abs, seckey, chunk_size)` for every segment
+            is_downloaded (callable): Called as `is_downloaded(episode_dir, fname)`
+            chunk_size (int): Size of the buffer the segments are decrypted or copied through
+            poll_interval (float): Interval in seconds between checking the segments on disk
+            logger (logging.Logger): Logger for the joining errors
+        """
+        super().__init__(name='mdl-join-' + os.path.basename(episode_dir), daemon=True)
+        self.episode_dir = episode_dir
+        self.fnames = fnames
+        self.seckeys = seckeys or [None] * len(fnames)
+        self.open_sink = open_sink
+        self.write_segment = write_segment
+        self.is_downloaded = is_downloaded
+        self.chunk_size = chunk_size
+        self.poll_interval = poll_interval
+        self._logger = logger or logging.getLogger('.'.join(['MDL', 'ProgressiveJoiner']))
+
+        self.joined = 0  # number of segments merged so far
+        self.succeeded = False
+
+        self._cond = threading.Condition()
+        self._download_over = False
+        self._aborted = False
+
+    def notify(self):
+        """Wake the joiner up to check for the newly downloaded segments."""
+        with self._cond:
+            self._cond.notify()
+
+    def finish(self, completed):
+        """Wait for the joining to end, after the downloading of the episode has ended.
+
+        Args:
+            completed (bool): Whether all the segments have been downloaded, otherwise the partial output is dropped
+
+        Returns:
+            bool: True if the episode has been joined successfully.
+        """
+        with self._cond:
+            self._download_over = True
+            self._aborted = not completed
+            self._cond.notify()
+        self.join()
+
+        return self.succeeded
+
+    def _wait_for(self, fname):
+        with self._cond:
+            while not self._aborted:
+                if self.is_downloaded(self.episode_dir, fname):
+                    return True
+                if self._download_over:
+                    return False
+                self._cond.wait(self.poll_interval)
+
+            return False
+
+    def run(self):
+        try:
+            sink = self.open_sink()
+        except OSError as e:
+            self._logger.error("Progressive joining of '%s' failed: '%r'", self.episode_dir, e)
+            return
+
+        try:
+            for fn, seckey in zip(self.fnames, self.seckeys):
+                if not self._wait_for(fn):
+                    sink.abort()
+                    return
+
+                self.write_segment(sink.out, os.path.join(self.episode_dir, fn), seckey, self.chunk_size)
+                self.joined += 1
+        except (OSError, ValueError) as e:
+            self._logger.error("Progressive joining of '%s' failed at segment %d: '%r'", self.episode_dir, self.joined, e)
+            sink.abort()
+            return
+
+        self.succeeded = sink.close()
+        if not self.succeeded:
+            self._logger.error("Progressive joining of '%s' failed", self.episode_dir)
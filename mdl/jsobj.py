@@ -0,0 +1,155 @@
+"""Parse the JavaScript object literals embedded in web pages, e.g. `window.__PINIA__ = {...}`, into Python objects.
+
+Besides JSON it accepts what shows up in the serialized page states: unquoted and single-quoted keys, single-quoted
+strings, JS-only escapes, comments, trailing commas, array holes, `undefined`, `void 0`, the minified `!0` and `!1`,
+`NaN`, `Infinity`, hex numbers, numbers with a leading `+` or a leading or trailing dot, numeric keys,
+`new Map([...])`, `new Set([...])`, `Array.from([...])` and `Array.prototype.slice.call({...})`.
+Any other constructor or function call evaluates to None, and so does a bare identifier.
+
+The text is tokenized in a single regex pass, in which the JSON-compatible runs, usually the vast majority of a page
+state, are matched in bulk and kept as is, and only the JS-only tokens are rewritten, so that the objects are built by
+the C decoder of the `json` module. A call is rewritten to the marker object `{"\\u0000<callee>": [<args>]}`, which is
+evaluated by the `object_hook`.
+"""
+import re
+import json
+
+__all__ = ['JSParseError', 'loads']
+
+
+class JSParseError(ValueError):
+    pass
+
+
+_STRING_JSON = r'"[^"\\\n]*(?:\\(?:["\\/bfnrt]|u[0-9a-fA-F]{4})[^"\\\n]*)*"'
+_IDENT = r'[A-Za-z_$][\w$]*'
+
+_TOKEN_RE = re.compile(r'''
+    (?P<plain>(?:
+        [^"'A-Za-z_$/(),0-9.+!]+
+      | {string}
+      | (?<![\w$.])\d+(?:\.\d+)?(?:[eE][-+]?\d+)?(?![\w$.]|\s*:)
+      | ,(?!\s*[\]}),])
+      | (?<![\w$])(?:true|false|null)(?![\w$]|\s*:)
+    )+)
+  | (?P<comma>,(?P<hole>(?=\s*,))?)
+  | (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+  | (?P<comment>//[^\n]*|/\*.*?\*/)
+  | (?P<bool>!\s*[01](?![\w$.]))
+  | (?P<void>void\s*(?:0|\(\s*0\s*\)))
+  | \+?(?P<number>(?:0[xX][0-9a-fA-F]+|\d+\.?\d*(?:[eE][-+]?\d+)?|\.\d+(?:[eE][-+]?\d+)?))(?P<numkey>\s*:)?
+  | (?P<callee>(?:new\s+)?{ident}(?:\s*\.\s*{ident})*)(?P<call>\s*\()?(?P<key>\s*:)?
+  | (?P<close>\))
+'''.replace('{string}', _STRING_JSON).replace('{ident}', _IDENT), re.VERBOSE | re.DOTALL)
+_CALLEE_SPACES_RE = re.compile(r'\s*\.\s*|\s+')
+_BARE_DOT_RE = re.compile(r'^\.|\.(?!\d)')  # the dot of '.5' or of '5.', '5.e3'
+
+_ESCAPE_RE = re.compile(r'\\(u\{[0-9a-fA-F]+\}|u[0-9a-fA-F]{4}|x[0-9a-fA-F]{2}|\r\n|.)', re.DOTALL)
+_SIMPLE_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f', 'v': '\v', '0': '\0',
+                   '\n': '', '\r': '', '\r\n': '', '\u2028': '', '\u2029': ''}
+# the identifiers meaning the same to the `json` module
+_JSON_IDENTS = {'true', 'false', 'null', 'NaN', 'Infinity'}
+
+
+def _unescape(match):
+    esc = match.group(1)
+    if esc[0] == 'u' and len(esc) > 1:
+        return chr(int(esc[2:-1] if esc[1] == '{' else esc[1:], 16))
+    if esc[0] == 'x' and len(esc) == 3:
+        return chr(int(esc[1:], 16))
+
+    return _SIMPLE_ESCAPES.get(esc, esc)
+
+
+def _json_number(num):
+    """Rewrite the JS number `num`, e.g. '0x1f', '.5' or '5.', as a JSON one."""
+    if num[:2] in ('0x', '0X'):
+        return str(int(num, 16))
+    return _BARE_DOT_RE.sub(lambda m: '.0' if m.start() else '0.', num)
+
+
+def _eval_call(callee, args):
+    if callee == 'new Map':
+        try:
+            return {entry[0]: entry[1] for entry in (args[0] if args else [])}
+        except (TypeError, IndexError, KeyError):
+            return {}
+    if callee in ('new Set', 'Array.from'):
+        return args[0] if args and isinstance(args[0], list) else []
+    if callee == 'Array.prototype.slice.call':
+        if not args or not isinstance(args[0], dict):
+            return []
+        try:
+            length = int(args[0].get('length') or 0)
+        except (TypeError, ValueError):
+            length = 0
+        return [args[0].get(str(idx)) for idx in range(length)]
+
+    return None
+
+
+def _object_hook(obj):
+    if len(obj) == 1:
+        key = next(iter(obj))
+        if key[:1] == '\0':
+            return _eval_call(key[1:], obj[key])
+
+    return obj
+
+
+class _Translator(object):
+    """The replacement function of the tokenizing pass, rewriting every JS-only token to its JSON equivalent."""
+    def __init__(self):
+        self.has_calls = False
+        self._open_calls = 0
+
+    def __call__(self, match):
+        kind = match.lastgroup
+        if kind == 'plain':
+            return match.group()
+        if kind == 'comma':
+            return ',null' if match.group('hole') is not None else ''  # a hole, or a trailing comma
+        if kind == 'string':
+            return json.dumps(_ESCAPE_RE.sub(_unescape, match.group()[1:-1]), ensure_ascii=False)
+        if kind == 'comment':
+            return ' '
+        if kind == 'void':
+            return 'null'
+        if kind == 'bool':
+            return 'true' if match.group()[-1] == '0' else 'false'
+        if kind == 'close':
+            if not self._open_calls:
+                raise JSParseError("Unbalanced ')' at char {}".format(match.start()))
+            self._open_calls -= 1
+            return ']}'
+
+        num = match.group('number')
+        if num is not None:
+            num = _json_number(num)
+            return '"{}":'.format(num) if match.group('numkey') else num
+
+        callee = _CALLEE_SPACES_RE.sub(lambda m: ' ' if m.group().isspace() else '.', match.group('callee'))
+        if match.group('call'):
+            self.has_calls = True
+            self._open_calls += 1
+            return '{{"\\u0000{}":['.format(callee)
+        if match.group('key'):
+            return '"{}":'.format(callee)
+        if callee in _JSON_IDENTS:
+            return callee
+
+        return 'null'  # `undefined`, `new Foo` without arguments, or a reference to a variable
+
+
+def loads(text):
+    """Parse the JS literal `text`, which may be surrounded by whitespace and followed by a semicolon.
+
+    Raises:
+        JSParseError: Raised when `text` is not a valid literal.
+    """
+    translator = _Translator()
+    translated = _TOKEN_RE.sub(translator, text.strip().rstrip(';'))
+    try:
+        return json.loads(translated, object_hook=_object_hook if translator.has_calls else None)
+    except json.JSONDecodeError as e:
+        raise JSParseError("{}, near '{}'".format(e.msg, e.doc[max(0, e.pos - 40):e.pos + 40]))
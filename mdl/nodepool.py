@@ -0,0 +1,200 @@
+import subprocess
+import threading
+import queue
+import time
+import atexit
+import logging
+
+
+class NodeWorkerError(Exception):
+    pass
+
+
+class NodeWorker(object):
+    """A long-lived `node` process answering one request line with one response line, e.g. `vqq_ckey-*.js`."""
+    def __init__(self, cmd, timeout=10):
+        """
+        Args:
+            cmd (list): The command line running the script, e.g. ['node', '/path/to/vqq_ckey-8.5.js']
+            timeout (float): Time in seconds to wait for every response
+        """
+        self.cmd = cmd
+        self.timeout = timeout
+        self.requests = 0  # number of requests served by the current process
+
+        self._proc = None
+        self._lines = None
+
+    def is_alive(self):
+        return self._proc is not None and self._proc.poll() is None
+
+    def _read_lines(self, proc, lines):
+        for line in iter(proc.stdout.readline, ''):
+            lines.put(line)
+        lines.put(None)  # EOF, the process has exited
+
+    def start(self):
+        self._lines = queue.Queue()
+        try:
+            self._proc = subprocess.Popen(self.cmd, bufsize=1, universal_newlines=True, encoding='utf-8',
+                                          stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        except OSError as e:
+            raise NodeWorkerError("Failed to run '{}': '{!r}'".format(' '.join(self.cmd), e))
+        threading.Thread(target=self._read_lines, args=(self._proc, self._lines), daemon=True).start()
+        self.requests = 0
+
+    def stop(self):
+        if self._proc is None:
+            return
+
+        try:
+            self._proc.stdin.close()  # let it exit on its own at the end of the input
+            self._proc.wait(timeout=1)
+        except (OSError, subprocess.TimeoutExpired):
+            self._proc.kill()
+            self._proc.wait()
+        self._proc = None
+
+    def request(self, line):
+        """Send one request line and return the response line.
+
+        Raises:
+            NodeWorkerError: Raised when the process has died, or failed to respond in time.
+        """
+        if not self.is_alive():
+            self.start()
+
+        try:
+            # the request must be written in one go, as the script takes whatever is readable as one request line
+            self._proc.stdin.write(line + '\n')
+            self._proc.stdin.flush()
+        except OSError as e:
+            raise NodeWorkerError("Failed to send the request: '{!r}'".format(e))
+
+        try:
+            resp = self._lines.get(timeout=self.timeout)
+        except queue.Empty:
+            raise NodeWorkerError("No response within {}s".format(self.timeout))
+        if resp is None:
+            raise NodeWorkerError("The process exited with code {}".format(self._proc.wait()))
+
+        self.requests += 1
+        return resp.rstrip('\r\n')
+
+
+class NodeWorkerPool(object):
+    """A fixed number of :class:`NodeWorker`, shared by the threads calling :meth:`request` concurrently.
+
+    The workers are started on first use, restarted after crashing or hanging, and recycled after serving
+    `max_requests` requests. The latency of the requests is tracked for reporting.
+    """
+    CANCEL_POLL_INTERVAL = 0.1  # seconds between checking for the cancellation while waiting for an idle worker
+
+    def __init__(self, cmd, size=2, timeout=10, max_requests=50, logger=None):
+        """
+        Args:
+            cmd (list): The command line of every worker
+            size (int): Number of the workers
+            timeout (float): Time in seconds to wait for every response
+            max_requests (int): Number of requests after which a worker is restarted, 0 means never
+            logger (logging.Logger): Logger for the worker failures and the latency metrics
+        """
+        self.size = max(1, size)
+        self.max_requests = max_requests
+        self._logger = logger or logging.getLogger('.'.join(['MDL', 'NodeWorkerPool']))
+
+        self._idle = queue.LifoQueue()  # reuse the warm workers first
+        for _ in range(self.size):
+            self._idle.put(NodeWorker(cmd, timeout=timeout))
+
+        self._lock = threading.Lock()
+        self._metrics = {'requests': 0, 'errors': 0, 'restarts': 0, 'total_secs': 0.0, 'max_secs': 0.0}
+        self._closed = False
+
+        atexit.register(self.close)
+
+    def _record(self, secs=None, error=False, restart=False):
+        with self._lock:
+            if secs is not None:
+                self._metrics['requests'] += 1
+                self._metrics['total_secs'] += secs
+                self._metrics['max_secs'] = max(self._metrics['max_secs'], secs)
+            if error:
+                self._metrics['errors'] += 1
+            if restart:
+                self._metrics['restarts'] += 1
+
+    def request(self, line, retries=1, validate=None, cancelled=None):
+        """Send one request line to an idle worker, blocking until one is available, and return the response line.
+
+        Args:
+            line (str): The request without the line terminator
+            retries (int): Number of times to retry on a restarted worker after a failure
+            validate (callable): Health check of the worker by its response, a falsy return value counts as a failure
+            cancelled (threading.Event): Give up waiting for an idle worker once set, returning None
+
+        Raises:
+            NodeWorkerError: Raised when all the tries have failed.
+        """
+        if cancelled is None:
+            worker = self._idle.get()
+        else:
+            while True:
+                if cancelled.is_set():
+                    return None
+                try:
+                    worker = self._idle.get(timeout=self.CANCEL_POLL_INTERVAL)
+                    break
+                except queue.Empty:
+                    pass
+            if cancelled.is_set():
+                self._idle.put(worker)
+                return None
+
+        try:
+            if self.max_requests and worker.requests >= self.max_requests:
+                worker.stop()
+
+            for attempt in range(1 + retries):
+                start = time.monotonic()
+                try:
+                    resp = worker.request(line)
+                    if validate and not validate(resp):
+                        raise NodeWorkerError("Unexpected response: '{}'".format(resp))
+                    self._record(secs=time.monotonic() - start)
+                    return resp
+                except NodeWorkerError as e:
+                    self._logger.warning("node worker failed: '%s'%s", e, ", restarting it..." if attempt < retries else "")
+                    worker.stop()
+                    self._record(error=True, restart=attempt < retries)
+                    if attempt == retries:
+                        raise
+        finally:
+            self._idle.put(worker)
+
+    def stats(self):
+        """Return the number of requests, errors and restarts, and the average and max latency in seconds."""
+        with self._lock:
+            metrics = dict(self._metrics)
+        total_secs = metrics.pop('total_secs')
+        metrics['avg_secs'] = total_secs / metrics['requests'] if metrics['requests'] else 0.0
+
+        return metrics
+
+    def report(self):
+        st = self.stats()
+        if st['requests'] or st['errors']:
+            self._logger.info("node workers: %d request(s), avg latency %.2fs, max %.2fs, %d error(s), %d restart(s)",
+                              st['requests'], st['avg_secs'], st['max_secs'], st['errors'], st['restarts'])
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+
+        self.report()
+        while True:
+            try:
+                self._idle.get_nowait().stop()
+            except queue.Empty:
+                break
@@ -0,0 +1,111 @@
+import threading
+import queue
+import time
+import logging
+
+
+class PipelineStage(object):
+    def __init__(self, name, func):
+        """A named step of the pipeline.
+
+        Args:
+            name (str): The stage name used when reporting the utilisation
+            func (callable): Called with the item handed over by the previous stage, its return value is passed on
+                to the next stage. Returning `None` drops the item.
+        """
+        self.name = name
+        self.func = func
+        self.busy_secs = 0.0
+        self.items = 0
+
+
+class Pipeline(object):
+    """Run a sequence of stages over a stream of items, each stage in its own thread, with bounded queues in between,
+    so that item N+1 is being processed by an earlier stage while item N is still going through a later one.
+    """
+    _SENTINEL = object()
+
+    def __init__(self, stages, maxsize=1, logger=None):
+        """
+        Args:
+            stages (list): List of `(name, func)` tuples in the processing order
+            maxsize (int): Maximum number of items waiting in between any two adjacent stages
+            logger (logging.Logger): Logger for reporting the stage utilisation
+        """
+        self.stages = [PipelineStage(name, func) for name, func in stages]
+        self.maxsize = max(1, maxsize)
+        self._logger = logger or logging.getLogger('.'.join(['MDL', 'Pipeline']))
+
+        self._error = None
+        self._wall_secs = 0.0
+
+    def _run_stage(self, stage, q_in, q_out):
+        while True:
+            item = q_in.get()
+            if item is self._SENTINEL:
+                break
+
+            # keep draining the upstream queue after a failure so that no stage blocks forever
+            if self._error is not None:
+                continue
+
+            start = time.monotonic()
+            try:
+                res = stage.func(item)
+            except BaseException as e:
+                self._error = e
+                continue
+            finally:
+                stage.busy_secs += time.monotonic() - start
+                stage.items += 1
+
+            if res is not None and q_out is not None:
+                q_out.put(res)
+
+        if q_out is not None:
+            q_out.put(self._SENTINEL)
+
+    def run(self, items):
+        """Feed `items` through all the stages and wait for them to finish.
+
+        Raises:
+            The first exception raised by any stage, after all the stage threads have finished.
+        """
+        queues = [queue.Queue(maxsize=self.maxsize) for _ in self.stages]
+        threads = []
+        for i, stage in enumerate(self.stages):
+            q_out = queues[i + 1] if i + 1 < len(queues) else None
+            t = threading.Thread(target=self._run_stage, args=(stage, queues[i], q_out),
+                                 name='mdl-pipeline-' + stage.name, daemon=True)
+            t.start()
+            threads.append(t)
+
+        start = time.monotonic()
+        for item in items:
+            if self._error is not None:
+                break
+            queues[0].put(item)
+        queues[0].put(self._SENTINEL)
+
+        for t in threads:
+            t.join()
+        self._wall_secs = time.monotonic() - start
+
+        self.report()
+
+        if self._error is not None:
+            raise self._error
+
+    def stats(self):
+        """Return the per-stage busy time and utilisation, i.e. the fraction of the wall-clock time a stage was busy."""
+        wall = self._wall_secs or float('inf')
+        return {stage.name: {'items': stage.items, 'busy_secs': stage.busy_secs, 'utilisation': stage.busy_secs / wall}
+                for stage in self.stages}
+
+    def report(self):
+        serial_secs = sum(stage.busy_secs for stage in self.stages)
+        for name, st in self.stats().items():
+            self._logger.info("Pipeline stage '%s': %d item(s), busy %.1fs, utilisation %.0f%%",
+                              name, st['items'], st['busy_secs'], st['utilisation'] * 100)
+        self._logger.info("Pipeline finished in %.1fs against %.1fs if run serially, %.1fs saved by overlapping the stages",
+                          self._wall_secs, serial_secs, max(0.0, serial_secs - self._wall_secs))
@@ -0,0 +1,91 @@
+from bisect import bisect_right
+
+
+class SeckeyRanges(object):
+    """The seckeys of the segments of an episode, run-length encoded.
+
+    Every distinct seckey dict `{'algo': ..., 'key': ..., 'iv': ...}` is stored once in `keys`, and the segments
+    sharing one are stored as ranges `(first_idx, last_idx, key_ref, iv_mode)`, `key_ref` being the index into `keys`.
+    `iv_mode` is None if the IV of the key applies, or the media sequence number of the segment `first_idx` if the IV
+    of every segment is to be derived from its sequence number, as per HLS when the EXT-X-KEY has no IV attribute.
+
+    Iterating or indexing yields the seckey dict of every segment, built on the fly only if its IV is derived, or the
+    NONE one for a segment already decrypted in place.
+    """
+    __slots__ = ('keys', 'ranges', 'failed', 'decrypted', '_size', '_key_refs')
+
+    _SECKEY_NONE = {'algo': "NONE", 'key': None, 'iv': None}
+
+    def __init__(self):
+        self.keys = []
+        self.ranges = []
+        self.failed = set()  # indices of the segments failed to decrypt
+        self.decrypted = set()  # indices of the segments decrypted in place, e.g. by a previous run
+        self._size = 0
+        self._key_refs = {}  # {id(seckey): key_ref}
+
+    def add_key(self, seckey):
+        """Return the `key_ref` of the seckey dict, adding it unless already added."""
+        key_ref = self._key_refs.get(id(seckey))
+        if key_ref is None:
+            key_ref = self._key_refs[id(seckey)] = len(self.keys)
+            self.keys.append(seckey)
+
+        return key_ref
+
+    def append(self, key_ref, seqnum=0):
+        """Append the next segment, encrypted with the key `key_ref`, of the media sequence number `seqnum`."""
+        key = self.keys[key_ref]
+        iv_mode = seqnum if key['algo'] != "NONE" and key['iv'] is None else None
+
+        if self.ranges:
+            first, last, last_ref, last_iv_mode = self.ranges[-1]
+            if last_ref == key_ref and (iv_mode is None if last_iv_mode is None
+                                        else iv_mode == last_iv_mode + last - first + 1):
+                self.ranges[-1] = (first, self._size, key_ref, last_iv_mode)
+                self._size += 1
+                return
+
+        self.ranges.append((self._size, self._size, key_ref, iv_mode))
+        self._size += 1
+
+    def __len__(self):
+        return self._size
+
+    @staticmethod
+    def _seckey_at(key, first, idx, iv_mode):
+        if iv_mode is None:
+            return key
+        return dict(key, iv=(iv_mode + idx - first).to_bytes(16, 'big'))
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += self._size
+        if not 0 <= idx < self._size:
+            raise IndexError("segment index out of range")
+
+        if idx in self.decrypted:
+            return self._SECKEY_NONE
+        first, _, key_ref, iv_mode = self.ranges[bisect_right(self.ranges, (idx, float('inf'))) - 1]
+        return self._seckey_at(self.keys[key_ref], first, idx, iv_mode)
+
+    def __iter__(self):
+        for first, last, key_ref, iv_mode in self.ranges:
+            key = self.keys[key_ref]
+            for idx in range(first, last + 1):
+                yield self._SECKEY_NONE if idx in self.decrypted else self._seckey_at(key, first, idx, iv_mode)
+
+    def iter_encrypted(self):
+        """Yield `(idx, key, iv)` of every encrypted segment not decrypted yet."""
+        for first, last, key_ref, iv_mode in self.ranges:
+            key = self.keys[key_ref]
+            if key['algo'] == "NONE":
+                continue
+            for idx in range(first, last + 1):
+                if idx in self.decrypted:
+                    continue
+                yield idx, key['key'], key['iv'] if iv_mode is None else (iv_mode + idx - first).to_bytes(16, 'big')
+
+    @property
+    def encrypted(self):
+        return any(True for _ in self.iter_encrypted())
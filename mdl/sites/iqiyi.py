@@ -8,6 +8,7 @@ import json
 
 from requests import RequestException
 
+from mdl import hls
 from mdl.videoconfig import VideoConfig
 from mdl.commons import VideoTypes
 from mdl.utils import json_path_get
@@ -20,6 +21,10 @@ class IQiyiVC(VideoConfig):
     ]
     SOURCE_NAME = "IQiyi"
     VC_NAME = "IQiyi"
+    _HTTP_CACHE_RULES = [
+        {'pat': r'^https?://mesh\.if\.iqiyi\.com/player/lw/lwplay/accelerator\.js', 'ttl': 86400},  # player script
+        {'pat': r'^https?://mesh\.if\.iqiyi\.com/tvg/v2/lw/base_info', 'ttl': 300}  # cover info and episode lists
+    ]
 
     _IQIYI_DEFN_MAP_I2S = {800: 'uhd', 600: 'fhd', 500: 'shd', 300: 'hd', 200: 'sd'}
     _IQIYI_DEFN_MAP_S2I = {'dolby': 800, 'suhd': 800, 'hdr10': 800, 'uhd': 800, 'fhd': 600, 'shd': 500, 'hd': 300, 'sd': 200}
@@ -240,7 +245,7 @@ class IQiyiVC(VideoConfig):
                 return
             vd = vd[0]
 
-            ts_urls = [ts for ts in vd['m3u8'].split('\n') if ts and not ts.startswith('#')]
+            ts_urls = hls.parse(vd['m3u8'].splitlines()).segments.uris
             std_defn = self._IQIYI_DEFN_MAP_I2S[vd['bid']]
             vi["defns"].setdefault(std_defn, []).append(dict(ext=vd['ff'], urls=ts_urls))
 
@@ -3,12 +3,13 @@ import time
 import re
 import random
 import hashlib
-from urllib.parse import quote as urllib_parse_quote, urlencode, urljoin
+from urllib.parse import quote as urllib_parse_quote, urlencode
 from math import floor as math_floor
 
 # from requests.cookies import RequestsCookieJar
 from requests import RequestException
 
+from mdl import hls
 from mdl.videoconfig import VideoConfig
 from mdl.commons import VideoTypes
 from mdl.utils import json_path_get
@@ -25,6 +26,10 @@ class M1905VC(VideoConfig):
     ]
     SOURCE_NAME = "M1905"
     VC_NAME = "M1905"
+    _HTTP_CACHE_RULES = [
+        {'pat': r'^https?://www\.1905\.com/', 'ttl': 300},  # cover/episode pages
+        {'pat': r'^https?://vip\.1905\.com/play/', 'ttl': 300}
+    ]
     #_VIP_TOKEN = {}
 
     _M1905_DEFINITION = {'free': ['uhd', 'hd', 'sd'], 'vip': ['v1080pm3u8', 'ipad800kbm3u8', 'm3u8ipad', 'm3u8iphone']}  # decremental!
@@ -74,10 +79,12 @@ class M1905VC(VideoConfig):
         self._VIDEO_COVER_FORMAT = "https://www.1905.com/mdb/film/{}/video"
         self._PROFILE_CONFIG_URL = "https://profile.m1905.com/mvod/getVideoinfo.php"
         self._VIP_CONFIG_URL = "https://vip.1905.com/playerhtml5/formal"
-        self._apikey = ""
         self._appid = "dde3d61a0411511d"
         self._playerid = self._random_string().replace('-', '')[5:20]
 
+        # the variant of a master playlist is picked by the `variant_*` caps and budgets
+        self._variant_selector = hls.VariantSelector.from_confs(self._requester, self.confs, logger=self._logger)
+
         # make sure _VIDEO_URL_PATS has a compiled version, which should have been done in @classmethod is_url_valid
         for pat in self._VIDEO_URL_PATS:
             if pat.get('cpat') is None:
@@ -126,8 +133,6 @@ class M1905VC(VideoConfig):
                     conf_match = self._SD_CONF_PAT_RE.search(r.text)
 
                 if conf_match:
-                    self._apikey = conf_match.group('apikey')
-
                     video_config = conf_match.group(0)  # VODCONFIG | VIDEOCONFIG
                     re_cover_id = r"mdbfilmid\s*:\s*\"(\d+)\""
                     cover_id_match = re.search(re_cover_id, video_config, flags=re.MULTILINE | re.DOTALL | re.IGNORECASE)
@@ -245,53 +250,16 @@ class M1905VC(VideoConfig):
 
                 return cover_info
 
-    @staticmethod
-    def _pick_highest_bandwidth_m3u8(playlist_variants):
-        bandwidth, m3u = 0, ""
-        streams = playlist_variants.splitlines()
-        i = 0
-        while i < len(streams):
-            stream = streams[i]
-            if stream and stream.startswith("#EXT-X-STREAM-INF:"):
-                # skip the blank and comment lines, if any
-                while not streams[i + 1] or streams[i + 1].startswith("#"):
-                    i += 1
-
-                stream_match = re.search(r"BANDWIDTH\s*=\s*(\d+)", stream)
-                if stream_match:
-                    matched = int(stream_match.group(1))
-                    if matched > bandwidth:
-                        bandwidth = matched
-                        m3u = streams[i + 1]
-
-                i += 2
-            else:
-                i += 1
-
-        return bandwidth, m3u
-
     def _get_ts_playlist(self, m3u8_url):
-        playlist = m3u8_url
         try:
-            for _ in range(2):
-                r = self._requester.get(playlist)
-                if r.status_code == 200:
-                    r.encoding = "utf-8"
-                    for line in r.iter_lines(decode_unicode=True):
-                        if not line:
-                            continue
-                        if line.startswith("#EXT-X-STREAM-INF:"):  # in master playlist
-                            _, m3u = self._pick_highest_bandwidth_m3u8(r.text)
-                            playlist = urljoin(playlist, m3u)
-                            break
-                        elif line.startswith("#EXTINF:"):  # in media playlist
-                            mpeg_urls = [urljoin(playlist, ts) for ts in r.text.splitlines() if
-                                         ts and not ts.startswith('#') and (ts.endswith('.ts') or '.ts?' in ts)]
-                            return mpeg_urls
-                else:
-                    raise RequestException("Unexpected status code %i" % r.status_code)
+            playlist = hls.load(self._requester, m3u8_url, selector=self._variant_selector)
         except RequestException as e:
-            self._logger.error("Failed to fetch '%s': '%r'", playlist, e)
+            self._logger.error("Failed to fetch the playlist of '%s': '%r'", m3u8_url, e)
+            return
+        if not playlist:
+            return
+
+        return [ts for ts in playlist.segments.uris if ts.endswith('.ts') or '.ts?' in ts]
 
     def _update_video_dwnld_info_sd(self, vi):
         """
@@ -1,9 +1,10 @@
-import re
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urlparse
 import hashlib
 
 from requests import RequestException
 
+from mdl import hls
+from mdl.seckeys import SeckeyRanges
 from mdl.utils import normalize_filename
 from mdl.videoconfig import VideoConfig
 from mdl.commons import VideoTypes, DEFAULT_YEAR
@@ -18,7 +19,7 @@ class M3u8VC(VideoConfig):
     VC_NAME = "M3u8"
 
     _ENCRYPTION_METHODS = {"NONE", "AES-128"}
-    _SECKEY_NONE = {'algo': "NONE", 'key': None, 'iv': None, 'valid': None}
+    _SECKEY_NONE = {'algo': "NONE", 'key': None, 'iv': None}
 
     def __init__(self, args, confs):
         super().__init__(args, confs)
@@ -29,6 +30,18 @@ class M3u8VC(VideoConfig):
         opening_discontinuity = self.confs.get('opening_discontinuity')
         self.opening_discontinuity = True if opening_discontinuity and opening_discontinuity.lower() == 'true' else False
 
+        # the live/EVENT playlists are reloaded for the new segments till ENDLIST, or for `live_duration` seconds at most
+        follow_live = self.confs.get('follow_live')
+        self.follow_live = False if follow_live and follow_live.lower() == 'false' else True
+        self.live_duration = float(self.confs.get('live_duration') or 0)
+
+        # the decryption keys are fetched concurrently while the playlists are parsed, and only once per URI
+        key_workers = int(self.confs.get('key_workers') or 4)
+        self._key_manager = hls.KeyManager(self._requester, workers=key_workers, logger=self._logger)
+
+        # the variant of a master playlist is picked by the `variant_*` caps and budgets
+        self._variant_selector = hls.VariantSelector.from_confs(self._requester, self.confs, logger=self._logger)
+
     def get_video_cover_info(self, url):
         MAX_LEN = 120
         digest = hashlib.md5(url.encode("utf-8")).hexdigest()
@@ -71,9 +84,15 @@ class M3u8VC(VideoConfig):
                     "hd": [{
                         "ext": "ts",
                         "urls": ["https://t.com/hdv1.1.ts", "https://t.com/hdv1.2.ts"],
-                        "seckeys": [{"algo": "AES-128", "key": b"16-octet key bin", "iv": b"128-bit unsigned"},
-                                    {"algo": "NONE", "key": None, "iv": None}
-                                   ]
+                        # SeckeyRanges of [{"algo": "AES-128", "key": b"16-octet key bin", "iv": b"128-bit unsigned"},
+                        #                  {"algo": "NONE", "key": None, "iv": None}]
+                        "seckeys": SeckeyRanges,
+                        # only if any EXT-X-BYTERANGE, (length, offset) or None of every segment
+                        "byteranges": [(1048576, 0), (1048576, 1048576)],
+                        # only if the playlist is a live/EVENT one being followed, yielding the URLs, the SeckeyRanges
+                        # (or None) of all the segments so far, and the byteranges (or None), every time new segments
+                        # turn up
+                        "live": generator of (["https://t.com/hdv1.3.ts"], SeckeyRanges, None)
                     }],
                     "sd": [{
                         "ext": "ts",
@@ -85,153 +104,137 @@ class M3u8VC(VideoConfig):
         """
         defn = "hd"
 
-        ts_urls, seckeys = self._get_ts_playlist(vi['url'])
+        ts_urls, seckeys, byteranges, live = self._get_ts_playlist(vi['url'])
         if ts_urls:
             fmt = dict(ext="ts", urls=ts_urls)
+            if byteranges:
+                fmt['byteranges'] = byteranges
             if seckeys:
                 fmt['seckeys'] = seckeys
-                if not all([seckey['algo'] in self._ENCRYPTION_METHODS and seckey['key'] is not False for seckey in seckeys]):
-                    self._logger.error("Unsupported encryption method found for '%s'", vi['url'])
+                if not self._is_seckeys_supported(seckeys, vi['url']):
                     return
+            if live:
+                fmt['live'] = live
             vi['defns'].setdefault(defn, []).append(fmt)
 
-    def _get_seckey(self, ext_x_key, playlist_url):
-        _, _, cipher = ext_x_key.partition(":")
-        attribs = cipher.split(",")
-        kdict = {k.strip(): v.strip() for k, _, v in [attrib.partition("=") for attrib in attribs]}
+    def _is_seckeys_supported(self, seckeys, url):
+        if not all([seckey['algo'] in self._ENCRYPTION_METHODS and seckey['key'] is not False for seckey in seckeys.keys]):
+            self._logger.error("Unsupported encryption method found for '%s'", url)
+            return False
+
+        return True
 
+    def _get_seckey(self, key):
+        """Get the key of the EXT-X-KEY `key` (:class:`mdl.hls.Key`) from the key manager into a seckey dict."""
         seckey = self._SECKEY_NONE.copy()
 
-        algo = kdict.get('METHOD', 'NONE')
-        if algo == "NONE":
+        if key.method == "NONE":
             return seckey
-        seckey['algo'] = algo.upper()
-
-        iv = kdict.get('IV')
-        if iv:
-            iv = bytes.fromhex(iv[2:])
-            seckey['iv'] = iv
-
-        uri = kdict.get('URI')
-        if uri:
-            uri = urljoin(playlist_url, uri[1:-1])
-            try:
-                r = self._requester.get(uri)
-                if r.status_code == 200:
-                    seckey['key'] = r.content
-                else:
-                    raise RequestException("Unexpected status code %i" % r.status_code)
-            except RequestException as e:
-                seckey['key'] = False
-                self._logger.error("Failed to fetch the decryption key from '%s': '%r'", uri, e)
+        seckey['algo'] = key.method
+        seckey['iv'] = key.iv
+
+        if key.uri:
+            key_bin = self._key_manager.get(key.uri)
+            seckey['key'] = key_bin if key_bin is not None else False
         else:
             seckey['key'] = False
 
         return seckey
 
-    def _purge_media_playlist(self, m3u8_text, playlist_url):
-        segs = m3u8_text.splitlines()
-        nsegs = len(segs)
-        purged = []
-        i = 0
-        inbetween = self.opening_discontinuity if self.skip_discontinuity else False
+    def _purge_media_playlist(self, playlist, start=0, state=None):
+        """Drop the segments in between every two DISCONTINUITY tags if `skip_discontinuity`, returning the URLs and the
+        byte ranges of the remaining ones from the index `start` on, and the :class:`SeckeyRanges` of all the remaining
+        ones so far. The byte ranges are None if there's no EXT-X-BYTERANGE at all, so is the latter if there's no key.
 
-        seqnums, seqnum = [], 0
-        seckeys, seckey = [], None
-
-        # skip the header
-        while i < nsegs and (not segs[i] or segs[i].startswith("#")):
-            if segs[i] and segs[i].startswith("#EXT-X-MEDIA-SEQUENCE"):
-                seqnum = int(segs[i].split(":")[1])
-            if segs[i] and segs[i].startswith("#EXT-X-KEY"):
-                seckey = self._get_seckey(segs[i], playlist_url)
-                seckeys = []
-
-            i += 1
+        `state` carries the purging over the reloads of a live playlist, from which only the new segments are purged.
+        """
+        state = {} if state is None else state
+        first = 'inbetween' not in state
+        segments = playlist.segments
+
+        keys = playlist.keys
+        if not keys and playlist.session_keys:
+            keys = [playlist.session_keys[-1]]
+            key_ids = [0] * len(segments)  # the session key applies to all the segments
+        else:
+            key_ids = segments.key_ids
+
+        # the same seckey dict for the same EXT-X-KEY throughout the reloads, for the ranges of SeckeyRanges to merge
+        seckey_by_key = state.setdefault('seckey_by_key', {})
+        seckey_none = state.setdefault('seckey_none', self._SECKEY_NONE.copy())
+        seckeys = state.get('seckeys')
+        if seckeys is None and keys:
+            seckeys = state['seckeys'] = SeckeyRanges()
+            for _ in range(state.get('count', 0)):
+                seckeys.append(seckeys.add_key(seckey_none))  # the segments purged before the first key turned up
+        key_refs = [None] * len(keys)  # added to `seckeys` as they're met
+
+        # a DISCONTINUITY ahead of the first segment doesn't count, `opening_discontinuity` stands for it instead
+        discontinuities = set(segments.discontinuities) if self.skip_discontinuity else set()
+        if first:
+            discontinuities.discard(0)
+        inbetween = state.get('inbetween', self.opening_discontinuity if self.skip_discontinuity else False)
+
+        byteranges = segments.byteranges
+        ranges = [] if byteranges is not None else None
 
-        # filter out the DISCONTINUITY
-        for j in range(i, nsegs):
-            if not segs[j]:
-                continue
-            if segs[j].startswith("#EXT-X-DISCONTINUITY") and self.skip_discontinuity:
+        purged = []
+        for i in range(start, len(segments)):
+            if i in discontinuities:
                 inbetween = not inbetween
+            if inbetween:
                 continue
-            if inbetween or segs[j].startswith("#"):
-                if segs[j].startswith("#EXT-X-KEY"):
-                    if seckey is None:
-                        seckey = self._SECKEY_NONE.copy()
-                        seckeys = [seckey] * len(purged)
-                    seckey = self._get_seckey(segs[j], playlist_url)
 
-                if inbetween and not segs[j].startswith("#"):
-                    seqnum += 1
-
-                continue
-
-            if seckey:
-                seckeys.append(seckey.copy())
-
-            seqnums.append(seqnum)
-            seqnum += 1
-
-            purged.append(urljoin(playlist_url, segs[j]))
-
-        return purged, seckeys, seqnums
-
-    def _pick_highest_bandwidth_m3u8(self, playlist_variants, playlist_url):
-        bandwidth, m3u, sessionkey = 0, "", None
-        streams = playlist_variants.splitlines()
-        i = 0
-        while i < len(streams):
-            stream = streams[i]
-            if stream and stream.startswith("#EXT-X-STREAM-INF:"):
-                # skip the blank and comment lines, if any
-                while not streams[i + 1] or streams[i + 1].startswith("#"):
-                    i += 1
-
-                stream_match = re.search(r"BANDWIDTH\s*=\s*(\d+)", stream)
-                if stream_match:
-                    matched = int(stream_match.group(1))
-                    if matched > bandwidth:
-                        bandwidth = matched
-                        m3u = streams[i + 1]
-
-                i += 2
-            else:
-                if stream and stream.startswith("#EXT-X-SESSION-KEY:"):
-                    sessionkey = self._get_seckey(stream, playlist_url)
-                i += 1
-
-        return bandwidth, m3u, sessionkey
+            if seckeys is not None:
+                key_id = key_ids[i]
+                if key_id < 0:
+                    key_ref = seckeys.add_key(seckey_none)
+                else:
+                    key_ref = key_refs[key_id]
+                    if key_ref is None:
+                        key = keys[key_id]
+                        seckey = seckey_by_key.get(key)
+                        if seckey is None:
+                            seckey = seckey_by_key[key] = self._get_seckey(key)
+                        key_ref = key_refs[key_id] = seckeys.add_key(seckey)
+                seckeys.append(key_ref, segments.seqnums[i])
+            purged.append(segments.uris[i])
+            if ranges is not None:
+                ranges.append((byteranges[2 * i], byteranges[2 * i + 1]) if byteranges[2 * i] >= 0 else None)
+
+        state['inbetween'] = inbetween
+        state['count'] = state.get('count', 0) + len(purged)
+
+        return purged, seckeys, ranges
+
+    def _follow_live_playlist(self, playlist, state):
+        """Yield the URLs of the new segments, the :class:`SeckeyRanges` of all the segments so far, and the byte ranges
+        of the new segments, every time new segments turn up in the reloads of the live `playlist`."""
+        for reloaded, start in hls.follow(self._requester, playlist, duration=self.live_duration,
+                                          on_key=self._key_manager.prefetch, logger=self._logger):
+            purged, seckeys, ranges = self._purge_media_playlist(reloaded, start, state)
+            if seckeys and not self._is_seckeys_supported(seckeys, playlist.url):
+                return
+            if purged:
+                yield purged, seckeys, ranges
 
     def _get_ts_playlist(self, m3u8_url):
-        sessionkey = None
-        playlist = m3u8_url
+        """Return the URLs, the :class:`SeckeyRanges` and the byte ranges of the segments of the media playlist, and for
+        a live one that is followed, the generator of the new ones as well, see :meth:`_follow_live_playlist`."""
         try:
-            for _ in range(2):
-                r = self._requester.get(playlist)
-                if r.status_code == 200:
-                    r.encoding = "utf-8"
-                    for line in r.iter_lines(decode_unicode=True):
-                        if not line:
-                            continue
-                        if line.startswith("#EXT-X-STREAM-INF:"):  # in master playlist
-                            _, m3u, sessionkey = self._pick_highest_bandwidth_m3u8(r.text, playlist)
-                            playlist = urljoin(playlist, m3u)
-                            break
-                        elif line.startswith("#EXTINF:"):  # in media playlist
-                            mpeg_urls, seckeys, seqnums = self._purge_media_playlist(r.text, playlist)
-                            if not seckeys and sessionkey:
-                                seckeys = [sessionkey.copy() for _ in range(len(mpeg_urls))]
-                            if seckeys:
-                                for i, seckey in enumerate(seckeys):
-                                    if seckey['algo'] != "NONE" and seckey['iv'] is None:
-                                        seckey['iv'] = (seqnums[i]).to_bytes(16, 'big')
-
-                            return mpeg_urls, seckeys
-                else:
-                    raise RequestException("Unexpected status code %i" % r.status_code)
+            playlist = hls.load(self._requester, m3u8_url, on_key=self._key_manager.prefetch,
+                                selector=self._variant_selector)
         except RequestException as e:
-            self._logger.error("Failed to fetch '%s': '%r'", playlist, e)
-
-        return [], []
+            self._logger.error("Failed to fetch the playlist of '%s': '%r'", m3u8_url, e)
+            return [], None, None, None
+        if not playlist:
+            return [], None, None, None
+
+        state = {}
+        purged, seckeys, ranges = self._purge_media_playlist(playlist, state=state)
+        live = None
+        if playlist.is_live and self.follow_live:
+            self._logger.info("Following the live playlist of '%s'", m3u8_url)
+            live = self._follow_live_playlist(playlist, state)
+
+        return purged, seckeys, ranges, live
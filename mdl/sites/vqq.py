@@ -1,9 +1,10 @@
 import json
 import re
 import os
-import subprocess
 import math
 import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 from urllib.parse import urlencode
 
@@ -11,7 +12,10 @@ from requests import RequestException
 
 from mdl.commons import pick_highest_definition, sort_definitions, VideoTypeCodes, VideoTypes, VideoURLType, VideoDefnCodes
 from mdl.videoconfig import VideoConfig
-from mdl.utils import json_path_get, SpinWithBackoff
+from mdl.utils import json_path_get, RateLimiter
+from mdl.nodepool import NodeWorkerPool, NodeWorkerError
+from mdl import jsobj
+from mdl.hoststats import HostStats
 
 mdl_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -36,6 +40,11 @@ class QQVideoVC(VideoConfig):
     ]
     SOURCE_NAME = "Tencent"
     VC_NAME = "QQVideo"
+    _HTTP_CACHE_RULES = [
+        {'pat': r'^https?://v\.qq\.com/x/(?:cover|page)/', 'ttl': 300},  # cover/episode pages
+        {'pat': r'^https?://pbaccess\.video\.qq\.com/trpc\.vector_layout\.page_view\.PageService/getPage',
+         'ttl': 300, 'methods': ('POST',)}  # episode lists
+    ]
     # _VIP_TOKEN = {}
 
     _ENCRYPTVER_to_APPVER = {
@@ -105,25 +114,17 @@ class QQVideoVC(VideoConfig):
                                         r"|\"coverInfo\"\s*:\s*(.+?),\s*\"videoInfo\""
                                         r"|coverInfoMap\s*:\s*{\s*\w+\s*:\s*(.+?)\s*}\s*,\s*videoInfoMap",
                                         re.MULTILINE | re.DOTALL | re.IGNORECASE)
-        self._VIDEO_INFO_RE = re.compile(r"var\s+VIDEO_INFO\s*=\s*(.+?);?</script>"
+        # the blobs may run to several MB, so they are matched up to the `</script>` greedily rather than lazily
+        self._VIDEO_INFO_RE = re.compile(r"var\s+VIDEO_INFO\s*=\s*([^<]*(?:<(?!/script>)[^<]*)*)</script>"
                                          r"|\"episodeSinglePlay\".+?\"item_params\"\s*:\s*({.+?})\s*,\s*\"\s*sub_items"
                                          r"|videoInfoMap\s*:\s*{\s*\w+\s*:\s*(.+?)\s*}\s*,\s*initialCid",
                                          re.MULTILINE | re.DOTALL | re.IGNORECASE)
-        self._ALL_LOADED_INFO_RE = re.compile(r"window\.__PINIA__\s*=\s*(.+?);?</script>"
+        self._ALL_LOADED_INFO_RE = re.compile(r"window\.__PINIA__\s*=\s*([^<]*(?:<(?!/script>)[^<]*)*)</script>"
                                               r"|_piniaState\s*:\s*(.+?)\s*,\s*isHarmonyClient",
                                               re.MULTILINE | re.DOTALL | re.IGNORECASE)
-        self._EP_LIST_RE = re.compile(r"(?:\[{\"list\":)?Array\.prototype\.slice\.call\({\"\d+\":(?:{\"list\":\[)?\[(.+?})\]\]?,.*?\"length\":\d+}\)(?=,\"tabs\")",
-                                      re.MULTILINE | re.DOTALL | re.IGNORECASE)
         self._PAGE_CONTEXT_RE = re.compile(r"cid=(?P<cid>[^&]+).+episode_begin=(?P<begin>\d+)&episode_end=(?P<end>\d+).+&page_size=(?P<size>\d+)",
                                            re.DOTALL | re.IGNORECASE)
 
-        self._NULLIFY_RE = re.compile(r'new\s+Map\(.*?\]\)|void\s+0|(?<=:)\s*undefined\b|(?<=:)\s*false\b|(?<=:)\s*null\b|(?<=(:|\[))\s*(?<!\\)"([^"]|\\")*?:([^"]|\\")*?(?<!\\)"',
-                                              re.MULTILINE | re.DOTALL | re.IGNORECASE)
-        self._DOUBLE_QUOTE_VAL_RE = re.compile(r":\s*([^,\[\]{}\"\\\s/]+)",
-                                              re.DOTALL | re.IGNORECASE)
-        self._DOUBLE_QUOTE_KEY_RE = re.compile(r"(\w+)\s*:",
-                                          re.DOTALL | re.IGNORECASE)
-
         self._VIDEO_COVER_PREFIX = 'https://v.qq.com/x/cover/'
         self._VIDEO_CONFIG_URL = 'https://vd.l.qq.com/proxyhttp'
         self._VIDEO_GETPAGE_URL = "https://pbaccess.video.qq.com/trpc.vector_layout.page_view.PageService/getPage"
@@ -151,7 +152,17 @@ class QQVideoVC(VideoConfig):
         cdn_blacklist = self.confs.get('cdn_blacklist')
         self.cdn_blacklist = tuple(cdn_blacklist.split()) if cdn_blacklist else ()
 
-        self.max_pagetab_reqs = 5
+        # the hosts of the mirrors are ranked, and blacklisted for a while, by their throughput and errors measured
+        self._host_stats = HostStats.from_confs(self.confs, logger=self._logger)
+
+        # the tabs of the episode list of a long cover are fetched concurrently, at no more than `pagetab_rate` per second
+        self.pagetab_workers = max(1, int(self.confs.get('pagetab_workers') or 4))
+        self.max_pagetab_reqs = int(self.confs.get('max_pagetab_reqs') or 0)
+        self._pagetab_limiter = RateLimiter(float(self.confs.get('pagetab_rate') or 0), burst=self.pagetab_workers)
+
+        # long-lived `node` processes computing the cKeys, shared by the threads extracting the episodes
+        ckey_workers = int(self.confs.get('ckey_workers') or 2)
+        self._ckey_pool = NodeWorkerPool([self.args['node'], self.jsfile], size=ckey_workers, logger=self._logger)
 
         #self.preferred_defn = self.confs['definition']
 
@@ -177,6 +188,37 @@ class QQVideoVC(VideoConfig):
 
         return "".join([f"{h:x}" for h in [math.floor(random.random() * 16) for _ in range(length)]])
 
+    def _choose_url_prefixes(self, data, dir_only=False):
+        """The URL prefixes of the video of the config info `data` except the ones of `cdn_blacklist`, i.e. the default
+        servers, followed by the CDN mirrors if `use_cdn`, ranked by the host statistics if any."""
+        url_prefixes = []
+        for url_dic in json_path_get(data, ['vl', 'vi', 0, 'ul', 'ui'], []):
+            if isinstance(url_dic, dict):
+                url = url_dic.get('url')
+                if url and not url.startswith(self.cdn_blacklist):
+                    if dir_only and not url.endswith('/'):
+                        url = url[:url.rfind('/')+1]
+                    url_prefixes.append(url)
+
+        chosen_url_prefixes = [prefix for prefix in url_prefixes if prefix[:prefix.find('/', 8)].endswith('.tc.qq.com')]
+        if not chosen_url_prefixes:
+            chosen_url_prefixes = url_prefixes
+
+        if self.use_cdn:
+            # use all URL prefixes but with default servers coming before CDN mirrors
+            cdn = [prefix for prefix in url_prefixes if prefix not in chosen_url_prefixes]
+            chosen_url_prefixes += cdn
+
+        return self._rank_mirrors(chosen_url_prefixes)
+
+    def _rank_mirrors(self, url_prefixes, weighted=False):
+        """Order the mirrors by the measured throughput and error rate of their hosts, leaving out the blacklisted ones,
+        see :meth:`mdl.hoststats.HostStats.rank`."""
+        if self._host_stats is None:
+            return url_prefixes
+
+        return self._host_stats.rank(url_prefixes, weighted=weighted)
+
     def _get_video_urls_p10801(self, vid, definition, vurl, referrer):
         urls = []
         ext = None
@@ -200,21 +242,7 @@ class QQVideoVC(VideoConfig):
                 return format_name, ext, urls
 
             if data and data.get('dltype'):
-                url_prefixes = []
-                for url_dic in json_path_get(data, ['vl', 'vi', 0, 'ul', 'ui'], []):
-                    if isinstance(url_dic, dict):
-                        url = url_dic.get('url')
-                        if url and not url.startswith(self.cdn_blacklist):
-                            url_prefixes.append(url)
-
-                chosen_url_prefixes = [prefix for prefix in url_prefixes if prefix[:prefix.find('/', 8)].endswith('.tc.qq.com')]
-                if not chosen_url_prefixes:
-                    chosen_url_prefixes = url_prefixes
-
-                if self.use_cdn:
-                    # use all URL prefixes but with default servers coming before CDN mirrors
-                    cdn = [prefix for prefix in url_prefixes if prefix not in chosen_url_prefixes]
-                    chosen_url_prefixes += cdn
+                chosen_url_prefixes = self._choose_url_prefixes(data)
 
                 drm = json_path_get(data, ['vl', 'vi', 0, 'drm'])
                 preview = data.get('preview')
@@ -247,8 +275,8 @@ class QQVideoVC(VideoConfig):
 
                     for idx in range(start, fc + 1):
                         vfilename_new = '.'.join([vfn[0], str(idx), 'ts'])
-                        url_mirrors = '\t'.join(
-                            ['%s%s?sdtfrom=v1010' % (prefix, vfilename_new) for prefix in chosen_url_prefixes])
+                        url_mirrors = '\t'.join(['%s%s?sdtfrom=v1010' % (prefix, vfilename_new)
+                                                 for prefix in self._rank_mirrors(chosen_url_prefixes, weighted=True)])
                         urls.append(url_mirrors)
                 else:  # 'mp4'
                     if drm == 1 and not self.has_vip:
@@ -270,7 +298,8 @@ class QQVideoVC(VideoConfig):
                             for line in r.iter_lines(decode_unicode=True):
                                 if line and not line.startswith('#'):
                                     url_mirrors = '\t'.join(
-                                        ['%s%s/%s' % (prefix, vfilename, line) for prefix in chosen_url_prefixes])
+                                        ['%s%s/%s' % (prefix, vfilename, line)
+                                         for prefix in self._rank_mirrors(chosen_url_prefixes, weighted=True)])
                                     urls.append(url_mirrors)
                     else:
                         # return self._get_video_urls_p10901(vid, definition)
@@ -307,22 +336,7 @@ class QQVideoVC(VideoConfig):
                 return format_name, ext, urls
 
             if data and data.get('dltype'):
-                url_prefixes = []
-                for url_dic in json_path_get(data, ['vl', 'vi', 0, 'ul', 'ui'], []):
-                    if isinstance(url_dic, dict):
-                        url = url_dic.get('url')
-                        if url and not url.startswith(self.cdn_blacklist):
-                            url_prefixes.append(url)
-
-                chosen_url_prefixes = [prefix for prefix in url_prefixes if
-                                       prefix[:prefix.find('/', 8)].endswith('.tc.qq.com')]
-                if not chosen_url_prefixes:
-                    chosen_url_prefixes = url_prefixes
-
-                if self.use_cdn:
-                    # use all URL prefixes but with default servers coming before CDN mirrors
-                    cdn = [prefix for prefix in url_prefixes if prefix not in chosen_url_prefixes]
-                    chosen_url_prefixes += cdn
+                chosen_url_prefixes = self._choose_url_prefixes(data)
 
                 # drm = json_path_get(data, ['vl', 'vi', 0, 'drm'])
 
@@ -377,7 +391,8 @@ class QQVideoVC(VideoConfig):
                             if not vkey:
                                 return format_name, ext, urls
                             url_mirrors = '\t'.join(['%s%s?sdtfrom=v1010&vkey=%s' % (url_prefix, cfilename, vkey)
-                                                    for url_prefix in chosen_url_prefixes])
+                                                    for url_prefix in
+                                                    self._rank_mirrors(chosen_url_prefixes, weighted=True)])
                             if url_mirrors:
                                 urls.append(url_mirrors)
 
@@ -387,6 +402,23 @@ class QQVideoVC(VideoConfig):
 
         return format_name, ext, urls
 
+    def _get_ckey(self, vid, vurl, referrer, cancelled=None):
+        """Compute the cKey of the video by one of the node workers.
+
+        Args:
+            cancelled (threading.Event): Give up waiting for an idle node worker once set
+
+        Returns:
+            list: [ckey, tm, guid, flowid], or None if cancelled
+
+        Raises:
+            NodeWorkerError: Raised when no cKey could be computed.
+        """
+        ckey_req = ' '.join([QQVideoPlatforms.P10201, self.app_ver, vid, vurl, referrer])  # < platform appVer vid vURL referrer >
+        ckey_resp = self._ckey_pool.request(ckey_req, validate=lambda resp: len(resp.split()) == 4, cancelled=cancelled)
+
+        return ckey_resp.split() if ckey_resp is not None else None  # < cKey tm guid flowid >
+
     def _get_orig_format_id(self, data, platform):
         file_format_id = None
 
@@ -407,193 +439,174 @@ class QQVideoVC(VideoConfig):
         ext = None
         format_name = None
 
-        nodejs = self.args['node']
-        cmd_nodejs = [nodejs, self.jsfile]
-        with subprocess.Popen(cmd_nodejs, bufsize=1, universal_newlines=True, encoding='utf-8',
-                              stdin=subprocess.PIPE, stdout=subprocess.PIPE) as node_proc:
-            ckey_req = ' '.join([QQVideoPlatforms.P10201, self.app_ver, vid, vurl, referrer])
-            node_proc.stdin.write(ckey_req)
-            node_proc.stdin.write(r'\n')
-            node_proc.stdin.flush()
-            ckey_resp = node_proc.stdout.readline().rstrip(r'\r\n')
-            ckey, tm, guid, flowid = ckey_resp.split()
-
-            vinfoparam = {
-                'otype': 'ojson',
-                'isHLS': 1,
-                'charge': 0,
-                'fhdswitch': 0,
-                'show1080p': 1,
-                'defnpayver': 7,
-                'sdtfrom': 'v1010',
-                'host': 'v.qq.com',
-                'vid': vid,
-                'defn': definition,
-                'platform': QQVideoPlatforms.P10201,
-                'appVer': self.app_ver,
-                'refer': referrer,
-                'ehost': vurl,
-                'logintoken': json.dumps(self.login_token, separators=(',', ':')),
-                'encryptVer': self.encrypt_ver,
-                'guid': guid,
-                'flowid': flowid,
-                'tm': tm,
-                'cKey': ckey,
-                'dtype': 1,
-                #'drm': 40
-            }
-            params = {
-                'buid': 'vinfoad',
-                'vinfoparam': urlencode(vinfoparam)
-            }
+        try:
+            ckey, tm, guid, flowid = self._get_ckey(vid, vurl, referrer)
+        except NodeWorkerError as e:
+            self._logger.error("Failed to compute the cKey of video '%s': '%s'", vid, e)
+            return format_name, ext, urls
+
+        vinfoparam = {
+            'otype': 'ojson',
+            'isHLS': 1,
+            'charge': 0,
+            'fhdswitch': 0,
+            'show1080p': 1,
+            'defnpayver': 7,
+            'sdtfrom': 'v1010',
+            'host': 'v.qq.com',
+            'vid': vid,
+            'defn': definition,
+            'platform': QQVideoPlatforms.P10201,
+            'appVer': self.app_ver,
+            'refer': referrer,
+            'ehost': vurl,
+            'logintoken': json.dumps(self.login_token, separators=(',', ':')),
+            'encryptVer': self.encrypt_ver,
+            'guid': guid,
+            'flowid': flowid,
+            'tm': tm,
+            'cKey': ckey,
+            'dtype': 1,
+            #'drm': 40
+        }
+        params = {
+            'buid': 'vinfoad',
+            'vinfoparam': urlencode(vinfoparam)
+        }
+
+        try:
+            r = self._requester.post(self._VIDEO_CONFIG_URL, json=params)
+            r.raise_for_status()
+            if r.status_code != 200:
+                raise RequestException("Unexpected status code %i" % r.status_code)
 
             try:
-                r = self._requester.post(self._VIDEO_CONFIG_URL, json=params)
-                r.raise_for_status()
-                if r.status_code != 200:
-                    raise RequestException("Unexpected status code %i" % r.status_code)
-
-                try:
-                    data = json.loads(r.text)
-                    if data:
-                        data = json.loads(data.get('vinfo'))
-                except json.JSONDecodeError as e:
-                    self._logger.error("Received ill-formed video config info for '%s': '%r'", vid, e)
-                    return format_name, ext, urls
-
-                if data and data.get('dltype'):
-                    url_prefixes = []
-                    for url_dic in json_path_get(data, ['vl', 'vi', 0, 'ul', 'ui'], []):
-                        if isinstance(url_dic, dict):
-                            url = url_dic.get('url')
-                            if url and not url.startswith(self.cdn_blacklist):
-                                url_prefixes.append(url)
-
-                    chosen_url_prefixes = [prefix for prefix in url_prefixes if
-                                           prefix[:prefix.find('/', 8)].endswith('.tc.qq.com')]
-                    if not chosen_url_prefixes:
-                        chosen_url_prefixes = url_prefixes
-
-                    if self.use_cdn:
-                        # use all URL prefixes but with default servers coming before CDN mirrors
-                        cdn = [prefix for prefix in url_prefixes if prefix not in chosen_url_prefixes]
-                        chosen_url_prefixes += cdn
-
-                    # drm = json_path_get(data, ['vl', 'vi', 0, 'drm'])
-
-                    # pick the best matched definition from available formats
-                    formats = {fmt.get('name'): fmt.get('id') for fmt in json_path_get(data, ['fl', 'fi'], [])}
-                    ret_defn = definition  # not necessarily the requested `definition`
-                    if ret_defn not in formats:
-                        ret_defn = pick_highest_definition(formats)
-
-                    new_format_id = formats.get(ret_defn) or self._VQQ_FORMAT_IDS_DEFAULT[QQVideoPlatforms.P10201][ret_defn]
-                    vfilename = json_path_get(data, ['vl', 'vi', 0, 'fn'], '')
-                    vfn = vfilename.split('.')  # e.g. ['egmovie', 'p201', 'mp4'], ['egmovie', 'mp4']
-                    ext = vfn[-1]  # video extension, e.g. 'mp4'
-                    fmt_prefix = vfn[1][0] if len(vfn) == 3 else 'p'  # e.g. 'p' in 'p201'
-                    vfmt_new = fmt_prefix + str(new_format_id % 10000)
-
-                    orig_format_id = self._get_orig_format_id(data, QQVideoPlatforms.P10201)
-                    fc = json_path_get(data, ['vl', 'vi', 0, 'cl', 'fc'])
-                    keyid = json_path_get(data, ['vl', 'vi', 0, 'cl', 'ci', 0, 'keyid']) if fc else json_path_get(data, ['vl', 'vi', 0, 'cl', 'keyid'])
-                    keyid = keyid.split('.')
-                    keyid[1] = str(orig_format_id)
-                    keyid = '.'.join(keyid)
-
-                    max_fc = 80  # large enough try limit such that we don't miss any clip
-                    for idx in range(1, max_fc + 1):
-                        keyid_new = keyid.split('.')
-                        keyid_new[0] = vfn[0]
-                        if len(keyid_new) == 3:
-                            keyid_new[1:] = [vfmt_new, str(idx)]
-                            keyid_new = '.'.join(keyid_new)
-                        else:
-                            if int(keyid_new[1]) != new_format_id:
-                                if len(vfn) == 3:
-                                    vfn[1] = vfn[1][0] + str(new_format_id)
-                                else:
-                                    vfn.insert(1, vfmt_new)
-                            keyid_new = '.'.join(vfn[:-1])
-                        cfilename = keyid_new + '.' + ext
-
-                        ckey_req = ' '.join([QQVideoPlatforms.P10201, self.app_ver, vid, vurl, referrer, r'\n'])
-                        node_proc.stdin.write(ckey_req)
-                        node_proc.stdin.flush()
-                        ckey_resp = node_proc.stdout.readline().rstrip(r'\r\n')
-                        ckey, tm, guid, flowid = ckey_resp.split()
-
-                        vkeyparam = {
-                            'otype': 'ojson',
-                            'vid': vid,
-                            'format': new_format_id,
-                            'filename': cfilename,
-                            'platform': QQVideoPlatforms.P10201,
-                            'appVer': self.app_ver,
-                            'sdtfrom': 'v1010',
-                            'guid': guid,
-                            'flowid': flowid,
-                            'tm': tm,
-                            'refer': referrer,
-                            'ehost': vurl,
-                            'logintoken': json.dumps(self.login_token, separators=(',', ':')),
-                            'encryptVer': self.encrypt_ver,
-                            'cKey': ckey
-                        }
-                        params = {
-                            'buid': 'onlyvkey',
-                            'vkeyparam': urlencode(vkeyparam)
-                        }
+                data = json.loads(r.text)
+                if data:
+                    data = json.loads(data.get('vinfo'))
+            except json.JSONDecodeError as e:
+                self._logger.error("Received ill-formed video config info for '%s': '%r'", vid, e)
+                return format_name, ext, urls
 
-                        try:
-                            r = self._requester.post(self._VIDEO_CONFIG_URL, json=params)
-                            r.raise_for_status()
-                            if r.status_code != 200:
-                                raise RequestException("Unexpected status code %i" % r.status_code)
-
-                            try:
-                                key_data = json.loads(r.text)
-                                if key_data:
-                                    key_data = json.loads(key_data.get('vkey'))
-                            except json.JSONDecodeError as e:
-                                self._logger.error("Received ill-formed video key data for the clip '%s' from video '%s': '%r'", cfilename, vid, e)
-                                return format_name, ext, urls
+            if data and data.get('dltype'):
+                chosen_url_prefixes = self._choose_url_prefixes(data)
 
-                            if key_data and isinstance(key_data, dict):
-                                vkey = key_data.get('key')
-                                if not vkey:
-                                    if not self.probe_mode:
-                                        msg = key_data.get('msg') or ""
-                                        self._logger.error("Failed to retrieve the key for the file '%s' of video '%s': '%s'", cfilename, vid, msg)
-                                    break
-
-                                keyid = key_data.get('keyid')
-                                keyid_nseg = len(keyid.split('.'))
-                                ffilename = key_data.get('filename')
-                                if ffilename:
-                                    if keyid_nseg == 3:
-                                        cfilename = ffilename.split('.')
-                                        cfilename.insert(-1, str(idx))
-                                        cfilename = '.'.join(cfilename)
-                                    else:
-                                        cfilename = ffilename
-
-                                url_mirrors = '\t'.join(['%s%s?sdtfrom=v1010&vkey=%s' % (url_prefix, cfilename, vkey)
-                                                        for url_prefix in chosen_url_prefixes])
-                                if url_mirrors:
-                                    urls.append(url_mirrors)
+                # drm = json_path_get(data, ['vl', 'vi', 0, 'drm'])
 
-                                if ((orig_format_id == new_format_id or not self.probe_mode) and fc == idx) or (not fc and keyid_nseg != 3):
-                                    break
-                        except RequestException as e:
-                            self._logger.error("Error while requesting the key for the clip '%s' from video '%s': '%r'", cfilename, vid, e)
+                # pick the best matched definition from available formats
+                formats = {fmt.get('name'): fmt.get('id') for fmt in json_path_get(data, ['fl', 'fi'], [])}
+                ret_defn = definition  # not necessarily the requested `definition`
+                if ret_defn not in formats:
+                    ret_defn = pick_highest_definition(formats)
+
+                new_format_id = formats.get(ret_defn) or self._VQQ_FORMAT_IDS_DEFAULT[QQVideoPlatforms.P10201][ret_defn]
+                vfilename = json_path_get(data, ['vl', 'vi', 0, 'fn'], '')
+                vfn = vfilename.split('.')  # e.g. ['egmovie', 'p201', 'mp4'], ['egmovie', 'mp4']
+                ext = vfn[-1]  # video extension, e.g. 'mp4'
+                fmt_prefix = vfn[1][0] if len(vfn) == 3 else 'p'  # e.g. 'p' in 'p201'
+                vfmt_new = fmt_prefix + str(new_format_id % 10000)
+
+                orig_format_id = self._get_orig_format_id(data, QQVideoPlatforms.P10201)
+                fc = json_path_get(data, ['vl', 'vi', 0, 'cl', 'fc'])
+                keyid = json_path_get(data, ['vl', 'vi', 0, 'cl', 'ci', 0, 'keyid']) if fc else json_path_get(data, ['vl', 'vi', 0, 'cl', 'keyid'])
+                keyid = keyid.split('.')
+                keyid[1] = str(orig_format_id)
+                keyid = '.'.join(keyid)
+
+                max_fc = 80  # large enough try limit such that we don't miss any clip
+                for idx in range(1, max_fc + 1):
+                    keyid_new = keyid.split('.')
+                    keyid_new[0] = vfn[0]
+                    if len(keyid_new) == 3:
+                        keyid_new[1:] = [vfmt_new, str(idx)]
+                        keyid_new = '.'.join(keyid_new)
+                    else:
+                        if int(keyid_new[1]) != new_format_id:
+                            if len(vfn) == 3:
+                                vfn[1] = vfn[1][0] + str(new_format_id)
+                            else:
+                                vfn.insert(1, vfmt_new)
+                        keyid_new = '.'.join(vfn[:-1])
+                    cfilename = keyid_new + '.' + ext
+
+                    try:
+                        ckey, tm, guid, flowid = self._get_ckey(vid, vurl, referrer)
+                    except NodeWorkerError as e:
+                        self._logger.error("Failed to compute the cKey for the clip '%s' from video '%s': '%s'", cfilename, vid, e)
+                        return format_name, ext, urls
+
+                    vkeyparam = {
+                        'otype': 'ojson',
+                        'vid': vid,
+                        'format': new_format_id,
+                        'filename': cfilename,
+                        'platform': QQVideoPlatforms.P10201,
+                        'appVer': self.app_ver,
+                        'sdtfrom': 'v1010',
+                        'guid': guid,
+                        'flowid': flowid,
+                        'tm': tm,
+                        'refer': referrer,
+                        'ehost': vurl,
+                        'logintoken': json.dumps(self.login_token, separators=(',', ':')),
+                        'encryptVer': self.encrypt_ver,
+                        'cKey': ckey
+                    }
+                    params = {
+                        'buid': 'onlyvkey',
+                        'vkeyparam': urlencode(vkeyparam)
+                    }
+
+                    try:
+                        r = self._requester.post(self._VIDEO_CONFIG_URL, json=params)
+                        r.raise_for_status()
+                        if r.status_code != 200:
+                            raise RequestException("Unexpected status code %i" % r.status_code)
+
+                        try:
+                            key_data = json.loads(r.text)
+                            if key_data:
+                                key_data = json.loads(key_data.get('vkey'))
+                        except json.JSONDecodeError as e:
+                            self._logger.error("Received ill-formed video key data for the clip '%s' from video '%s': '%r'", cfilename, vid, e)
                             return format_name, ext, urls
 
-                    # hopefully the URLs for the file parts have all been successfully obtained
-                    if len(urls) > 0:
-                        format_name = ret_defn
-            except RequestException as e:
-                self._logger.error("Error while requesting the config info of video '%s': '%r'", vid, e)
+                        if key_data and isinstance(key_data, dict):
+                            vkey = key_data.get('key')
+                            if not vkey:
+                                if not self.probe_mode:
+                                    msg = key_data.get('msg') or ""
+                                    self._logger.error("Failed to retrieve the key for the file '%s' of video '%s': '%s'", cfilename, vid, msg)
+                                break
+
+                            keyid = key_data.get('keyid')
+                            keyid_nseg = len(keyid.split('.'))
+                            ffilename = key_data.get('filename')
+                            if ffilename:
+                                if keyid_nseg == 3:
+                                    cfilename = ffilename.split('.')
+                                    cfilename.insert(-1, str(idx))
+                                    cfilename = '.'.join(cfilename)
+                                else:
+                                    cfilename = ffilename
+
+                            url_mirrors = '\t'.join(['%s%s?sdtfrom=v1010&vkey=%s' % (url_prefix, cfilename, vkey)
+                                                    for url_prefix in
+                                                    self._rank_mirrors(chosen_url_prefixes, weighted=True)])
+                            if url_mirrors:
+                                urls.append(url_mirrors)
+
+                            if ((orig_format_id == new_format_id or not self.probe_mode) and fc == idx) or (not fc and keyid_nseg != 3):
+                                break
+                    except RequestException as e:
+                        self._logger.error("Error while requesting the key for the clip '%s' from video '%s': '%r'", cfilename, vid, e)
+                        return format_name, ext, urls
+
+                # hopefully the URLs for the file parts have all been successfully obtained
+                if len(urls) > 0:
+                    format_name = ret_defn
+        except RequestException as e:
+            self._logger.error("Error while requesting the config info of video '%s': '%r'", vid, e)
 
         return format_name, ext, urls
 
@@ -609,7 +622,74 @@ class QQVideoVC(VideoConfig):
 
         return ret_defn
 
-    def _get_ret_defn_ts(self, data, node_proc, vid, vurl, referrer):
+    def _probe_format_ts(self, format_id, vfilename, vid, vurl, referrer, cancelled):
+        """Check if the file `vfilename` is of the format `format_id`, by requesting its key in that format.
+
+        Returns:
+            tuple: (matched, error), where `error` is the message of the failure which ends the probing, if any.
+        """
+        if cancelled.is_set():
+            return False, None
+
+        try:
+            ckey_info = self._get_ckey(vid, vurl, referrer, cancelled=cancelled)
+        except NodeWorkerError as e:
+            return False, "Failed to compute the cKey for the file '%s' of video '%s': '%s'" % (vfilename, vid, e)
+
+        # a higher ranked format may have matched while this one was waiting for a node worker, or being computed
+        if ckey_info is None or cancelled.is_set():
+            return False, None
+        ckey, tm, guid, flowid = ckey_info
+
+        vkeyparam = {
+            'otype': 'ojson',
+            'vid': vid,
+            'format': format_id,
+            'filename': vfilename,
+            'platform': QQVideoPlatforms.P10201,
+            'appVer': self.app_ver,
+            'sdtfrom': 'v1010',
+            'guid': guid,
+            'flowid': flowid,
+            'tm': tm,
+            'refer': referrer,
+            'ehost': vurl,
+            'logintoken': json.dumps(self.login_token, separators=(',', ':')),
+            'encryptVer': self.encrypt_ver,
+            'cKey': ckey
+        }
+        params = {
+            'buid': 'onlyvkey',
+            'vkeyparam': urlencode(vkeyparam)
+        }
+
+        try:
+            r = self._requester.post(self._VIDEO_CONFIG_URL, json=params)
+            if r.status_code != 200:
+                raise RequestException("Unexpected status code %i" % r.status_code)
+
+            try:
+                key_data = json.loads(r.text)
+                if key_data:
+                    key_data = json.loads(key_data.get('vkey'))
+            except json.JSONDecodeError as e:
+                return False, "Received ill-formed video key data for the file '%s' of video '%s': '%r'" % (vfilename, vid, e)
+
+            if key_data and isinstance(key_data, dict):
+                vkey = key_data.get('key')
+                if not vkey:
+                    msg = key_data.get('msg') or ""
+                    return False, "Failed to retrieve the key for the file '%s' of video '%s': '%s'" % (vfilename, vid, msg)
+
+                cfilename = key_data.get('filename', '')
+                if cfilename and cfilename == vfilename:
+                    return True, None
+        except RequestException as e:
+            return False, "Error while requesting the key for the file '%s' of video '%s': '%r'" % (vfilename, vid, e)
+
+        return False, None
+
+    def _get_ret_defn_ts(self, data, vid, vurl, referrer):
         ret_defn = ""
 
         formats_id2nm = {fmt.get('id'): fmt.get('name') for fmt in json_path_get(data, ['fl', 'fi'], [])}
@@ -630,66 +710,26 @@ class QQVideoVC(VideoConfig):
         ret_defn = ret_defn or self._get_ret_defn_by_fs(data)
         if not ret_defn:
             sorted_defns = sort_definitions(formats_nm2id)
-            for format_defn in sorted_defns:
-                format_id = formats_nm2id.get(format_defn)
-                ckey_req = ' '.join([QQVideoPlatforms.P10201, self.app_ver, vid, vurl, referrer, r'\n'])
-                node_proc.stdin.write(ckey_req)
-                node_proc.stdin.flush()
-                ckey_resp = node_proc.stdout.readline().rstrip(r'\r\n')
-                ckey, tm, guid, flowid = ckey_resp.split()
-
-                vkeyparam = {
-                    'otype': 'ojson',
-                    'vid': vid,
-                    'format': format_id,
-                    'filename': vfilename,
-                    'platform': QQVideoPlatforms.P10201,
-                    'appVer': self.app_ver,
-                    'sdtfrom': 'v1010',
-                    'guid': guid,
-                    'flowid': flowid,
-                    'tm': tm,
-                    'refer': referrer,
-                    'ehost': vurl,
-                    'logintoken': json.dumps(self.login_token, separators=(',', ':')),
-                    'encryptVer': self.encrypt_ver,
-                    'cKey': ckey
-                }
-                params = {
-                    'buid': 'onlyvkey',
-                    'vkeyparam': urlencode(vkeyparam)
-                }
-
-                try:
-                    r = self._requester.post(self._VIDEO_CONFIG_URL, json=params)
-                    if r.status_code != 200:
-                        raise RequestException("Unexpected status code %i" % r.status_code)
-
-                    try:
-                        key_data = json.loads(r.text)
-                        if key_data:
-                            key_data = json.loads(key_data.get('vkey'))
-                    except json.JSONDecodeError as e:
-                        self._logger.error("Received ill-formed video key data for the file '%s' of video '%s': '%r'",
-                                           vfilename, vid, e)
-                        break
-
-                    if key_data and isinstance(key_data, dict):
-                        vkey = key_data.get('key')
-                        if not vkey:
-                            msg = key_data.get('msg') or ""
-                            self._logger.error("Failed to retrieve the key for the file '%s' of video '%s': '%s'",
-                                               vfilename, vid, msg)
-                            break
-
-                        cfilename = key_data.get('filename', '')
-                        if cfilename and cfilename == vfilename:
+            if sorted_defns:
+                # probe the formats concurrently, as many at a time as there are cKey workers for, but take the outcomes
+                # in the order of the definition ranks as before
+                cancelled = threading.Event()
+                workers = min(len(sorted_defns), self._ckey_pool.size)
+                with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='mdl-probe') as executor:
+                    futures = [executor.submit(self._probe_format_ts, formats_nm2id.get(format_defn), vfilename, vid,
+                                               vurl, referrer, cancelled) for format_defn in sorted_defns]
+                    for format_defn, future in zip(sorted_defns, futures):
+                        matched, error = future.result()
+                        if error:
+                            self._logger.error(error)
+                        if matched:
                             ret_defn = format_defn
+                        if matched or error:
+                            # no need for the lower ranked ones any longer
+                            cancelled.set()
+                            for f in futures:
+                                f.cancel()
                             break
-                except RequestException as e:
-                    self._logger.error("Error while requesting the key for the file '%s' of video '%s': '%r'",
-                                       vfilename, vid, e)
-                    break
 
             ret_defn = ret_defn or (sorted_defns[0] if sorted_defns else VideoDefnCodes.HD)
 
@@ -700,129 +740,107 @@ class QQVideoVC(VideoConfig):
         ext = None
         format_name = None
 
-        nodejs = self.args['node']
-        cmd_nodejs = [nodejs, self.jsfile]
-        with subprocess.Popen(cmd_nodejs, bufsize=1, universal_newlines=True, encoding='utf-8',
-                              stdin=subprocess.PIPE, stdout=subprocess.PIPE) as node_proc:
-            ckey_req = ' '.join([QQVideoPlatforms.P10201, self.app_ver, vid, vurl, referrer])
-            node_proc.stdin.write(ckey_req)
-            node_proc.stdin.write(r'\n')
-            node_proc.stdin.flush()
-            ckey_resp = node_proc.stdout.readline().rstrip(r'\r\n')
-            ckey, tm, guid, flowid = ckey_resp.split()
-
-            vinfoparam = {
-                'otype': 'ojson',
-                'isHLS': 1,
-                'charge': 0,
-                'fhdswitch': 0,
-                'show1080p': 1,
-                'defnpayver': 7,
-                'sdtfrom': 'v1010',
-                'host': 'v.qq.com',
-                'vid': vid,
-                'defn': definition,
-                'platform': QQVideoPlatforms.P10201,
-                'appVer': self.app_ver,
-                'refer': referrer,
-                'ehost': vurl,
-                'logintoken': json.dumps(self.login_token, separators=(',', ':')),
-                'encryptVer': self.encrypt_ver,
-                'guid': guid,
-                'flowid': flowid,
-                'tm': tm,
-                'cKey': ckey,
-                'dtype': 3,
-                'spau': 1,
-                'spaudio': 68,
-                'spwm': 1,
-                'sphls': 2,
-                'sphttps': 1,
-                'clip': 4,
-                'spsrt': 2,
-                'spvvpay': 1,
-                'spadseg': 3,
-                'spav1': 15,
-                'hevclv': 28,
-                'spsfrhdr': 100,
-                'spvideo': 1044,
-                # 'drm': 40,
-                # 'spm3u8tag': 67,
-                # 'spmasterm3u8': 3
-            }
-            params = {
-                'buid': 'vinfoad',
-                'vinfoparam': urlencode(vinfoparam)
-            }
+        try:
+            ckey, tm, guid, flowid = self._get_ckey(vid, vurl, referrer)
+        except NodeWorkerError as e:
+            self._logger.error("Failed to compute the cKey of video '%s': '%s'", vid, e)
+            return format_name, ext, urls
+
+        vinfoparam = {
+            'otype': 'ojson',
+            'isHLS': 1,
+            'charge': 0,
+            'fhdswitch': 0,
+            'show1080p': 1,
+            'defnpayver': 7,
+            'sdtfrom': 'v1010',
+            'host': 'v.qq.com',
+            'vid': vid,
+            'defn': definition,
+            'platform': QQVideoPlatforms.P10201,
+            'appVer': self.app_ver,
+            'refer': referrer,
+            'ehost': vurl,
+            'logintoken': json.dumps(self.login_token, separators=(',', ':')),
+            'encryptVer': self.encrypt_ver,
+            'guid': guid,
+            'flowid': flowid,
+            'tm': tm,
+            'cKey': ckey,
+            'dtype': 3,
+            'spau': 1,
+            'spaudio': 68,
+            'spwm': 1,
+            'sphls': 2,
+            'sphttps': 1,
+            'clip': 4,
+            'spsrt': 2,
+            'spvvpay': 1,
+            'spadseg': 3,
+            'spav1': 15,
+            'hevclv': 28,
+            'spsfrhdr': 100,
+            'spvideo': 1044,
+            # 'drm': 40,
+            # 'spm3u8tag': 67,
+            # 'spmasterm3u8': 3
+        }
+        params = {
+            'buid': 'vinfoad',
+            'vinfoparam': urlencode(vinfoparam)
+        }
+
+        try:
+            r = self._requester.post(self._VIDEO_CONFIG_URL, json=params)
+            r.raise_for_status()
+            if r.status_code != 200:
+                raise RequestException("Unexpected status code %i" % r.status_code)
 
             try:
-                r = self._requester.post(self._VIDEO_CONFIG_URL, json=params)
-                r.raise_for_status()
-                if r.status_code != 200:
-                    raise RequestException("Unexpected status code %i" % r.status_code)
-
-                try:
-                    data = json.loads(r.text)
-                    if data:
-                        data = json.loads(data.get('vinfo'))
-                except json.JSONDecodeError as e:
-                    self._logger.error("Received ill-formed video config info for '%s': '%r'", vid, e)
-                    return format_name, ext, urls
-
-                if data and data.get('dltype'):
-                    url_prefixes = []
-                    for url_dic in json_path_get(data, ['vl', 'vi', 0, 'ul', 'ui'], []):
-                        if isinstance(url_dic, dict):
-                            url = url_dic.get('url')
-                            if url and not url.startswith(self.cdn_blacklist):
-                                if not url.endswith('/'):
-                                    url = url[:url.rfind('/')+1]
-                                url_prefixes.append(url)
-
-                    chosen_url_prefixes = [prefix for prefix in url_prefixes if
-                                           prefix[:prefix.find('/', 8)].endswith('.tc.qq.com')]
-                    if not chosen_url_prefixes:
-                        chosen_url_prefixes = url_prefixes
-
-                    if self.use_cdn:
-                        # use all URL prefixes but with default servers coming before CDN mirrors
-                        cdn = [prefix for prefix in url_prefixes if prefix not in chosen_url_prefixes]
-                        chosen_url_prefixes += cdn
-
-                    drm = json_path_get(data, ['vl', 'vi', 0, 'drm'])
-                    preview = data.get('preview')
-
-                    vfilename = json_path_get(data, ['vl', 'vi', 0, 'fn'], '')
-                    vfn = vfilename.rpartition('.')  # e.g. ['egmovie.f323013001', '.', 'ts']
-                    ext = vfn[-1]  # video extension, e.g. 'ts' 'mp4'
-
-                    ret_defn = ''  # not necessarily equal to requested `definition`
-
-                    if ext == 'ts':
-                        if drm == 1 and not preview and not self.has_vip:
-                            return format_name, ext, urls
+                data = json.loads(r.text)
+                if data:
+                    data = json.loads(data.get('vinfo'))
+            except json.JSONDecodeError as e:
+                self._logger.error("Received ill-formed video config info for '%s': '%r'", vid, e)
+                return format_name, ext, urls
 
-                        # determine the true definition `ret_defn` from the returned formats
-                        ret_defn = self._get_ret_defn_ts(data, node_proc, vid, vurl, referrer)
+            if data and data.get('dltype'):
+                chosen_url_prefixes = self._choose_url_prefixes(data, dir_only=True)
 
-                        fc = json_path_get(data, ['vl', 'vi', 0, 'fc'])  # always >= 1?
-                        # start = 0 if fc == 0 else 1  # start counting number of the video clip file indexes
-                        start = 1
+                drm = json_path_get(data, ['vl', 'vi', 0, 'drm'])
+                preview = data.get('preview')
 
-                        for idx in range(start, fc + 1):
-                            vfilename_new = '.'.join([vfn[0], str(idx), 'ts'])
-                            url_mirrors = '\t'.join(
-                                ['%s%s?sdtfrom=v1010' % (prefix, vfilename_new) for prefix in chosen_url_prefixes])
-                            urls.append(url_mirrors)
-                    else:  # 'mp4'
-                        if drm == 1 and not self.has_vip:
-                            return format_name, ext, urls
+                vfilename = json_path_get(data, ['vl', 'vi', 0, 'fn'], '')
+                vfn = vfilename.rpartition('.')  # e.g. ['egmovie.f323013001', '.', 'ts']
+                ext = vfn[-1]  # video extension, e.g. 'ts' 'mp4'
 
-                        return self._get_video_urls_p10201(vid, definition, vurl, referrer)
+                ret_defn = ''  # not necessarily equal to requested `definition`
 
-                    format_name = ret_defn
-            except RequestException as e:
-                self._logger.error("Error while requesting the config info of video '%s': '%r'", vid, e)
+                if ext == 'ts':
+                    if drm == 1 and not preview and not self.has_vip:
+                        return format_name, ext, urls
+
+                    # determine the true definition `ret_defn` from the returned formats
+                    ret_defn = self._get_ret_defn_ts(data, vid, vurl, referrer)
+
+                    fc = json_path_get(data, ['vl', 'vi', 0, 'fc'])  # always >= 1?
+                    # start = 0 if fc == 0 else 1  # start counting number of the video clip file indexes
+                    start = 1
+
+                    for idx in range(start, fc + 1):
+                        vfilename_new = '.'.join([vfn[0], str(idx), 'ts'])
+                        url_mirrors = '\t'.join(['%s%s?sdtfrom=v1010' % (prefix, vfilename_new)
+                                                 for prefix in self._rank_mirrors(chosen_url_prefixes, weighted=True)])
+                        urls.append(url_mirrors)
+                else:  # 'mp4'
+                    if drm == 1 and not self.has_vip:
+                        return format_name, ext, urls
+
+                    return self._get_video_urls_p10201(vid, definition, vurl, referrer)
+
+                format_name = ret_defn
+        except RequestException as e:
+            self._logger.error("Error while requesting the config info of video '%s': '%r'", vid, e)
 
         return format_name, ext, urls
 
@@ -834,16 +852,6 @@ class QQVideoVC(VideoConfig):
             # return self._get_video_urls_p10901(vid, definition)
             return self._get_video_urls_p10201(vid, definition, vurl, referrer)
 
-    def _normalize_conf_info(self, text):
-        nullified = self._NULLIFY_RE.sub(r'""', text)
-        # convert the `value` to a dobule-quoted string, except for boolean, integer and null type
-        dquoted_vals = self._DOUBLE_QUOTE_VAL_RE.sub(r': "\1"', nullified)
-        # convert the `key` to a dobule-quoted string
-        dquoted_keys = self._DOUBLE_QUOTE_KEY_RE.sub(r'"\1": ', dquoted_vals)
-        normalized = dquoted_keys
-
-        return normalized
-
     def _extract_video_cover_info(self, regex, text):
         result = (None, None)
 
@@ -851,15 +859,14 @@ class QQVideoVC(VideoConfig):
         if cover_match:
             info = {}
             cover_group = cover_match.group(1) or cover_match.group(2) or cover_match.group(3)
-            cover_group = self._normalize_conf_info(cover_group)
             try:
-                cover_info = json.loads(cover_group)
-            except json.JSONDecodeError:
+                cover_info = jsobj.loads(cover_group)
+            except jsobj.JSParseError:
                 return result
 
             if cover_info and isinstance(cover_info, dict):
                 info['title'] = cover_info.get('title', '') or cover_info.get('title_new', '')
-                info['year'] = cover_info.get('year') or (cover_info.get('publish_date') or '').split('-')[0]
+                info['year'] = str(cover_info.get('year') or (cover_info.get('publish_date') or '').split('-')[0])
                 info['cover_id'] = cover_info.get('cover_id', '') or cover_info.get('cid', '')
                 info['episode_all'] = int(cover_info.get('episode_all') or 0)
 
@@ -883,12 +890,9 @@ class QQVideoVC(VideoConfig):
 
         match = self._ALL_LOADED_INFO_RE.search(r_text)
         if match:
-            matched = match.group(1) or match.group(2)
-            matched_norm = re.sub(self._EP_LIST_RE, r'[{"list":[[\1]]', matched)
-            matched_norm = self._normalize_conf_info(matched_norm)
             try:
-                conf_info = json.loads(matched_norm)
-            except json.JSONDecodeError:
+                conf_info = jsobj.loads(match.group(1) or match.group(2))
+            except jsobj.JSParseError:
                 return conf_info, ep_list, tabs
 
             if conf_info:
@@ -975,7 +979,7 @@ class QQVideoVC(VideoConfig):
                 # vi['title'] = epv['play_title']
 
         def align_eps(normal_ids, start, stop, shift):
-            for idx in range(start, stop):
+            for idx in range(start, min(stop, len(normal_ids))):
                 normal_ids[idx]['E'] += shift
 
         playlist_items = self.args['playlist_items'][cover_url]
@@ -988,8 +992,8 @@ class QQVideoVC(VideoConfig):
         year = json_path_get(conf_info, ['introduction', 'introData', 'list', 0, 'item_params', 'year']) \
                or json_path_get(conf_info, ['introduction', 'introData', 'list', 0, 'item_params', 'show_year']) \
                or json_path_get(conf_info, ['introductionData', 'introductionData', 'year'])
-        if year and (not cover_info['year'] or cover_info['year'] != year):
-            cover_info['year'] = year
+        if year and (not cover_info['year'] or cover_info['year'] != str(year)):
+            cover_info['year'] = str(year)
 
         current_cid, current_vid = conf_info['globalStore']['currentCid'], conf_info['globalStore']['currentVid']
         conf_info_page, selected_ep_list, tabs = self._get_page_eplist(current_cid, current_vid)
@@ -1019,35 +1023,72 @@ class QQVideoVC(VideoConfig):
             update_from_eplist(cover_info['normal_ids'], selected_ep_list, v2i)
             return
 
-        delay_request = SpinWithBackoff()
-        ep, shift = 0, 0
+        # locate the tabs to fetch, i.e. those overlapping the requested playlist items, by the first episode of each
+        tabs_ctx, fetches, ep = [], {}, 0
         for tab in sorted(tabs, key=lambda tab: int(tab['begin'])):
             page_context = self._PAGE_CONTEXT_RE.search(tab['page_context'])
             if not page_context:
-                return
+                break
             cid, begin, end, size = page_context.group('cid'), int(page_context.group('begin')), int(page_context.group('end')), int(page_context.group('size'))
+            tabs_ctx.append((tab, begin, end, size))
 
+            if not tab['selected'] and ep < len(cover_info['normal_ids']) \
+                    and ((not playlist_items and url_type == VideoURLType.COVER) or (playlist_items and self.have_overlap((begin, end), playlist_items))):
+                if self.max_pagetab_reqs and len(fetches) >= self.max_pagetab_reqs:
+                    fetches[ep] = None
+                else:
+                    fetches[ep] = (cid, cover_info['normal_ids'][ep]['V'])
+            ep += size
+
+        ep_lists = self._get_pagetab_eplists({ep: req for ep, req in fetches.items() if req})
+
+        ep, shift = 0, 0
+        for tab, begin, end, size in tabs_ctx:
             if tab['selected']:
                 update_from_eplist(cover_info['normal_ids'], selected_ep_list, v2i)
+            elif ep not in fetches:
+                align_eps(cover_info['normal_ids'], ep, ep + size, shift)
             else:
-                if not ((not playlist_items and url_type == VideoURLType.COVER) or (playlist_items and self.have_overlap((begin, end), playlist_items))):
-                    align_eps(cover_info['normal_ids'], ep, ep + size, shift)
-                else:
-                    if delay_request.nth > (self.max_pagetab_reqs - 1):
-                        self._logger.error("Too large the playlist is! The episode numbering may not be correct")
-                        align_eps(cover_info['normal_ids'], ep, len(cover_info['normal_ids']), shift)
-                        return
-                    delay_request.sleep()
-
-                    _, ep_list, _  = self._get_page_eplist(cid, cover_info['normal_ids'][ep]['V'])
-                    if not ep_list:
-                        align_eps(cover_info['normal_ids'], ep, len(cover_info['normal_ids']), shift)
-                        return
-                    update_from_eplist(cover_info['normal_ids'], ep_list, v2i)
+                if fetches[ep] is None:
+                    self._logger.error("Too large the playlist is! The episode numbering may not be correct")
+                    align_eps(cover_info['normal_ids'], ep, len(cover_info['normal_ids']), shift)
+                    return
+
+                ep_list = ep_lists.get(ep)
+                if not ep_list:
+                    align_eps(cover_info['normal_ids'], ep, len(cover_info['normal_ids']), shift)
+                    return
+                update_from_eplist(cover_info['normal_ids'], ep_list, v2i)
 
             ep += size
+            if ep > len(cover_info['normal_ids']):
+                return
             shift = cover_info['normal_ids'][ep-1]['E'] - ep
 
+    def _get_pagetab_eplist(self, cid, vid):
+        self._pagetab_limiter.acquire()
+        _, ep_list, _ = self._get_page_eplist(cid, vid)
+
+        return ep_list
+
+    def _get_pagetab_eplists(self, requests):
+        """Fetch the episode lists of the tabs concurrently.
+
+        Args:
+            requests (dict): {key: (cid, vid of any episode of the tab)}
+
+        Returns:
+            dict: {key: episode list of the tab}
+        """
+        if len(requests) < 2 or self.pagetab_workers == 1:
+            return {key: self._get_pagetab_eplist(cid, vid) for key, (cid, vid) in requests.items()}
+
+        with ThreadPoolExecutor(max_workers=min(self.pagetab_workers, len(requests)),
+                                thread_name_prefix='mdl-pagetab') as executor:
+            futures = {key: executor.submit(self._get_pagetab_eplist, cid, vid) for key, (cid, vid) in requests.items()}
+
+        return {key: future.result() for key, future in futures.items()}
+
     def _get_cover_info(self, cover_url, url_type):
         """"{
         "referrer": "https://v.qq.com/x/cover/nhtfh14i9y1egge.html",
@@ -26,6 +26,44 @@ def normalize_filename(fn, repl='_'):
     return ''.join(norm)
 
 
+def parse_size(size):
+    """Convert the size in bytes, or in 'K', 'M' or 'G' bytes (1K = 1024, 1M = 1024K, 1G = 1024M), e.g. '200K', to the
+    number of bytes"""
+    size = size.strip().upper()
+    if size[-1] == 'K':
+        return 1024 * int(size[:-1])
+    elif size[-1] == 'M':
+        return 1024 * 1024 * int(size[:-1])
+    elif size[-1] == 'G':
+        return 1024 * 1024 * 1024 * int(size[:-1])
+
+    return int(size)
+
+
+def is_rotational_disk(path):
+    """Tell whether the block device holding `path` is a spinning disk, on Linux only.
+
+    Returns:
+        bool: True for a HDD, False for a SSD/NVMe, None if unknown (e.g. non-Linux, network or virtual filesystem).
+    """
+    if not sys.platform.startswith('linux'):
+        return None
+
+    try:
+        dev = os.stat(path).st_dev
+        sys_dev = os.path.realpath('/sys/dev/block/{}:{}'.format(os.major(dev), os.minor(dev)))
+        # a partition has no `queue` of its own, look it up on the whole disk it belongs to
+        for dev_dir in (sys_dev, os.path.dirname(sys_dev)):
+            rotational = os.path.join(dev_dir, 'queue', 'rotational')
+            if os.path.isfile(rotational):
+                with open(rotational) as f:
+                    return f.read().strip() == '1'
+    except OSError:
+        pass
+
+    return None
+
+
 def json_path_get(nested_data, key_path, default=None):
     """Access the nested data via a key sequence
 
@@ -317,3 +355,28 @@ class SpinWithBackoff:
         time.sleep(secs)
         self.cur_secs = min(self.cur_secs * self.backoff_factor, self.max_secs)
         self.nth += 1
+
+
+class RateLimiter:
+    """Token bucket shared by several threads: at most `rate` acquisitions per second on average, with bursts of up to
+    `burst` acquisitions. A `rate` of 0 means no limit."""
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
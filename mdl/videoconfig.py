@@ -1,15 +1,21 @@
+import os
 import re
 import logging
 from http.cookiejar import LoadError
+from concurrent.futures import ThreadPoolExecutor
 
 from bdownload.download import requests_retry_session
-from .utils import build_cookiejar_from_kvp, build_cookiejar_from_file
+from .utils import build_cookiejar_from_kvp, build_cookiejar_from_file, RateLimiter, parse_size
+from .httpcache import install_http_cache
 
 
 class VideoConfig(object):
     # [{'pat': r'^https?://v\.qq\.com/x/cover/(\w+)\.html', 'eg': 'https://v.qq.com/x/cover/nhtfh14i9y1egge.html'}]
     _VIDEO_URL_PATS = []
     _requester = None  # Web content downloader, e.g. requests
+    # endpoints whose responses are cached on disk, never the signed media URLs or keys, which soon expire
+    # [{'pat': r'^https?://v\.qq\.com/x/cover/', 'ttl': 3600, 'methods': ('GET',)}]
+    _HTTP_CACHE_RULES = []
     SOURCE_NAME = 'vc'
     VC_NAME = 'vc'
 
@@ -39,8 +45,20 @@ class VideoConfig(object):
         if user_agent:
             self._requester.headers.update({'User-Agent': user_agent})
 
+        # cache the web pages and API responses across runs
+        if self.confs['http_cache'] and self._HTTP_CACHE_RULES:
+            try:
+                install_http_cache(self._requester, os.path.join(self.confs['http_cache_dir'], self.VC_NAME),
+                                   parse_size(self.confs['http_cache_size']), self._HTTP_CACHE_RULES, logger=self._logger)
+            except OSError as e:
+                self._logger.warning("Error while setting up the HTTP cache in '%s': '%r'", self.confs['http_cache_dir'], e)
+
         self.preferred_defn = self.confs['definition']
 
+        # resolving the download info of the episodes concurrently, at no more than `extract_rate` episodes per second
+        self.extract_workers = max(1, int(self.confs['extract_workers']))
+        self._extract_limiter = RateLimiter(float(self.confs['extract_rate']), burst=self.extract_workers)
+
     def _load_cookies(self):
         regular_token = build_cookiejar_from_kvp(self.confs['regular_user_token'])
         vip_token = build_cookiejar_from_kvp(self.confs['vip_user_token'])
@@ -167,10 +185,22 @@ class VideoConfig(object):
 
         return cover_info
 
+    def _update_video_dwnld_info_limited(self, vi):
+        self._extract_limiter.acquire()
+        self.update_video_dwnld_info(vi)
+
     def update_cover_dwnld_info(self, cover_info):
         vl = cover_info.get('normal_ids', [])
-        for vi in vl:
-            self.update_video_dwnld_info(vi)
+        if self.extract_workers == 1 or len(vl) < 2:
+            for vi in vl:
+                self._update_video_dwnld_info_limited(vi)
+            return
+
+        # every episode is updated in place, so the order of the episodes is kept regardless of the completion order
+        with ThreadPoolExecutor(max_workers=min(self.extract_workers, len(vl)),
+                                thread_name_prefix='mdl-extract-' + self.VC_NAME) as executor:
+            for _ in executor.map(self._update_video_dwnld_info_limited, vl):
+                pass
 
     def set_requester(self, requester):
         self._requester = requester
@@ -0,0 +1,176 @@
+"""Tests of the aria2 JSON-RPC client and the RPC engine against a local stand-in of the aria2 RPC server."""
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import count
+
+from mdl.aria2rpc import Aria2RPC, Aria2Daemon, Aria2RPCError
+from mdl.downloader import MDownloader
+
+SECRET = 'test-secret'
+
+
+class FakeAria2(object):
+    """The methods of aria2 the client uses. Every download added completes at once, unless its URI has 'fail' in it.
+    A call failing is answered with the JSON-RPC error object `{'code': 1, 'message': ...}`, as aria2 does."""
+    def __init__(self):
+        self.downloads = {}  # {gid: status dict}
+        self.global_options = {}
+        self._gids = count(1)
+        self._lock = threading.Lock()
+
+    def dispatch(self, method, params):
+        if method == 'system.multicall':
+            results = []
+            for call in params[0]:
+                try:
+                    results.append([self.dispatch(call['methodName'], call['params'])])
+                except Aria2RPCError as e:
+                    results.append({'code': e.code, 'message': str(e)})
+            return results
+
+        if not params or params[0] != 'token:' + SECRET:
+            raise Aria2RPCError("Unauthorized", code=1)
+        params = params[1:]
+
+        with self._lock:
+            if method == 'aria2.getVersion':
+                return {'version': '1.37.0'}
+            if method == 'aria2.addUri':
+                uris, options = params
+                if not uris:
+                    raise Aria2RPCError("No URI to download.", code=1)
+                gid = '{:016x}'.format(next(self._gids))
+                failed = any('fail' in uri for uri in uris)
+                self.downloads[gid] = dict({'gid': gid, 'status': 'error' if failed else 'complete'},
+                                           **({'errorCode': '3', 'errorMessage': 'Resource not found'} if failed else {}))
+                return gid
+            if method == 'aria2.tellStatus':
+                gid, keys = params
+                if gid not in self.downloads:
+                    raise Aria2RPCError("GID {} is not found".format(gid), code=1)
+                return {key: value for key, value in self.downloads[gid].items() if key in keys}
+            if method == 'aria2.removeDownloadResult':
+                self.downloads.pop(params[0], None)
+                return 'OK'
+            if method == 'aria2.changeGlobalOption':
+                self.global_options.update(params[0])
+                return 'OK'
+
+        raise Aria2RPCError("Method not found", code=1)
+
+
+class FakeAria2Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FakeAria2Handler)
+        self.aria2 = FakeAria2()
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{}/jsonrpc'.format(self.server_address[1])
+
+
+class FakeAria2Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        req = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        try:
+            resp = {'id': req['id'], 'jsonrpc': '2.0', 'result': self.server.aria2.dispatch(req['method'], req['params'])}
+        except Aria2RPCError as e:
+            resp = {'id': req['id'], 'jsonrpc': '2.0', 'error': {'code': e.code, 'message': str(e)}}
+
+        body = json.dumps(resp).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json-rpc')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class RunningProc(object):
+    """Stands in for the `aria2c` process of :class:`Aria2Daemon`."""
+    @staticmethod
+    def poll():
+        return None
+
+
+class Aria2RPCTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeAria2Server()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.rpc = Aria2RPC(self.server.url, secret=SECRET)
+
+        self.daemon = Aria2Daemon(['aria2c'], poll_interval=0.01)
+        self.daemon.rpc = self.rpc
+        self.daemon._proc = RunningProc()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_add_uris_and_tell_status(self):
+        gids = self.rpc.add_uris([(['http://example.com/a.ts'], {'out': 'a.ts'}),
+                                  (['http://example.com/fail.ts'], {'out': 'b.ts'})])
+        self.assertEqual(len(gids), 2)
+
+        statuses = self.rpc.tell_status(gids)
+        self.assertEqual([status['status'] for status in statuses], ['complete', 'error'])
+        self.assertEqual(statuses[1]['errorMessage'], 'Resource not found')
+
+    def test_multicall_with_a_failing_call(self):
+        results = self.rpc.multicall([('aria2.addUri', [['http://example.com/a.ts'], {}]),
+                                      ('aria2.addUri', [[], {}]),
+                                      ('aria2.getVersion', [])])
+
+        self.assertIsInstance(results[0], str)
+        self.assertIsInstance(results[1], Aria2RPCError)
+        self.assertEqual(results[1].code, 1)
+        self.assertIn("No URI to download.", str(results[1]))
+        self.assertIn("aria2.addUri", str(results[1]))
+        self.assertEqual(results[2], {'version': '1.37.0'})
+
+    def test_call_error(self):
+        with self.assertRaises(Aria2RPCError) as ctx:
+            self.rpc.call('aria2.tellStatus', 'ffffffffffffffff', ['status'])
+        self.assertEqual(ctx.exception.code, 1)
+        self.assertIn("is not found", str(ctx.exception))
+
+        with self.assertRaises(Aria2RPCError):
+            Aria2RPC(self.server.url, secret='wrong').call('aria2.getVersion')
+
+    def test_wait(self):
+        gids = self.rpc.add_uris([(['http://example.com/a.ts'], {}), (['http://example.com/fail.ts'], {})])
+        done = []
+        statuses = self.daemon.wait(gids, on_done=lambda gid, status: done.append(gid))
+
+        self.assertEqual(sorted(done), sorted(gids))
+        self.assertEqual(statuses[gids[1]]['status'], 'error')
+        self.assertFalse(self.server.aria2.downloads)  # the results are removed once collected
+
+    def test_dwnld_with_aria2_rpc(self):
+        downloader = MDownloader(confs={})
+        episodes = [('/tmp/ep1', ['seg_0000.ts', 'seg_0001.ts'], None), ('/tmp/ep2', ['seg_0000.ts'], None),
+                    ('/tmp/ep3', ['seg_0000.ts'], None)]
+        jobs = [(0, ['http://example.com/1/0.ts'], 'seg_0000.ts'), (0, ['http://example.com/1/1.ts'], 'seg_0001.ts'),
+                (1, ['http://example.com/2/fail.ts'], 'seg_0000.ts'), (2, [], 'seg_0000.ts')]
+        episodes_done, segments_done = [], []
+        tuning = {'max_concurrent_downloads': '8', 'split': '2', 'min_split_size': '2M',
+                  'max_connection_per_server': '2'}
+
+        completed = downloader._dwnld_with_aria2_rpc(self.daemon, {'referrer': 'http://example.com/'}, episodes, jobs,
+                                                     on_episode_done=episodes_done.append,
+                                                     on_segment_done=segments_done.append, tuning=tuning)
+
+        self.assertEqual(completed, {0})
+        self.assertEqual(episodes_done, [episodes[0]])
+        self.assertEqual(segments_done, [0, 0])
+        self.assertEqual(self.server.aria2.global_options, {'max-concurrent-downloads': '8'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+"""Tests of following a live HLS playlist, served growing from a local HTTP server."""
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from mdl import hls
+
+
+class LivePlaylist(object):
+    """A live media playlist of a sliding window of segments, which moves on by `script[i]` segments on its `i`th
+    request, and then by `growth` segments on every further request. It ends with its `endlist`th request."""
+    def __init__(self, target_duration, window=3, script=(), growth=0, endlist=None):
+        self.target_duration = target_duration
+        self.window = window
+        self.script = list(script)
+        self.growth = growth
+        self.endlist = endlist  # index of the request from which on ENDLIST is in
+        self.count = window  # number of the segments so far
+        self.requested = []  # times of the requests
+        self._lock = threading.Lock()
+
+    def render(self):
+        with self._lock:
+            idx = len(self.requested)
+            self.requested.append(time.monotonic())
+            self.count += self.script[idx] if idx < len(self.script) else self.growth
+
+            first = max(0, self.count - self.window)
+            lines = ['#EXTM3U', '#EXT-X-VERSION:3', '#EXT-X-TARGETDURATION:{}'.format(self.target_duration),
+                     '#EXT-X-MEDIA-SEQUENCE:{}'.format(first)]
+            for seqnum in range(first, self.count):
+                lines += ['#EXTINF:{},'.format(self.target_duration), 'seg{}.ts'.format(seqnum)]
+            if self.endlist is not None and idx >= self.endlist:
+                lines.append('#EXT-X-ENDLIST')
+
+        return '\n'.join(lines) + '\n'
+
+
+class LivePlaylistHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = self.server.playlist.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/vnd.apple.mpegurl')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class HLSFollowTestCase(unittest.TestCase):
+    TARGET_DURATION = 0.3
+    TOLERANCE = 0.1  # of the reload intervals, in seconds
+
+    def serve(self, playlist):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), LivePlaylistHandler)
+        server.daemon_threads = True
+        server.playlist = playlist
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        session = requests.Session()
+        self.addCleanup(session.close)
+        return session, hls.load(session, 'http://127.0.0.1:{}/live/index.m3u8'.format(server.server_address[1]))
+
+    @staticmethod
+    def new_segments(reloaded, start):
+        return [uri.rsplit('/', 1)[-1] for uri in reloaded.segments.uris[start:]]
+
+    def test_new_segments_till_endlist(self):
+        # 2 new segments, none, 1 new, then 1 new and the ENDLIST
+        playlist = LivePlaylist(self.TARGET_DURATION, script=[0, 2, 0, 1, 1], endlist=4)
+        session, loaded = self.serve(playlist)
+        self.assertTrue(loaded.is_live)
+        self.assertEqual(loaded.target_duration, self.TARGET_DURATION)
+
+        reloads = [self.new_segments(reloaded, start) for reloaded, start in hls.follow(session, loaded)]
+
+        self.assertEqual(reloads, [['seg3.ts', 'seg4.ts'], ['seg5.ts'], ['seg6.ts']])
+        self.assertEqual(len(playlist.requested), 5)  # no more reloads after the ENDLIST
+
+        # the target duration after a reload with new segments, half of it after one without
+        td = self.TARGET_DURATION
+        intervals = [t1 - t0 for t0, t1 in zip(playlist.requested, playlist.requested[1:])]
+        for interval, expected in zip(intervals, [td, td, td / 2, td]):
+            self.assertAlmostEqual(interval, expected, delta=self.TOLERANCE)
+
+    def test_stop_after_duration(self):
+        playlist = LivePlaylist(self.TARGET_DURATION, script=[0], growth=1)
+        session, loaded = self.serve(playlist)
+
+        duration = 1.0
+        started = time.monotonic()
+        reloads = [self.new_segments(reloaded, start) for reloaded, start in hls.follow(session, loaded, duration)]
+        elapsed = time.monotonic() - started
+
+        self.assertLess(elapsed, duration)
+        self.assertEqual(len(reloads), int(duration / self.TARGET_DURATION))
+        self.assertEqual(reloads, [['seg{}.ts'.format(3 + i)] for i in range(len(reloads))])
+
+    def test_stop_when_idle(self):
+        playlist = LivePlaylist(self.TARGET_DURATION)
+        session, loaded = self.serve(playlist)
+
+        started = time.monotonic()
+        reloads = list(hls.follow(session, loaded, max_idle=2 * self.TARGET_DURATION))
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(reloads, [])
+        self.assertAlmostEqual(elapsed, 2 * self.TARGET_DURATION, delta=self.TOLERANCE)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,182 @@
+"""Tests of the single-pass parser of HLS playlists on inline playlists."""
+import unittest
+
+from mdl import hls
+from mdl.seckeys import SeckeyRanges
+
+BASE_URL = 'https://cdn.example.com/vod/720p/index.m3u8?token=abc'
+
+
+def parse(text, url=BASE_URL, on_key=None):
+    return hls.parse(text.strip().splitlines(), url, on_key=on_key)
+
+
+class HLSParseTestCase(unittest.TestCase):
+    def test_media_playlist(self):
+        pl = parse('''
+#EXTM3U
+#EXT-X-VERSION:3
+#EXT-X-TARGETDURATION:10
+#EXT-X-MEDIA-SEQUENCE:7
+#EXT-X-PLAYLIST-TYPE:VOD
+#EXTINF:9.009,
+seg-7.ts
+#EXTINF:4.5,title
+/abs/seg-8.ts
+#EXTINF:10,
+https://other.example.com/seg-9.ts
+#EXT-X-ENDLIST
+''')
+        self.assertFalse(pl.is_master)
+        self.assertFalse(pl.is_live)
+        self.assertTrue(pl.endlist)
+        self.assertEqual(pl.playlist_type, 'VOD')
+        self.assertEqual(pl.target_duration, 10.0)
+        self.assertEqual(pl.media_sequence, 7)
+        self.assertEqual(pl.segments.uris, ['https://cdn.example.com/vod/720p/seg-7.ts',
+                                            'https://cdn.example.com/abs/seg-8.ts',
+                                            'https://other.example.com/seg-9.ts'])
+        self.assertEqual(list(pl.segments.durations), [9.009, 4.5, 10.0])
+        self.assertEqual(list(pl.segments.seqnums), [7, 8, 9])
+        self.assertIsNone(pl.segments[0].key)
+        self.assertIsNone(pl.segments.byteranges)
+
+    def test_iv_from_media_sequence_and_explicit_iv(self):
+        pl = parse('''
+#EXTM3U
+#EXT-X-MEDIA-SEQUENCE:100
+#EXT-X-KEY:METHOD=AES-128,URI="key1.bin"
+#EXTINF:10,
+seg-100.ts
+#EXTINF:10,
+seg-101.ts
+#EXT-X-KEY:METHOD=AES-128,URI="key2.bin",IV=0x000102030405060708090A0B0C0D0E0F
+#EXTINF:10,
+seg-102.ts
+''')
+        derived, explicit = pl.keys
+        self.assertEqual(derived, hls.Key('AES-128', 'https://cdn.example.com/vod/720p/key1.bin', None, 'identity'))
+        self.assertEqual(explicit.iv, bytes(range(16)))
+        self.assertEqual([seg.key for seg in pl.segments], [derived, derived, explicit])
+
+        # the IV of the key without one is the media sequence number of every segment
+        seckeys = SeckeyRanges()
+        for seg in pl.segments:
+            seckeys.append(seckeys.add_key({'algo': seg.key.method, 'key': b'k' * 16, 'iv': seg.key.iv}), seg.seqnum)
+        self.assertEqual([seckey['iv'] for seckey in seckeys],
+                         [(100).to_bytes(16, 'big'), (101).to_bytes(16, 'big'), bytes(range(16))])
+
+    def test_key_rotation(self):
+        keys_met = []
+        pl = parse('''
+#EXTM3U
+#EXT-X-KEY:METHOD=AES-128,URI="k1"
+#EXTINF:10,
+a.ts
+#EXT-X-KEY:METHOD=AES-128,URI="k2"
+#EXTINF:10,
+b.ts
+#EXT-X-KEY:METHOD=AES-128,URI="k1"
+#EXTINF:10,
+c.ts
+''', on_key=keys_met.append)
+        self.assertEqual([key.uri.rsplit('/', 1)[-1] for key in pl.keys], ['k1', 'k2'])
+        self.assertEqual(keys_met, pl.keys)  # every distinct key once, as soon as it's met
+        self.assertEqual(list(pl.segments.key_ids), [0, 1, 0])
+
+    def test_method_none(self):
+        pl = parse('''
+#EXTM3U
+#EXTINF:10,
+clear-0.ts
+#EXT-X-KEY:METHOD=AES-128,URI="k1"
+#EXTINF:10,
+enc-1.ts
+#EXT-X-KEY:METHOD=NONE
+#EXTINF:10,
+clear-2.ts
+''')
+        self.assertEqual(pl.keys[1], hls.Key('NONE', None, None, 'identity'))
+        self.assertEqual(list(pl.segments.key_ids), [-1, 0, 1])
+        self.assertEqual([seg.key.method if seg.key else None for seg in pl.segments], [None, 'AES-128', 'NONE'])
+
+    def test_byteranges(self):
+        pl = parse('''
+#EXTM3U
+#EXTINF:10,
+plain.ts
+#EXT-X-BYTERANGE:1000@0
+#EXTINF:10,
+main.ts
+#EXT-X-BYTERANGE:500
+#EXTINF:10,
+main.ts
+#EXT-X-BYTERANGE:300@5000
+#EXTINF:10,
+main.ts
+#EXT-X-BYTERANGE:200
+#EXTINF:10,
+main.ts
+#EXT-X-BYTERANGE:100
+#EXTINF:10,
+other.ts
+''')
+        # the offset omitted, the range follows the previous one of the same resource
+        self.assertEqual([seg.byterange for seg in pl.segments],
+                         [None, (1000, 0), (500, 1000), (300, 5000), (200, 5300), (100, 0)])
+        self.assertEqual(list(pl.segments.byteranges), [-1, -1, 1000, 0, 500, 1000, 300, 5000, 200, 5300, 100, 0])
+        self.assertIs(pl.segments.uris[1], pl.segments.uris[4])  # the same string for the ranges of a resource
+
+    def test_discontinuity(self):
+        pl = parse('''
+#EXTM3U
+#EXT-X-DISCONTINUITY-SEQUENCE:3
+#EXT-X-DISCONTINUITY
+#EXTINF:10,
+ad-0.ts
+#EXT-X-DISCONTINUITY
+#EXTINF:10,
+main-1.ts
+#EXTINF:10,
+main-2.ts
+#EXT-X-DISCONTINUITY
+#EXTINF:10,
+ad-3.ts
+''')
+        self.assertEqual(pl.discontinuity_sequence, 3)
+        self.assertEqual(list(pl.segments.discontinuities), [0, 1, 3])
+        self.assertEqual([seg.discontinuity for seg in pl.segments], [True, True, False, True])
+        self.assertTrue(pl.is_live)
+
+    def test_master_playlist(self):
+        keys_met = []
+        pl = parse('''
+#EXTM3U
+#EXT-X-SESSION-KEY:METHOD=AES-128,URI="https://keys.example.com/k",IV=0x0000000000000000000000000000000F
+#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID="aac",NAME="English",LANGUAGE="en",URI="audio/en.m3u8"
+#EXT-X-STREAM-INF:BANDWIDTH=1280000,RESOLUTION=640x360,CODECS="avc1.4d401e,mp4a.40.2"
+360p/index.m3u8
+#EXT-X-STREAM-INF:AVERAGE-BANDWIDTH=2500000,RESOLUTION=1280x720,CODECS="avc1.64001f,mp4a.40.2",AUDIO="aac"
+720p/index.m3u8
+#EXT-X-STREAM-INF:BANDWIDTH=2500000,RESOLUTION=1280x720,CODECS="hvc1.1.6.L93.B0"
+720p-hevc/index.m3u8
+''', url='https://cdn.example.com/vod/master.m3u8', on_key=keys_met.append)
+        self.assertTrue(pl.is_master)
+        self.assertFalse(pl.is_live)
+        self.assertEqual(len(pl.segments), 0)
+        self.assertEqual([(variant.uri, variant.bandwidth) for variant in pl.variants],
+                         [('https://cdn.example.com/vod/360p/index.m3u8', 1280000),
+                          ('https://cdn.example.com/vod/720p/index.m3u8', 2500000),
+                          ('https://cdn.example.com/vod/720p-hevc/index.m3u8', 2500000)])
+        self.assertEqual(pl.variants[0].attrs['CODECS'], 'avc1.4d401e,mp4a.40.2')
+        self.assertEqual(pl.variants[1].attrs['RESOLUTION'], '1280x720')
+        self.assertIs(pl.best_variant(), pl.variants[1])  # the first of the highest bandwidth
+        self.assertEqual(pl.media, [{'TYPE': 'AUDIO', 'GROUP-ID': 'aac', 'NAME': 'English', 'LANGUAGE': 'en',
+                                     'URI': 'audio/en.m3u8'}])
+        self.assertEqual(pl.session_keys, [hls.Key('AES-128', 'https://keys.example.com/k', (15).to_bytes(16, 'big'),
+                                                   'identity')])
+        self.assertEqual(keys_met, pl.session_keys)
+
+
+if __name__ == '__main__':
+    unittest.main()
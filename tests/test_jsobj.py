@@ -0,0 +1,55 @@
+"""Tests of the parser of the JavaScript object literals embedded in web pages."""
+import unittest
+
+from mdl import jsobj
+
+
+class JSObjTestCase(unittest.TestCase):
+    def test_json(self):
+        text = '{"a": [1, -2.5e3, "x\\u00e9\\n"], "b": {"c": null, "d": true, "e": false}}'
+        self.assertEqual(jsobj.loads(text), {'a': [1, -2500.0, 'xé\n'], 'b': {'c': None, 'd': True, 'e': False}})
+
+    def test_unquoted_keys(self):
+        self.assertEqual(jsobj.loads('{a: 1, $b_2: {c: "d"}, 3: 4}'), {'a': 1, '$b_2': {'c': 'd'}, '3': 4})
+        self.assertEqual(jsobj.loads('{true: 1, null: 2}'), {'true': 1, 'null': 2})
+
+    def test_single_quoted_strings(self):
+        self.assertEqual(jsobj.loads("{'a': 'it\\'s \"quoted\"', b: '\\x41\\u{1F600}'}"),
+                         {'a': 'it\'s "quoted"', 'b': 'A\U0001F600'})
+
+    def test_undefined_and_minified_booleans(self):
+        self.assertEqual(jsobj.loads('{a: undefined, b: void 0, c: !0, d: !1, e: [!0, !1]};'),
+                         {'a': None, 'b': None, 'c': True, 'd': False, 'e': [True, False]})
+
+    def test_trailing_commas_and_holes(self):
+        self.assertEqual(jsobj.loads('{a: [1, 2,], b: {c: 3,},}'), {'a': [1, 2], 'b': {'c': 3}})
+        self.assertEqual(jsobj.loads('[1, , 3]'), [1, None, 3])
+
+    def test_calls(self):
+        self.assertEqual(jsobj.loads('{d: new Date(1600000000000), e: new Date("2020-01-01")}'), {'d': None, 'e': None})
+        self.assertEqual(jsobj.loads('{m: new Map([["k", 1]]), s: new Set([1, 2]), a: Array.from([3])}'),
+                         {'m': {'k': 1}, 's': [1, 2], 'a': [3]})
+        self.assertEqual(jsobj.loads('Array.prototype.slice.call({0: "a", 1: "b", length: 2})'), ['a', 'b'])
+
+    def test_numbers(self):
+        self.assertEqual(jsobj.loads('{a: -1, b: .5}'), {'a': -1, 'b': 0.5})
+        self.assertEqual(jsobj.loads('[-.5, +3, 5., 5.e1, -1.5E-1, 0x1F, 1e3]'),
+                         [-0.5, 3, 5.0, 50.0, -0.15, 31, 1000.0])
+        self.assertEqual(jsobj.loads('{.5: "a", 0x10: "b"}'), {'0.5': 'a', '16': 'b'})
+
+    def test_dots_and_signs_in_strings_and_identifiers(self):
+        self.assertEqual(jsobj.loads('{a: "1.5 + .5", b: window.x.y, c: \'!0\'}'),
+                         {'a': '1.5 + .5', 'b': None, 'c': '!0'})
+
+    def test_comments(self):
+        self.assertEqual(jsobj.loads('{a: 1, // one\n /* two */ b: 2}'), {'a': 1, 'b': 2})
+
+    def test_invalid(self):
+        with self.assertRaises(jsobj.JSParseError):
+            jsobj.loads('{a: }')
+        with self.assertRaises(jsobj.JSParseError):
+            jsobj.loads('[1, 2))')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+"""Tests of the coalescing of the byte-range segments and of fetching them from a local server honouring Range."""
+import os
+import re
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from mdl.downloader import MDownloader
+
+RESOURCE = bytes(i % 251 for i in range(64 * 1024))
+_RANGE_RE = re.compile(r'bytes=(\d+)-(\d+)$')
+
+
+class RangeServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), RangeHandler)
+        self.ranges = []  # the Range headers received
+        self.honour_range = True
+        self.truncate = None  # number of bytes the body is cut short to
+
+    def url(self, path='/media.ts'):
+        return 'http://127.0.0.1:{}{}'.format(self.server_address[1], path)
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        range_header = self.headers.get('Range')
+        self.server.ranges.append(range_header)
+        match = _RANGE_RE.match(range_header or '')
+        if self.server.honour_range and match:
+            first, last = int(match.group(1)), min(int(match.group(2)), len(RESOURCE) - 1)
+            body = RESOURCE[first:last + 1]
+            self.send_response(206)
+            self.send_header('Content-Range', 'bytes {}-{}/{}'.format(first, last, len(RESOURCE)))
+        else:
+            body = RESOURCE
+            self.send_response(200)
+
+        if self.server.truncate is not None:
+            body = body[:self.server.truncate]
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CoalesceRangesTestCase(unittest.TestCase):
+    def test_adjacent_ranges(self):
+        jobs = [(0, 'u', 'a', 100, 0), (0, 'u', 'b', 50, 100), (0, 'u', 'c', 10, 150)]
+        self.assertEqual(MDownloader._coalesce_ranges(jobs, 1 << 20),
+                         [(0, 'u', 0, [('a', 0, 100), ('b', 100, 50), ('c', 150, 10)])])
+
+    def test_overlapping_ranges(self):
+        jobs = [(0, 'u', 'a', 100, 0), (0, 'u', 'b', 100, 50), (0, 'u', 'c', 20, 60), (0, 'u', 'd', 10, 150)]
+        self.assertEqual(MDownloader._coalesce_ranges(jobs, 1 << 20),
+                         [(0, 'u', 0, [('a', 0, 100), ('b', 50, 100), ('c', 60, 20), ('d', 150, 10)])])
+
+    def test_unmergeable_ranges(self):
+        jobs = [(0, 'u', 'a', 100, 0),
+                (0, 'u', 'b', 100, 101),  # a gap
+                (0, 'v', 'c', 100, 201),  # another resource
+                (1, 'v', 'd', 100, 301),  # another episode
+                (1, 'v', 'e', 100, 200)]  # going backwards
+        self.assertEqual([parts for _, _, _, parts in MDownloader._coalesce_ranges(jobs, 1 << 20)],
+                         [[('a', 0, 100)], [('b', 101, 100)], [('c', 201, 100)], [('d', 301, 100)], [('e', 200, 100)]])
+
+    def test_max_size(self):
+        jobs = [(0, 'u', 'a', 100, 0), (0, 'u', 'b', 100, 100), (0, 'u', 'c', 100, 200), (0, 'u', 'd', 300, 300)]
+        self.assertEqual(MDownloader._coalesce_ranges(jobs, 200),
+                         [(0, 'u', 0, [('a', 0, 100), ('b', 100, 100)]), (0, 'u', 200, [('c', 200, 100)]),
+                          (0, 'u', 300, [('d', 300, 300)])])  # a single range larger than the max
+
+
+class FetchRangesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = RangeServer()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.session = requests.Session()
+        self.addCleanup(self.session.close)
+        self.downloader = MDownloader(confs={})
+
+    def read(self, fname, episode_dir=None):
+        with open(os.path.join(episode_dir or self.tmp_dir, fname), 'rb') as f:
+            return f.read()
+
+    def fetch(self, parts, chunk_size=1000):
+        offset = parts[0][1]
+        return self.downloader._fetch_range(self.session, self.tmp_dir, self.server.url(), offset, parts, chunk_size)
+
+    def test_split_into_segments(self):
+        parts = [('a.ts', 1000, 3000), ('b.ts', 4000, 2500), ('c.ts', 6500, 1)]
+        self.assertEqual(self.fetch(parts), 3)
+        self.assertEqual(self.server.ranges, ['bytes=1000-6500'])
+        for fname, offset, length in parts:
+            self.assertEqual(self.read(fname), RESOURCE[offset:offset + length])
+
+    def test_split_overlapping_into_segments(self):
+        parts = [('a.ts', 0, 5000), ('b.ts', 3000, 4000), ('c.ts', 3500, 100), ('d.ts', 7000, 1000)]
+        self.assertEqual(self.fetch(parts, chunk_size=333), 4)
+        self.assertEqual(self.server.ranges, ['bytes=0-7999'])
+        for fname, offset, length in parts:
+            self.assertEqual(self.read(fname), RESOURCE[offset:offset + length])
+
+    def test_range_ignored(self):
+        self.server.honour_range = False
+        parts = [('a.ts', 10000, 3000), ('b.ts', 12000, 2000)]
+        self.assertEqual(self.fetch(parts), 2)
+        for fname, offset, length in parts:
+            self.assertEqual(self.read(fname), RESOURCE[offset:offset + length])
+
+    def test_truncated(self):
+        self.server.truncate = 1500
+        parts = [('a.ts', 0, 1000), ('b.ts', 1000, 1000)]
+        self.assertEqual(self.fetch(parts), 1)
+        self.assertEqual(self.read('a.ts'), RESOURCE[:1000])
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir, 'b.ts')))
+
+    def test_dwnld_ranges(self):
+        vc_confs = {'range_merge_size': '8K', 'join_buffer_size': '4K', 'max_concurrent_downloads': '2',
+                    'host_stats': False, 'ca_cert': '', 'user_agent': '', 'proxy': '', 'enable_proxy_dl_video': False}
+        episodes = [(os.path.join(self.tmp_dir, 'ep1'), ['seg0.ts', 'seg1.ts', 'seg2.ts', 'seg3.ts'], None),
+                    (os.path.join(self.tmp_dir, 'ep2'), ['seg0.ts'], None)]
+        url, other_url = self.server.url(), self.server.url('/other.ts')
+        range_jobs = [(0, url, 'seg0.ts', 4096, 0), (0, url, 'seg1.ts', 4096, 4096),  # merged up to 8K
+                      (0, url, 'seg2.ts', 4096, 8192), (0, url, 'seg3.ts', 1000, 12000),  # overlapping
+                      (1, other_url, 'seg0.ts', 2048, 0)]
+        segments_done = []
+
+        self.downloader._dwnld_ranges({'referrer': url}, vc_confs, episodes, range_jobs,
+                                      on_segment_done=segments_done.append)
+
+        self.assertEqual(sorted(self.server.ranges), ['bytes=0-2047', 'bytes=0-8191', 'bytes=8192-12999'])
+        self.assertEqual(sorted(segments_done), [0, 0, 1])
+        for ep_idx, _, fname, length, offset in range_jobs:
+            self.assertEqual(self.read(fname, episodes[ep_idx][0]), RESOURCE[offset:offset + length])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+"""Tests that the run-length encoded seckeys of :class:`SeckeyRanges` match the plain per-segment list."""
+import unittest
+from unittest import mock
+
+from mdl import hls, conf_parser, parse_dlops_default
+from mdl.seckeys import SeckeyRanges
+from mdl.sites.m3u8 import M3u8VC
+
+NONE = {'algo': "NONE", 'key': None, 'iv': None}
+
+
+def derived(key, seqnum):
+    return dict(key, iv=seqnum.to_bytes(16, 'big'))
+
+
+class SeckeyRangesTestCase(unittest.TestCase):
+    def assertMatches(self, seckeys, expected):
+        """Every lookup, at the boundaries of every run in particular, matches the per-segment list `expected`."""
+        self.assertEqual(len(seckeys), len(expected))
+        self.assertEqual(list(seckeys), expected)
+        for first, last, _, _ in seckeys.ranges:
+            for idx in {first - 1, first, first + 1, last - 1, last, last + 1} & set(range(len(expected))):
+                self.assertEqual(seckeys[idx], expected[idx], "segment %d" % idx)
+                self.assertEqual(seckeys[idx - len(expected)], expected[idx])
+        self.assertEqual([(idx, key, iv) for idx, key, iv in seckeys.iter_encrypted()],
+                         [(idx, seckey['key'], seckey['iv']) for idx, seckey in enumerate(expected)
+                          if seckey['algo'] != "NONE"])
+        with self.assertRaises(IndexError):
+            seckeys[len(expected)]
+
+    def test_runs(self):
+        explicit = {'algo': "AES-128", 'key': b'1' * 16, 'iv': b'\x01' * 16}
+        implicit = {'algo': "AES-128", 'key': b'2' * 16, 'iv': None}
+        segments = [(NONE, 0), (NONE, 1),  # a run of no key
+                    (explicit, 2), (explicit, 3), (explicit, 4),  # a run of one IV
+                    (implicit, 5), (implicit, 6), (implicit, 7),  # a run of the IVs derived from the seqnums
+                    (implicit, 9), (implicit, 10),  # a gap in the seqnums starts a new run
+                    (explicit, 11), (implicit, 12), (NONE, 13), (implicit, 14)]  # rotations back and forth
+
+        seckeys = SeckeyRanges()
+        for seckey, seqnum in segments:
+            seckeys.append(seckeys.add_key(seckey), seqnum)
+        expected = [derived(seckey, seqnum) if seckey is implicit else seckey for seckey, seqnum in segments]
+
+        self.assertEqual(len(seckeys.keys), 3)
+        self.assertEqual([(first, last) for first, last, _, _ in seckeys.ranges],
+                         [(0, 1), (2, 4), (5, 7), (8, 9), (10, 10), (11, 11), (12, 12), (13, 13)])
+        self.assertMatches(seckeys, expected)
+
+        seckeys.decrypted.update({2, 6})
+        expected[2] = expected[6] = NONE
+        self.assertMatches(seckeys, expected)
+
+    def test_purged_media_playlist(self):
+        confs = conf_parser()
+        parse_dlops_default({}, confs)
+        vc_confs = dict(confs['M3u8'], http_cache=False, skip_discontinuity='true')
+        vc = M3u8VC({}, vc_confs)
+        self.addCleanup(vc._key_manager.close)
+
+        key_bins = {}
+        playlist = '''
+#EXTM3U
+#EXT-X-MEDIA-SEQUENCE:40
+#EXTINF:10,
+s40.ts
+#EXT-X-KEY:METHOD=AES-128,URI="k1"
+#EXTINF:10,
+s41.ts
+#EXTINF:10,
+s42.ts
+#EXT-X-DISCONTINUITY
+#EXTINF:10,
+ad43.ts
+#EXT-X-KEY:METHOD=AES-128,URI="k2",IV=0x000102030405060708090A0B0C0D0E0F
+#EXTINF:10,
+ad44.ts
+#EXT-X-DISCONTINUITY
+#EXT-X-KEY:METHOD=AES-128,URI="k1"
+#EXTINF:10,
+s45.ts
+#EXT-X-KEY:METHOD=NONE
+#EXTINF:10,
+s46.ts
+#EXT-X-KEY:METHOD=AES-128,URI="k2",IV=0x000102030405060708090A0B0C0D0E0F
+#EXTINF:10,
+s47.ts
+#EXT-X-KEY:METHOD=AES-128,URI="k1"
+#EXTINF:10,
+s48.ts
+#EXTINF:10,
+s49.ts
+'''.strip().splitlines()
+        with mock.patch.object(vc._key_manager, 'get', lambda uri: key_bins.setdefault(uri, uri[-2:].encode() * 8)):
+            pl = hls.parse(playlist, 'https://cdn.example.com/live/index.m3u8')
+            urls, seckeys, _ = vc._purge_media_playlist(pl)
+
+            # the live playlist reloaded with the first half, then with all of it
+            live = hls.parse(playlist[:9], 'https://cdn.example.com/live/index.m3u8')
+            state = {}
+            live_urls, _, _ = vc._purge_media_playlist(live, state=state)
+            new_urls, live_seckeys, _ = vc._purge_media_playlist(pl, len(live.segments), state)
+
+        kept = [seg for seg in pl.segments if not seg.uri.rsplit('/', 1)[-1].startswith('ad')]
+        expected = []
+        for seg in kept:
+            if seg.key is None or seg.key.method == "NONE":
+                expected.append(NONE)
+            else:
+                seckey = {'algo': seg.key.method, 'key': key_bins[seg.key.uri], 'iv': seg.key.iv}
+                expected.append(seckey if seg.key.iv else derived(seckey, seg.seqnum))
+
+        self.assertEqual(urls, [seg.uri for seg in kept])
+        self.assertMatches(seckeys, expected)
+        self.assertEqual(live_urls + new_urls, urls)
+        self.assertMatches(live_seckeys, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()